@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Пакетная AI-обработка против одиночных запросов.
+
+Mock-провайдер отвечает за время, зависящее от запроса: постоянная
+накладная часть (очередь, первый токен) плюс время на токены запроса и
+ответа; повторный системный промпт берется "из кэша". На пакетный запрос
+(JSON-массив) он отвечает JSON-массивом. Сравниваются одиночные запросы
+(process_text для каждого текста) и process_many; в последнем прогоне
+провайдер портит каждый второй пакетный ответ - проверяется откат на
+одиночные запросы.
+
+Запуск из корня проекта:
+    python -m benchmarks.batch_processing --posts 40
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+
+os.environ.setdefault('GROUP_ID', '-1000000000000')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web  # noqa: E402
+
+from benchmarks.mock_ai_providers import MockServer  # noqa: E402
+from config import SETTINGS  # noqa: E402
+from services.ai_processor import ai_processor  # noqa: E402
+from services.ai_providers import AIProvider, ProviderRouter  # noqa: E402
+from utils.usage_stats import usage_stats  # noqa: E402
+
+# Модель задержки: мс на запрос, на некэшированный токен запроса и на токен ответа
+REQUEST_MS = 400
+PREFILL_MS = 0.3
+DECODE_MS = 4.0
+
+
+class BatchServer(MockServer):
+    """Провайдер, который "обрабатывает" текст, обрамляя его в <b>"""
+
+    def __init__(self, corrupt_every: int = 0):
+        super().__init__('batch', latency=0)
+        self.corrupt_every = corrupt_every
+        self.requests = 0
+        self.batches = 0
+        self._systems = set()
+
+    async def chat(self, request):
+        body = await request.json()
+        self.requests += 1
+        system, user = body['messages'][0]['content'], body['messages'][-1]['content']
+
+        if user.startswith('['):
+            self.batches += 1
+            items = json.loads(user)
+            content = json.dumps([{'id': item['id'], 'text': f"<b>{item['text']}</b>"} for item in items], ensure_ascii=False)
+            if self.corrupt_every and self.batches % self.corrupt_every == 0:
+                content = content[:len(content) // 2]
+        else:
+            content = f"<b>{user.split(chr(10))[1]}</b>"
+
+        prompt = (len(system) + len(user)) // 4
+        cached = len(system) // 4 if system in self._systems else 0
+        self._systems.add(system)
+        completion = len(content) // 4
+        await asyncio.sleep((REQUEST_MS + (prompt - cached) * PREFILL_MS + completion * DECODE_MS) / 1000)
+
+        return web.json_response({
+            'id': 'mock', 'object': 'chat.completion', 'created': int(time.time()), 'model': body['model'],
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': {
+                'prompt_tokens': prompt, 'prompt_cache_hit_tokens': cached,
+                'completion_tokens': completion, 'total_tokens': prompt + completion
+            }
+        })
+
+
+async def run_mode(name, items, batched, corrupt_every=0):
+    server = BatchServer(corrupt_every)
+    await server.start()
+    ai_processor.router = ProviderRouter([AIProvider('batch', server.base_url, 'mock', 'key')])
+
+    usage_stats.clear()
+
+    started = time.perf_counter()
+    if batched:
+        results = await ai_processor.process_many(items)
+    else:
+        results = await asyncio.gather(*(ai_processor.process_text(text, links) for text, links in items))
+    elapsed = time.perf_counter() - started
+
+    await ai_processor.router.close()
+    await server.stop()
+
+    totals = usage_stats.by_prompt()['style_formatting']
+    print(
+        f"{name:<26}{elapsed:>8.2f}{elapsed / len(items) * 1000:>10.0f}{server.requests:>9}"
+        f"{totals['prompt_tokens']:>10}{totals['completion_tokens']:>9}{usage_stats.cost(totals) / len(items) * 1e6:>14.1f}"
+    )
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Пакетная AI-обработка на mock-провайдере")
+    parser.add_argument('--posts', type=int, default=40, help="Текстов в потоке")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    SETTINGS['ai_hedge_after'] = 0
+    items = [
+        (f"Новость номер {number}: короткое описание релиза и что в нем изменилось.", "")
+        for number in range(args.posts)
+    ]
+
+    print(f"{'Режим':<26}{'всего, с':>8}{'мс/пост':>10}{'запросов':>9}{'вход, ток':>10}{'выход':>9}{'$ на 1М пост.':>14}")
+    single = await run_mode("по одному", items, batched=False)
+    batched = await run_mode("пакетами", items, batched=True)
+    fallback = await run_mode("пакетами, порча ответов", items, batched=True, corrupt_every=2)
+
+    assert single == batched == fallback, "Результаты режимов расходятся"
+    print(f"\nРезультаты совпадают во всех режимах; пакетов/одиночных в сумме: {ai_processor.batch_stats}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
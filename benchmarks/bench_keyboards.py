@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""Микробенчмарк клавиатур: сборка с нуля против готовых шаблонов.
+
+Сравнивает время одного вывода клавиатуры при полной сборке (CallbackData.pack()
+на каждую кнопку и валидация моделей) и при подстановке ID в шаблон.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_keyboards --number 20000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+os.environ.setdefault('GROUP_ID', '-1000000000000')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import keyboards  # noqa: E402
+
+CASES = [
+    ("Превью поста", keyboards._build_post_preview_keyboard, keyboards.create_post_preview_keyboard),
+    ("Планировщик", keyboards._build_simple_scheduler_keyboard, keyboards.create_simple_scheduler_keyboard),
+    ("Элемент очереди", keyboards._build_queue_item_keyboard, keyboards.create_queue_item_keyboard),
+]
+
+STATIC_CASES = [
+    ("Назад в меню", keyboards._build_back_to_menu_keyboard, keyboards.create_back_to_menu_keyboard),
+    ("Настройки", keyboards._build_settings_keyboard,
+     lambda: keyboards.create_settings_keyboard("admin", 0, "group", 0)),
+]
+
+
+def measure(func, number: int) -> float:
+    """Среднее время вызова в микросекундах (лучший из трех прогонов)"""
+    return min(timeit.repeat(func, number=number, repeat=3)) / number * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Микробенчмарк сборки клавиатур")
+    parser.add_argument('--number', type=int, default=20000, help="Вызовов на один замер")
+    args = parser.parse_args()
+
+    # Шаблон должен давать ту же клавиатуру, что и полная сборка
+    for name, build, render in CASES:
+        assert build(12345).model_dump() == render(12345).model_dump(), name
+
+    print(f"{'Клавиатура':<18}{'сборка, мкс':>14}{'готовая, мкс':>15}{'ускорение':>12}")
+    rows = [(name, lambda b=build: b(12345), lambda r=render: r(12345)) for name, build, render in CASES]
+    rows += [(name, build, render) for name, build, render in STATIC_CASES]
+
+    for name, build, render in rows:
+        built = measure(build, args.number)
+        cached = measure(render, args.number)
+        print(f"{name:<18}{built:>14.2f}{cached:>15.2f}{built / cached:>11.1f}x")
+
+    print(f"{'Главное меню':<18}{'':>14}{measure(keyboards.create_main_menu, args.number):>15.2f}")
+
+
+if __name__ == "__main__":
+    main()
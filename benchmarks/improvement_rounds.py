@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""Раунды доработки поста: холодные запросы против диалога и правок.
+
+Mock-провайдер считает время ответа как у настоящего: за каждый
+некэшированный токен запроса и за каждый токен ответа. Кэшем считается
+совпадающий префикс с любым прежним запросом. Сравниваются три режима:
+каждый раунд заново (пост целиком в запросе), продолжение диалога и диалог
+с правками ИСКАТЬ/ЗАМЕНИТЬ. Печатает среднее время раунда и токены.
+
+Запуск из корня проекта:
+    python -m benchmarks.improvement_rounds --rounds 5
+"""
+import argparse
+import asyncio
+import logging
+import os
+import re
+import sys
+import time
+
+os.environ.setdefault('GROUP_ID', '-1000000000000')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web  # noqa: E402
+
+from benchmarks.mock_ai_providers import MockServer  # noqa: E402
+from config import SETTINGS  # noqa: E402
+from services.ai_processor import ai_processor  # noqa: E402
+from services.ai_providers import AIProvider, ProviderRouter  # noqa: E402
+from services.improvement_sessions import improvement_sessions  # noqa: E402
+
+# Модель стоимости: мс на некэшированный токен запроса и на токен ответа
+PREFILL_MS = 0.3
+DECODE_MS = 4.0
+
+
+class EditingServer(MockServer):
+    """Провайдер, который "дописывает" в пост строку из дополнений"""
+
+    def __init__(self):
+        super().__init__('editor', latency=0)
+        self._seen = []
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+
+    def _cached_prefix(self, payload: str) -> int:
+        best = 0
+        for seen in self._seen:
+            common = os.path.commonprefix([seen, payload])
+            best = max(best, len(common))
+        self._seen.append(payload)
+        return best
+
+    async def chat(self, request):
+        body = await request.json()
+        messages = body['messages']
+        payload = ''.join(f"{m['role']}:{m['content']}\n" for m in messages)
+        prompt, cached = len(payload) // 4, self._cached_prefix(payload) // 4
+
+        addition = messages[-1]['content'].split('\n', 1)[1]
+        if 'РЕЖИМ ПРАВОК' in messages[0]['content']:
+            last_line = re.findall(r'[^\n]+', self._current_post(messages))[-1]
+            content = f"<<<<<<< ИСКАТЬ\n{last_line}\n=======\n{last_line}\n{addition}\n>>>>>>> ЗАМЕНИТЬ"
+        else:
+            content = f"{self._current_post(messages)}\n{addition}"
+
+        completion = len(content) // 4
+        self.prompt_tokens += prompt
+        self.cached_tokens += cached
+        self.completion_tokens += completion
+        await asyncio.sleep(((prompt - cached) * PREFILL_MS + completion * DECODE_MS) / 1000)
+
+        return web.json_response({
+            'id': 'mock', 'object': 'chat.completion', 'created': int(time.time()), 'model': body['model'],
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content}, 'finish_reason': 'stop'}],
+            'usage': {
+                'prompt_tokens': prompt, 'prompt_cache_hit_tokens': cached,
+                'completion_tokens': completion, 'total_tokens': prompt + completion
+            }
+        })
+
+    @staticmethod
+    def _current_post(messages) -> str:
+        """Текущий текст поста: исходный плюс все уже добавленные строки"""
+        post = messages[1]['content'].split('\n', 1)[1]
+        for message in messages[2:-1]:
+            if message['role'] == 'user':
+                post += '\n' + message['content'].split('\n', 1)[1]
+        return post
+
+
+async def run_mode(name, rounds, post, session, patch):
+    server = EditingServer()
+    await server.start()
+    ai_processor.router = ProviderRouter([AIProvider('editor', server.base_url, 'mock', 'key')])
+    SETTINGS['ai_improvement_patch'] = patch
+
+    text, timings = post, []
+    for number in range(rounds):
+        started = time.perf_counter()
+        text = await ai_processor.improve_text(text, f"Дополнение номер {number}", post_id=1 if session else None)
+        timings.append(time.perf_counter() - started)
+
+    improvement_sessions.drop(1)
+    await ai_processor.router.close()
+    await server.stop()
+
+    print(
+        f"{name:<24}{sum(timings) / rounds * 1000:>10.0f}{timings[-1] * 1000:>10.0f}"
+        f"{server.prompt_tokens - server.cached_tokens:>12}{server.cached_tokens:>10}{server.completion_tokens:>10}"
+    )
+    return text
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Раунды доработки поста на mock-провайдере")
+    parser.add_argument('--rounds', type=int, default=5, help="Раундов доработки")
+    parser.add_argument('--post-lines', type=int, default=40, help="Строк в исходном посте")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    SETTINGS['ai_hedge_after'] = 0
+    post = '\n'.join(f"<b>Строка {n}</b>: описание возможности и ссылка на документацию" for n in range(args.post_lines))
+
+    print(f"{'Режим':<24}{'раунд, мс':>10}{'послед.':>10}{'вход без к.':>12}{'из кэша':>10}{'выход':>10}")
+    results = [
+        await run_mode("каждый раз заново", args.rounds, post, session=False, patch=False),
+        await run_mode("диалог", args.rounds, post, session=True, patch=False),
+        await run_mode("диалог + правки", args.rounds, post, session=True, patch=True),
+    ]
+    assert len(set(results)) == 1, "Режимы дали разный итоговый текст"
+    print(f"\nИтоговый текст одинаков во всех режимах ({len(results[0])} символов)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
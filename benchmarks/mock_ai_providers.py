@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""Маршрутизация AI-провайдеров против локальных mock-серверов.
+
+Поднимает несколько OpenAI-совместимых серверов (aiohttp) с заданной
+задержкой и долей ошибок и прогоняет через ProviderRouter серию запросов:
+сначала все серверы работают, затем быстрый сервер "падает" и снова
+поднимается. Печатает распределение запросов, сквозные p50/p95, число
+страхующих запросов и состояние предохранителей.
+
+Запуск из корня проекта:
+    python -m benchmarks.mock_ai_providers --requests 120
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import time
+from collections import Counter
+
+os.environ.setdefault('GROUP_ID', '-1000000000000')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web  # noqa: E402
+
+from config import SETTINGS  # noqa: E402
+from services.ai_providers import AIProvider, ProviderRouter  # noqa: E402
+
+
+class MockServer:
+    """OpenAI-совместимый сервер: /v1/models и /v1/chat/completions"""
+
+    def __init__(self, name: str, latency: float, jitter: float = 0.0, error_rate: float = 0.0):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.down = False
+        self.hits = 0
+        # Виденные системные сообщения: повторный префикс отдается "из кэша"
+        self._prefixes = set()
+        self.port = None
+        self._runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/v1/models', self.models)
+        app.router.add_post('/v1/chat/completions', self.chat)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    async def models(self, request):
+        return web.json_response({'object': 'list', 'data': [{'id': 'mock', 'object': 'model', 'owned_by': self.name}]})
+
+    async def chat(self, request):
+        self.hits += 1
+        body = await request.json()
+        await asyncio.sleep(max(0.0, self.latency + random.uniform(-self.jitter, self.jitter)))
+
+        if self.down or random.random() < self.error_rate:
+            return web.json_response({'error': {'message': f'{self.name} failed'}}, status=500)
+
+        prompt = sum(len(message['content']) for message in body['messages']) // 4
+        system = body['messages'][0]['content']
+        cached = len(system) // 4 if system in self._prefixes else 0
+        self._prefixes.add(system)
+        return web.json_response({
+            'id': f'mock-{self.hits}',
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body['model'],
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': f'<b>{self.name}</b> ответ'},
+                'finish_reason': 'stop'
+            }],
+            'usage': {
+                'prompt_tokens': prompt, 'prompt_cache_hit_tokens': cached,
+                'completion_tokens': 8, 'total_tokens': prompt + 8
+            }
+        })
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))] if values else 0.0
+
+
+async def run_phase(router, name, count, concurrency):
+    """Серия запросов; возвращает сквозные задержки и число ошибок"""
+    latencies, errors, winners = [], 0, Counter()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await router.chat_completion(messages=[{'role': 'user', 'content': 'тест ' * 50}])
+                winners[response.provider] += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(one() for _ in range(count)))
+    print(
+        f"{name:<28} p50={percentile(latencies, 50) * 1000:6.0f} мс  "
+        f"p95={percentile(latencies, 95) * 1000:6.0f} мс  ошибок={errors}  ответили: {dict(winners)}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Маршрутизация AI-провайдеров на mock-серверах")
+    parser.add_argument('--requests', type=int, default=120, help="Запросов в каждой фазе")
+    parser.add_argument('--concurrency', type=int, default=5, help="Одновременных запросов")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.ERROR)
+    SETTINGS.update({
+        'ai_hedge_after': 0.4, 'ai_breaker_cooldown': 1.0, 'ai_breaker_failures': 3, 'ai_provider_stats_ttl': 3
+    })
+
+    servers = [
+        MockServer('fast', latency=0.05, jitter=0.02),
+        MockServer('slow-tail', latency=0.15, jitter=0.1),
+        MockServer('flaky', latency=0.08, jitter=0.03, error_rate=0.3),
+    ]
+    for server in servers:
+        await server.start()
+
+    router = ProviderRouter([AIProvider(s.name, s.base_url, 'mock', 'key') for s in servers])
+    try:
+        await run_phase(router, "Все серверы работают", args.requests, args.concurrency)
+
+        # Быстрый сервер стал медленным: срабатывают страхующие запросы
+        servers[0].latency = 1.0
+        await run_phase(router, "fast тормозит (1 с)", args.requests // 2, args.concurrency)
+        servers[0].latency = 0.05
+
+        servers[0].down = True
+        await run_phase(router, "fast недоступен", args.requests, args.concurrency)
+        print(f"  предохранитель fast: {router.providers[0].state}")
+
+        servers[0].down = False
+        await asyncio.sleep(SETTINGS['ai_provider_stats_ttl'])
+        await run_phase(router, "fast восстановлен", args.requests, args.concurrency)
+
+        print(f"\nСтрахующих запросов: {router.hedges}, из них выиграли: {router.hedge_wins}")
+        print(f"{'Провайдер':<12}{'состояние':>11}{'p50, мс':>9}{'p95, мс':>9}{'ошибки':>8}{'запросов':>10}")
+        for stats, server in zip(router.get_stats()['providers'], servers):
+            print(
+                f"{stats['name']:<12}{stats['state']:>11}{(stats['p50'] or 0) * 1000:>9.0f}"
+                f"{(stats['p95'] or 0) * 1000:>9.0f}{stats['error_rate']:>8.0%}{server.hits:>10}"
+            )
+    finally:
+        await router.close()
+        for server in servers:
+            await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""Проверка аренды постов несколькими процессами на одной машине.
+
+Каждый процесс изображает экземпляр бота: берет в аренду готовые посты из
+общей очереди в базе SQLite, "публикует" их (пауза) и отмечает завершенными. Один
+дополнительный процесс падает, не завершив свои аренды, - их должны забрать
+остальные после истечения ttl. В конце проверяется, что каждый пост
+опубликован ровно один раз, и печатается пропускная способность по числу
+экземпляров.
+
+Запуск из корня проекта:
+    python -m benchmarks.multi_instance_leases --posts 300 --replicas 1 2 4
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+os.environ.setdefault('GROUP_ID', '-1000000000000')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.publish_leases import PublishLeaseStore  # noqa: E402
+
+PUBLISH_TIME = datetime(2024, 1, 1)
+
+
+def run_instance(db_path, keys, publish_ms, ttl, batch, results, crash=False):
+    """Цикл одного экземпляра: захват, публикация, завершение"""
+    store = PublishLeaseStore(db_path, owner=f"instance-{os.getpid()}")
+
+    while True:
+        claimed = store.claim_due(datetime.now(), ttl=ttl, limit=batch)
+        if crash and claimed:
+            # Экземпляр падает с захваченными арендами
+            os._exit(1)
+
+        if not claimed:
+            if len(store.done_keys(keys)) == len(keys):
+                break
+            time.sleep(0.05)
+            continue
+
+        for key, (token, _) in claimed.items():
+            if not store.is_current(key, token):
+                continue
+            time.sleep(publish_ms / 1000)
+            if store.complete(key, token):
+                results.put((key, os.getpid()))
+
+    store.close()
+
+
+def run(replicas, posts, publish_ms, ttl, batch, with_crash):
+    """Один прогон; возвращает (секунды, публикации по ключам, число забранных у упавшего)"""
+    db_path = os.path.join(tempfile.mkdtemp(), 'leases.sqlite3')
+    keys = [f"{number}@{PUBLISH_TIME.isoformat()}" for number in range(posts)]
+    store = PublishLeaseStore(db_path)
+    store.sync_posts({str(number): (PUBLISH_TIME, '{}') for number in range(posts)})
+    store.close()
+
+    results = multiprocessing.Queue()
+    processes = []
+
+    if with_crash:
+        crasher = multiprocessing.Process(
+            target=run_instance, args=(db_path, keys, publish_ms, ttl, batch, results, True)
+        )
+        crasher.start()
+        crasher.join()
+
+    started = time.perf_counter()
+    for _ in range(replicas):
+        process = multiprocessing.Process(
+            target=run_instance, args=(db_path, keys, publish_ms, ttl, batch, results)
+        )
+        process.start()
+        processes.append(process)
+
+    published = Counter()
+    while sum(published.values()) < posts and any(p.is_alive() for p in processes):
+        try:
+            key, _ = results.get(timeout=0.5)
+            published[key] += 1
+        except Exception:
+            pass
+
+    for process in processes:
+        process.join()
+    while not results.empty():
+        key, _ = results.get()
+        published[key] += 1
+
+    return time.perf_counter() - started, published
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Аренда постов несколькими процессами")
+    parser.add_argument('--posts', type=int, default=300, help="Готовых постов")
+    parser.add_argument('--publish-ms', type=float, default=10, help="Время одной публикации (мс)")
+    parser.add_argument('--ttl', type=float, default=1.0, help="Время аренды (сек)")
+    parser.add_argument('--batch', type=int, default=10, help="Постов за один захват")
+    parser.add_argument('--replicas', type=int, nargs='+', default=[1, 2, 4], help="Числа экземпляров")
+    args = parser.parse_args()
+
+    print(f"{'Экземпляров':<13}{'время, с':>10}{'постов/с':>10}{'дублей':>8}{'пропущено':>11}")
+    for replicas in args.replicas:
+        elapsed, published = run(replicas, args.posts, args.publish_ms, args.ttl, args.batch, with_crash=True)
+        duplicates = sum(count - 1 for count in published.values() if count > 1)
+        missing = args.posts - len(published)
+        print(f"{replicas:<13}{elapsed:>10.2f}{args.posts / elapsed:>10.0f}{duplicates:>8}{missing:>11}")
+        assert not duplicates and not missing, "Пост опубликован не ровно один раз"
+
+    print(f"\nВ каждом прогоне один экземпляр упал с {args.batch} арендами, их забрали после ttl")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""Симуляция планирования и публикации на виртуальном времени.
+
+Прогоняет тысячи синтетических постов через движок расписания и SchedulerService
+(с фиктивным ботом) за симулированный месяц и печатает распределение опозданий
+публикации, загрузку слотов и затраты CPU планировщика.
+
+Запуск из корня проекта:
+    python -m benchmarks.simulate_schedule --posts 2000 --days 30
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+os.environ.setdefault('GROUP_ID', '-1000000000000')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.clock import clock, SimulatedClock  # noqa: E402
+from utils.post_archive import post_archive  # noqa: E402
+from utils.post_storage import post_storage  # noqa: E402
+from utils.slot_index import slot_index  # noqa: E402
+from utils.time_slots import time_slot_manager  # noqa: E402
+from services.scheduler_service import SchedulerService  # noqa: E402
+
+
+class MockBot:
+    """Фиктивный бот: только считает отправленные сообщения"""
+
+    def __init__(self):
+        self.sent = 0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent += 1
+
+
+class MeasuredSchedulerService(SchedulerService):
+    """Планировщик, замеряющий CPU на каждой проверке очереди"""
+
+    def __init__(self, bot):
+        super().__init__(bot)
+        self.cpu_seconds = 0.0
+        self.ticks = 0
+
+    async def _check_and_publish_posts(self):
+        started = time.process_time()
+        await super()._check_and_publish_posts()
+        self.cpu_seconds += time.process_time() - started
+        self.ticks += 1
+
+
+async def feed_posts(arrivals, stats):
+    """Подает посты в моменты их поступления и планирует через движок расписания"""
+    for arrival in arrivals:
+        delay = (arrival - clock.now()).total_seconds()
+        if delay > 0:
+            await clock.sleep(delay)
+
+        started = time.process_time()
+        publish_time = time_slot_manager.next_free_time(clock.now())
+        stats['decision_cpu'] += time.process_time() - started
+
+        if publish_time is None:
+            stats['rejected'] += 1
+            continue
+
+        post_storage.schedule_post(
+            processed_text="Синтетический пост",
+            publish_time=publish_time,
+            user_id=0
+        )
+        stats['scheduled'] += 1
+
+
+def percentile(values, share):
+    """Перцентиль по отсортированному списку"""
+    if not values:
+        return 0.0
+    idx = min(len(values) - 1, int(len(values) * share))
+    return values[idx]
+
+
+def slot_utilization(published_times, start, end):
+    """Доля слотов, в которые попал хотя бы один пост, и среднее число постов в слоте"""
+    published_times = sorted(published_times)
+    windows = used = posts_in_used = 0
+
+    for window_start, window_end in time_slot_manager._windows(start.date(), (end - start).days + 1):
+        if window_end <= start or window_start >= end:
+            continue
+        windows += 1
+        count = bisect_left(published_times, window_end) - bisect_left(published_times, window_start)
+        if count:
+            used += 1
+            posts_in_used += count
+
+    return windows, used, (posts_in_used / used if used else 0.0)
+
+
+async def run(args):
+    random.seed(args.seed)
+
+    start = datetime.now().replace(second=0, microsecond=0)
+    end = start + timedelta(days=args.days)
+    simulated = SimulatedClock(start)
+    clock.use(simulated)
+
+    # Архив публикаций симуляции - во временной директории
+    post_archive.directory = tempfile.mkdtemp(prefix='archive-sim-')
+    post_archive.offload = False
+
+    slot_index.min_spacing = timedelta(minutes=args.spacing)
+    slot_index.max_posts_per_slot = args.max_per_slot
+
+    arrivals = sorted(
+        start + timedelta(seconds=random.uniform(0, args.days * 86400))
+        for _ in range(args.posts)
+    )
+
+    stats = {'scheduled': 0, 'rejected': 0, 'decision_cpu': 0.0}
+    lateness = []
+    published_times = []
+
+    def on_published(event, post):
+        if event == 'published':
+            lateness.append((clock.now() - post['publish_time']).total_seconds())
+            published_times.append(post['publish_time'])
+
+    post_storage.subscribe(on_published)
+
+    bot = MockBot()
+    scheduler = MeasuredSchedulerService(bot)
+
+    wall_started = time.perf_counter()
+    await scheduler.start()
+    feeder = asyncio.create_task(feed_posts(arrivals, stats))
+
+    # После последнего поступления даем очереди неделю на разгрузку
+    await simulated.run_until(end + timedelta(days=7))
+    await feeder
+    await scheduler.stop()
+    wall_seconds = time.perf_counter() - wall_started
+
+    archive_stats = post_archive.get_stats()
+    post_archive.close()
+
+    lateness.sort()
+    windows, used, per_slot = slot_utilization(published_times, start, end)
+
+    print(f"Симуляция: {args.days} дн., {args.posts} постов, "
+          f"интервал {args.spacing} мин, лимит на слот {args.max_per_slot or '∞'}")
+    print(f"Время выполнения: {wall_seconds:.2f} с (реальное)")
+    print(f"Запланировано: {stats['scheduled']}, отклонено (нет слотов): {stats['rejected']}, "
+          f"опубликовано: {len(lateness)}, сообщений боту: {bot.sent}")
+    if lateness:
+        print(f"Опоздание публикации, с: p50={percentile(lateness, 0.5):.0f} "
+              f"p95={percentile(lateness, 0.95):.0f} p99={percentile(lateness, 0.99):.0f} "
+              f"max={lateness[-1]:.0f} mean={statistics.mean(lateness):.1f}")
+    print(f"Слоты: {windows} всего, занято {used} ({used / windows:.0%}), "
+          f"в среднем {per_slot:.1f} постов на занятый слот" if windows else "Слоты: нет")
+    print(f"CPU планировщика: {scheduler.cpu_seconds * 1000:.1f} мс на {scheduler.ticks} проверок "
+          f"({scheduler.cpu_seconds / max(1, scheduler.ticks) * 1e6:.1f} мкс/проверка)")
+    print(f"Архив: {archive_stats['records']} записей, {archive_stats['disk_bytes'] / 1024:.0f} КБ на диске")
+    print(f"CPU выбора времени: {stats['decision_cpu'] * 1000:.1f} мс "
+          f"({stats['decision_cpu'] / max(1, args.posts) * 1e6:.1f} мкс/пост)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Симуляция планировщика на виртуальном времени")
+    parser.add_argument('--posts', type=int, default=2000, help="Количество синтетических постов")
+    parser.add_argument('--days', type=int, default=30, help="Длительность поступления постов (дни)")
+    parser.add_argument('--spacing', type=int, default=5, help="Минимальный интервал между постами (мин)")
+    parser.add_argument('--max-per-slot', type=int, default=0, help="Лимит постов на слот (0 - без лимита)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
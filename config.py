@@ -59,6 +59,13 @@ POSTING_SCHEDULE = {
     ]
 }
 
+# Периоды суток для быстрого выбора времени
+SCHEDULE_PERIODS = {
+    'morning': {'start': '10:00', 'end': '12:00'},
+    'evening': {'start': '19:00', 'end': '22:00'},
+    'night': {'start': '23:00', 'end': '01:00'}
+}
+
 # ===============================
 # 📝 ПУТИ К ПРОМПТАМ
 # ===============================
@@ -77,6 +84,8 @@ MESSAGES = {
     'auto_mode_status': "🔄 Режим: AUTO",
     'queue_empty': "📋 **Очередь постов пуста**\n\nЗапланированных постов нет.",
     'queue_title': "📋 **Отложенные посты ({count})**",
+    'queue_page_range': "Посты {first}–{last} из {count}",
+    'duplicate_callback': "⏳ Уже выполняется, подождите",
     'preview_title': "📋 **ПРЕДПРОСМОТР ПОСТА #{post_id}**",
     'preview_footer': "━━━━━━━━━━━━━━━━━━━━",
     'post_published': "✅ **ПОСТ ОПУБЛИКОВАН**\n\nПост #{post_id} успешно опубликован!",
@@ -98,7 +107,10 @@ MESSAGES = {
     'bot_started': "🚀 **Бот запущен и готов к работе!**\n\nМожете отправлять мне любые сообщения для обработки.",
     'bot_stopping': "🛑 **Бот завершает работу...**",
     'ai_processing_error': "❌ **Ошибка обработки ИИ**",
+    'ai_processing_ack': "⏳ Обрабатываю сообщение...",
     'post_too_long_warning': "⚠️ Текст обрезан для медиа (лимит 1024 символа)",
+    'archive_search_usage': "🔎 Поиск по архиву: /search слова или #хэштег",
+    'archive_search_empty': "🔎 По запросу ничего не найдено",
     'input_truncated_warning': "⚠️ Входной текст может быть обрезан — проверь источник."
 }
 
@@ -135,6 +147,11 @@ BUTTONS = {
     'cancel_publication': "🗑 Отменить публикацию",
     'back_to_queue': "🔙 К списку очереди",
 
+    # Пакетное превью
+    'batch_publish_all': "✅ Опубликовать все",
+    'batch_distribute_all': "🔄 Распределить все",
+    'batch_delete_all': "🗑 Удалить все",
+
     # Настройки
     'edit_style_prompt': "📝 Стиль и форматирование",
     'edit_group_prompt': "✂️ Обработка для группы",
@@ -162,12 +179,67 @@ SETTINGS = {
     'media_caption_limit': 1020,  # Лимит для подписи к медиа
     'album_processing_delay': 2,  # Задержка обработки альбома (сек)
     'ai_request_timeout': 60,  # Таймаут AI запроса (сек)
+    'ai_health_ttl': 300,  # Время жизни результата проверки AI API (сек)
+    'ai_http_max_connections': 20,  # Лимит соединений HTTP-клиента AI
+    'ai_http_max_keepalive': 10,  # Лимит keep-alive соединений HTTP-клиента AI
+    'ai_http_keepalive_expiry': 60,  # Время жизни простаивающего соединения (сек)
     'ai_max_tokens': 4000,  # Максимум токенов от AI
     'ai_temperature': 0.7,  # Температура AI
+    'ai_workers': 3,  # Количество фоновых AI-воркеров
+    'ai_job_queue_file': 'data/ai_jobs.json',  # Персистентная очередь AI-задач
+    'ai_max_concurrency': 5,  # Максимум одновременных запросов к AI
+    'bulk_forward_window': 3,  # Окно сбора пакетной пересылки (сек)
+    'batch_page_size': 5,  # Постов на странице пакетного превью
+    'queue_page_size': 10,  # Постов на странице очереди
+    'slot_min_spacing_minutes': 30,  # Минимальный интервал между постами (мин)
+    'slot_max_posts': 3,  # Максимум постов в одном слоте
     'deepseek_model': 'deepseek-chat',  # Модель DeepSeek
     'deepseek_base_url': 'https://api.deepseek.com',
+    # Дополнительные OpenAI-совместимые провайдеры:
+    # {'name': ..., 'base_url': ..., 'model': ..., 'api_key_env': 'ИМЯ_ПЕРЕМЕННОЙ', 'supports_n': True}
+    'ai_providers': [],
+    'ai_provider_window': 50,  # Запросов в скользящей статистике провайдера
+    'ai_provider_stats_ttl': 300,  # Сколько секунд помнить статистику провайдера
+    'ai_breaker_failures': 3,  # Ошибок подряд до отключения провайдера
+    'ai_breaker_cooldown': 60,  # Время отключения провайдера (сек)
+    'ai_hedge_after': 8,  # Страхующий запрос другому провайдеру через (сек), 0 - выкл.
+    'prompt_check_interval': 5,  # Как часто проверять файлы промптов на изменения (сек)
+    'ai_improvement_session_ttl': 1800,  # Сколько жить диалогу доработки поста (сек)
+    'ai_improvement_max_rounds': 8,  # Раундов доработки в одном диалоге
+    'ai_improvement_patch': True,  # Доработка правками ИСКАТЬ/ЗАМЕНИТЬ вместо полного текста
+    'ai_candidates': 1,  # Вариантов превью за один запрос к AI (1 - без вариантов)
+    'ai_batch_token_budget': 1500,  # Оценка входных токенов на один пакетный запрос
+    'ai_batch_max_items': 8,  # Максимум текстов в одном пакетном запросе
+    'preclassifier_enabled': True,  # Простые посты оформлять локально, без AI
+    'preclassifier_short_length': 80,  # Текст не длиннее - только локальное форматирование
+    'preclassifier_formatted_length': 600,  # Уже оформленный текст не длиннее - без AI
+    'usage_stats_file': 'data/ai_usage.json',  # Почасовая статистика токенов AI
+    'usage_retention_days': 30,  # Сколько дней хранить статистику токенов
+    # Цены за миллион токенов (USD): вход, вход из кэша, выход
+    'ai_token_prices': {'input': 0.27, 'input_cached': 0.07, 'output': 1.10},
     'log_level': 'INFO',  # Уровень логирования
     'log_file': 'bot.log',  # Файл логов
+    'scheduler_check_interval': 60,  # Интервал проверки очереди планировщиком (сек)
+    # Общая база аренд и очереди постов для нескольких экземпляров (пусто - один экземпляр).
+    # journal_dir, archive_dir и ai_job_queue_file у каждого экземпляра должны быть свои
+    'scheduler_lease_db': '',
+    'scheduler_lease_ttl': 120,  # Время аренды готового поста (сек)
+    'scheduler_lease_batch': 20,  # Максимум постов, захватываемых за одну проверку
+    'config_data_file': 'data/config.json',  # Переопределения настроек и расписания
+    'config_watch_interval': 10,  # Интервал проверки изменений конфигурации (сек)
+    'extra_admin_ids': [],  # Дополнительные админы (кроме MY_ID)
+    'callback_dedup_ttl': 3,  # Окно отсева повторных нажатий кнопок (сек)
+    'storage_compaction_interval': 3600,  # Интервал компактизации хранилища (сек)
+    'pending_post_ttl_hours': 48,  # Время жизни брошенных превью (ч)
+    'published_post_ttl_hours': 24,  # Время жизни опубликованных постов в памяти (ч)
+    'cancelled_post_ttl_hours': 24,  # Время жизни отмененных постов в памяти (ч)
+    'archive_max_entries': 1000,  # Размер компактного архива в памяти
+    'archive_dir': 'data/archive',  # Архив опубликованных постов (сегменты + индекс)
+    'archive_segment_size': 4 * 1024 * 1024,  # Размер сегмента архива (байт)
+    'archive_search_limit': 10,  # Максимум результатов поиска по архиву
+    'journal_dir': 'data/journal',  # Снимок и журнал изменений хранилища постов
+    'journal_commit_window': 0.05,  # Окно группового коммита журнала (сек)
+    'journal_snapshot_every': 1000,  # Записей журнала между снимками
     'max_retries': 3,  # Максимум попыток публикации
     'retry_delay': 2  # Задержка между попытками (сек)
 }
@@ -192,82 +264,9 @@ QUICK_SCHEDULE_OPTIONS = [
 
 
 # ===============================
-# 🔧 ФУНКЦИИ ДЛЯ ОБНОВЛЕНИЯ КОНФИГА
+# 🔧 ПРОВЕРКА КОНФИГА
 # ===============================
-
-def update_admin_id(new_admin_id: int) -> bool:
-    """Обновляет ID админа в .env файле"""
-    try:
-        env_path = '.env'
-
-        # Читаем текущий .env файл
-        lines = []
-        if os.path.exists(env_path):
-            with open(env_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-
-        # Обновляем или добавляем MY_ID
-        updated = False
-        for i, line in enumerate(lines):
-            if line.startswith('MY_ID='):
-                lines[i] = f'MY_ID={new_admin_id}\n'
-                updated = True
-                break
-
-        if not updated:
-            lines.append(f'MY_ID={new_admin_id}\n')
-
-        # Записываем обратно
-        with open(env_path, 'w', encoding='utf-8') as f:
-            f.writelines(lines)
-
-        # Обновляем глобальную переменную
-        global ADMIN_ID
-        ADMIN_ID = new_admin_id
-
-        return True
-    except Exception as e:
-        import logging
-        logging.error(f"Ошибка обновления ID админа: {e}")
-        return False
-
-
-def update_group_id(new_group_id: int) -> bool:
-    """Обновляет ID группы в .env файле"""
-    try:
-        env_path = '.env'
-
-        # Читаем текущий .env файл
-        lines = []
-        if os.path.exists(env_path):
-            with open(env_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
-
-        # Обновляем или добавляем GROUP_ID
-        updated = False
-        for i, line in enumerate(lines):
-            if line.startswith('GROUP_ID='):
-                lines[i] = f'GROUP_ID={new_group_id}\n'
-                updated = True
-                break
-
-        if not updated:
-            lines.append(f'GROUP_ID={new_group_id}\n')
-
-        # Записываем обратно
-        with open(env_path, 'w', encoding='utf-8') as f:
-            f.writelines(lines)
-
-        # Обновляем глобальную переменную
-        global GROUP_ID
-        GROUP_ID = new_group_id
-
-        return True
-    except Exception as e:
-        import logging
-        logging.error(f"Ошибка обновления ID группы: {e}")
-        return False
-
+# ID админа и группы меняются на лету через utils.config_store
 
 def validate_config() -> tuple[bool, list[str]]:
     """Проверяет корректность конфигурации"""
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import logging
+import re
+import time
+from datetime import datetime
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from config import MESSAGES, SETTINGS
+from utils.post_archive import post_archive
+
+router = Router()
+logger = logging.getLogger(__name__)
+
+
+def _format_archive_entry(entry: dict) -> str:
+    """Строка результата поиска: номер, дата, ссылка и начало текста"""
+    published_at = datetime.fromisoformat(entry['published_at']).strftime("%d.%m.%Y %H:%M")
+
+    excerpt = re.sub(r'<[^>]+>', '', entry['text']).strip() or "Без текста"
+    if len(excerpt) > 150:
+        excerpt = excerpt[:150] + "..."
+
+    line = f"#{entry['post_id']} · {published_at}"
+
+    # Ссылка на сообщение в супергруппе/канале
+    chat_id = str(entry['chat_id'])
+    if chat_id.startswith('-100') and entry['message_ids']:
+        line += f"\nhttps://t.me/c/{chat_id[4:]}/{entry['message_ids'][0]}"
+
+    return f"{line}\n{excerpt}"
+
+
+@router.message(Command("search"))
+async def cmd_search_archive(message: Message, command: CommandObject):
+    """Поиск по архиву опубликованных постов: /search слова или #хэштег"""
+    query = (command.args or "").strip()
+    if not query:
+        await message.answer(MESSAGES['archive_search_usage'])
+        return
+
+    started = time.perf_counter()
+    try:
+        results = await post_archive.search(query, limit=SETTINGS['archive_search_limit'])
+    except Exception as e:
+        logger.error(f"Ошибка поиска по архиву '{query}': {e}")
+        await message.answer("❌ Ошибка поиска по архиву")
+        return
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if not results:
+        await message.answer(MESSAGES['archive_search_empty'])
+        return
+
+    text = f"🔎 Найдено: {len(results)} ({elapsed_ms:.0f} мс)\n\n"
+    text += "\n\n".join(_format_archive_entry(entry) for entry in results)
+
+    await message.answer(text[:4000], disable_web_page_preview=True)
+    logger.info(f"Поиск по архиву '{query}': {len(results)} результатов за {elapsed_ms:.1f} мс")
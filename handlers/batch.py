@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+import logging
+import re
+from contextlib import AsyncExitStack
+from datetime import timedelta
+from typing import Tuple
+
+from aiogram import Router, F
+from aiogram.types import CallbackQuery
+
+from keyboards import BatchAction, create_batch_preview_keyboard, create_back_to_menu_keyboard
+from config import SETTINGS
+from utils.locks import post_locks
+from utils.post_storage import post_storage
+from utils.time_slots import time_slot_manager
+from utils.clock import clock
+
+router = Router()
+logger = logging.getLogger(__name__)
+
+
+def render_batch_page(batch_id: int, page: int) -> Tuple[str, int, int]:
+    """Формирует текст страницы пакетного превью, возвращает (текст, страница, всего страниц)"""
+    posts = post_storage.get_batch_posts(batch_id)
+    page_size = SETTINGS['batch_page_size']
+    pages = max(1, (len(posts) + page_size - 1) // page_size)
+    page = min(max(page, 0), pages - 1)
+
+    # Делим лимит сообщения поровну между постами страницы
+    excerpt_limit = (SETTINGS['max_preview_length'] - 200) // page_size
+
+    lines = [f"📦 ПАКЕТ #{batch_id}: {len(posts)} постов (стр. {page + 1}/{pages})"]
+    for post in posts[page * page_size:(page + 1) * page_size]:
+        # Убираем HTML, чтобы обрезка не ломала разметку
+        excerpt = re.sub(r'<[^>]+>', '', post['processed_text'] or "") or "Без текста"
+        if len(excerpt) > excerpt_limit:
+            excerpt = excerpt[:excerpt_limit] + "..."
+        lines.append(f"#{post['id']}\n{excerpt}")
+
+    lines.append("━━━━━━━━━━━━━━━━━━━━\nВыберите действие для всего пакета:")
+    return "\n\n".join(lines), page, pages
+
+
+async def send_batch_preview(bot, user_id: int, batch_id: int):
+    """Отправляет одно сообщение с превью всего пакета"""
+    text, page, pages = render_batch_page(batch_id, 0)
+
+    try:
+        await bot.send_message(
+            chat_id=user_id,
+            text=text,
+            reply_markup=create_batch_preview_keyboard(batch_id, page, pages),
+            disable_web_page_preview=True
+        )
+        logger.info(f"Отправлен превью пакета #{batch_id} пользователю {user_id}")
+    except Exception as e:
+        logger.error(f"Ошибка отправки превью пакета #{batch_id}: {e}")
+
+
+@router.callback_query(BatchAction.filter())
+async def handle_batch_action(callback: CallbackQuery, callback_data: BatchAction):
+    """Обработчик действий с пакетом постов"""
+    batch_id = callback_data.batch_id
+    action = callback_data.action
+
+    logger.info(f"Получено действие с пакетом: {action} для пакета #{batch_id}")
+
+    if not post_storage.get_batch(batch_id):
+        await callback.answer("❌ Пакет не найден", show_alert=True)
+        return
+
+    try:
+        if action == "none":
+            await callback.answer()
+
+        elif action == "page":
+            text, page, pages = render_batch_page(batch_id, callback_data.page)
+            await callback.message.edit_text(
+                text=text,
+                reply_markup=create_batch_preview_keyboard(batch_id, page, pages),
+                disable_web_page_preview=True
+            )
+            await callback.answer()
+
+        elif action == "publish_all":
+            await handle_batch_publish_all(callback, batch_id)
+
+        elif action == "distribute_all":
+            await handle_batch_distribute_all(callback, batch_id)
+
+        elif action == "delete_all":
+            await handle_batch_delete_all(callback, batch_id)
+
+        else:
+            logger.warning(f"Неизвестное действие с пакетом: {action}")
+            await callback.answer("❌ Неизвестное действие", show_alert=True)
+
+    except Exception as e:
+        logger.error(f"Ошибка обработки действия {action} для пакета #{batch_id}: {e}")
+        await callback.answer("❌ Произошла ошибка", show_alert=True)
+
+
+async def handle_batch_publish_all(callback: CallbackQuery, batch_id: int):
+    """Публикует все посты пакета"""
+    await callback.answer("🔄 Публикуем пакет...")
+
+    from services.publisher import publish_pending_post
+
+    posts = post_storage.get_batch_posts(batch_id)
+    published = 0
+    already_published = 0
+
+    for post in posts:
+        success = await publish_pending_post(post['id'], bot=callback.bot)
+        if success:
+            published += 1
+        elif success is None:
+            # Пост уже опубликован (повторное нажатие или публикация из превью)
+            already_published += 1
+        else:
+            logger.error(f"Ошибка публикации поста #{post['id']} из пакета #{batch_id}")
+
+    if published + already_published == len(posts):
+        post_storage.remove_batch(batch_id)
+        await callback.message.edit_text(
+            text=f"✅ ПАКЕТ ОПУБЛИКОВАН\n\nОпубликовано постов: {published}",
+            reply_markup=create_back_to_menu_keyboard()
+        )
+    else:
+        text, page, pages = render_batch_page(batch_id, 0)
+        await callback.message.edit_text(
+            text=f"⚠️ Опубликовано {published} из {len(posts)}, остальные остались в пакете\n\n{text}",
+            reply_markup=create_batch_preview_keyboard(batch_id, page, pages),
+            disable_web_page_preview=True
+        )
+
+    logger.info(f"Пакет #{batch_id}: опубликовано {published} из {len(posts)}")
+
+
+async def handle_batch_distribute_all(callback: CallbackQuery, batch_id: int):
+    """Распределяет все посты пакета по слотам расписания"""
+    post_ids = sorted(post['id'] for post in post_storage.get_batch_posts(batch_id))
+
+    async with AsyncExitStack() as stack:
+        # Блокировки публикации постов - по возрастанию ID, чтобы не ждать друг друга по кругу
+        for post_id in post_ids:
+            await stack.enter_async_context(post_locks.lock(('pending', post_id)))
+
+        # Опубликованных или удаленных, пока ждали блокировки, в пакете уже нет
+        posts = post_storage.get_batch_posts(batch_id)
+        if not posts:
+            await callback.answer("❌ В пакете не осталось постов", show_alert=True)
+            return
+
+        start_time = clock.now() + timedelta(minutes=30)
+        publish_times = time_slot_manager.distribute_posts_in_slots(len(posts), start_time)
+
+        if len(publish_times) < len(posts):
+            await callback.answer("❌ Недостаточно слотов в расписании", show_alert=True)
+            return
+
+        for post, publish_time in zip(posts, publish_times):
+            post_storage.schedule_post(
+                processed_text=post['processed_text'],
+                publish_time=publish_time,
+                user_id=post['user_id'],
+                original_message=post.get('original_message'),
+                original_messages=post.get('original_messages')
+            )
+            post_storage.remove_pending_post(post['id'])
+
+        post_storage.remove_batch(batch_id)
+
+    first_time = time_slot_manager.format_datetime_for_user(publish_times[0])
+    last_time = time_slot_manager.format_datetime_for_user(publish_times[-1])
+
+    await callback.message.edit_text(
+        text=f"✅ ПАКЕТ ЗАПЛАНИРОВАН\n\n"
+             f"Постов: {len(posts)}\n"
+             f"📅 С {first_time} по {last_time}",
+        reply_markup=create_back_to_menu_keyboard()
+    )
+    await callback.answer("✅ Посты распределены")
+    logger.info(f"Пакет #{batch_id}: {len(posts)} постов распределено по слотам")
+
+
+async def handle_batch_delete_all(callback: CallbackQuery, batch_id: int):
+    """Удаляет все посты пакета"""
+    posts = post_storage.get_batch_posts(batch_id)
+    for post in posts:
+        post_storage.remove_pending_post(post['id'])
+
+    post_storage.remove_batch(batch_id)
+
+    await callback.message.edit_text(
+        text=f"🗑 ПАКЕТ УДАЛЕН\n\nУдалено постов: {len(posts)}",
+        reply_markup=create_back_to_menu_keyboard()
+    )
+    await callback.answer("🗑 Пакет удален")
+    logger.info(f"Пакет #{batch_id} удален пользователем")
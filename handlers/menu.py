@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import logging
+from typing import Dict, Optional, Tuple
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
 from aiogram.filters import Command, StateFilter
@@ -10,11 +11,14 @@ from keyboards import (
     MenuAction, create_main_menu, create_settings_keyboard,
     create_queue_keyboard, create_back_to_menu_keyboard
 )
-from config import ADMIN_ID, MESSAGES, GROUP_ID
+from config import MESSAGES, SETTINGS
+from utils.config_store import config_store
 from utils.post_storage import post_storage
 from utils.time_slots import time_slot_manager
 
 router = Router()
+# Подключается последним: ловит только то, что не обработали другие роутеры
+fallback_router = Router()
 logger = logging.getLogger(__name__)
 
 
@@ -22,10 +26,6 @@ logger = logging.getLogger(__name__)
 @router.message(F.text.in_(["Меню", "В меню", "/menu"]))
 async def cmd_start(message: Message, state: FSMContext):
     """Обработчик команд /start и /menu"""
-    if message.from_user.id != ADMIN_ID:
-        await message.answer("❌ У вас нет доступа к этому боту")
-        return
-
     await state.set_state(Menu.main)
 
     await message.answer(
@@ -72,7 +72,7 @@ async def show_auto_mode_info(callback: CallbackQuery):
         f"• Покажет превью для подтверждения\n\n"
         f"📋 **Расписание постинга:**\n"
         f"{time_slot_manager.get_schedule_summary()}\n\n"
-        f"Текущая группа: `{GROUP_ID}`"
+        f"Текущая группа: `{config_store.group_id}`"
     )
 
     await callback.message.edit_text(
@@ -90,14 +90,15 @@ async def show_settings(callback: CallbackQuery, state: FSMContext):
 
     # Получаем информацию об админе
     admin_username = "admin"  # Заглушка
-    admin_id = ADMIN_ID
-    group_name = f"Группа {GROUP_ID}"  # Заглушка
+    admin_id = config_store.admin_id
+    group_id = config_store.group_id
+    group_name = f"Группа {group_id}"  # Заглушка
 
     settings_text = (
         f"⚙️ **НАСТРОЙКИ БОТА**\n\n"
         f"👤 Текущий админ: @{admin_username} ({admin_id})\n"
         f"📢 Группа для постов: {group_name}\n"
-        f"ID: `{GROUP_ID}`\n\n"
+        f"ID: `{group_id}`\n\n"
         f"Выберите что настроить:"
     )
 
@@ -107,7 +108,7 @@ async def show_settings(callback: CallbackQuery, state: FSMContext):
             admin_username=admin_username,
             admin_id=admin_id,
             group_name=group_name,
-            group_id=GROUP_ID
+            group_id=group_id
         ),
         parse_mode="Markdown"
     )
@@ -119,60 +120,97 @@ async def show_queue(callback: CallbackQuery, state: FSMContext):
     """Показ очереди постов"""
     await state.set_state(QueueView.viewing)
 
+    # Сообщение пришло с другого экрана - показываем очередь в любом случае
+    _queue_page_hashes.pop((callback.message.chat.id, callback.message.message_id), None)
+    await show_queue_page(callback)
+
+
+# Хэш последнего показанного содержимого для каждого сообщения очереди
+_queue_page_hashes: Dict[Tuple[int, int], int] = {}
+
+
+def _parse_queue_cursor(cursor: Optional[str]) -> Tuple[Optional[int], str]:
+    """Разбирает курсор страницы очереди: (ID поста-якоря, направление)"""
+    directions = {'a': 'after', 'b': 'before', 'f': 'from'}
+    if cursor and cursor[0] in directions and cursor[1:].isdigit():
+        return int(cursor[1:]), directions[cursor[0]]
+    return None, 'from'
+
+
+async def show_queue_page(callback: CallbackQuery, cursor: Optional[str] = None):
+    """Показывает страницу очереди по курсору.
+
+    Сообщение редактируется, только если содержимое страницы изменилось.
+    """
+    anchor_id, direction = _parse_queue_cursor(cursor)
+    page_size = SETTINGS['queue_page_size']
+
     try:
-        scheduled_posts = post_storage.get_scheduled_posts(limit=10)
+        scheduled_posts, start, has_next = post_storage.get_scheduled_page(anchor_id, direction, page_size)
+        total = post_storage.count_scheduled()
     except Exception as e:
         logger.error(f"Ошибка получения очереди постов: {e}")
-        scheduled_posts = []
+        scheduled_posts, start, has_next, total = [], 0, False, 0
 
     if not scheduled_posts:
-        await callback.message.edit_text(
-            text=MESSAGES['queue_empty'],
-            reply_markup=create_back_to_menu_keyboard()
-        )
-        await callback.answer()
-        return
-
-    # Формируем список постов
-    queue_text_lines = [
-        MESSAGES['queue_title'].format(count=len(scheduled_posts)),
-        ""
-    ]
-
-    for idx, post in enumerate(scheduled_posts, 1):
-        # Обрезаем текст поста для превью
-        post_preview = post['processed_text'][:50] if post['processed_text'] else "Без текста"
-        if len(post.get('processed_text', '')) > 50:
-            post_preview += "..."
-
-        try:
-            formatted_time = time_slot_manager.format_datetime_for_user(post['publish_time'])
-        except Exception as e:
-            logger.error(f"Ошибка форматирования времени для поста {post.get('id')}: {e}")
-            formatted_time = "Ошибка времени"
-
-        # ИСПРАВЛЕНО: Убираем лишние HTML теги для корректного отображения
-        queue_text_lines.append(
-            f"📅 {idx}. {formatted_time}\n"
-            f"   \"{post_preview}\""
+        text = MESSAGES['queue_empty']
+        reply_markup = create_back_to_menu_keyboard()
+    else:
+        # Формируем список постов
+        queue_text_lines = [
+            MESSAGES['queue_title'].format(count=total),
+            MESSAGES['queue_page_range'].format(first=start + 1, last=start + len(scheduled_posts), count=total)
+        ]
+
+        for idx, post in enumerate(scheduled_posts, start + 1):
+            # Обрезаем текст поста для превью
+            post_preview = post['processed_text'][:50] if post['processed_text'] else "Без текста"
+            if len(post.get('processed_text', '')) > 50:
+                post_preview += "..."
+
+            try:
+                formatted_time = time_slot_manager.format_datetime_for_user(post['publish_time'])
+            except Exception as e:
+                logger.error(f"Ошибка форматирования времени для поста {post.get('id')}: {e}")
+                formatted_time = "Ошибка времени"
+
+            # ИСПРАВЛЕНО: Убираем лишние HTML теги для корректного отображения
+            queue_text_lines.append(
+                f"📅 {idx}. {formatted_time}\n"
+                f"   \"{post_preview}\""
+            )
+
+        text = "\n\n".join(queue_text_lines)
+        reply_markup = create_queue_keyboard(
+            first_id=scheduled_posts[0]['id'],
+            last_id=scheduled_posts[-1]['id'],
+            has_prev=start > 0,
+            has_next=has_next
         )
 
-    queue_text = "\n\n".join(queue_text_lines)
-
-    # Ограничиваем длину сообщения
-    if len(queue_text) > 4000:
-        queue_text = queue_text[:3900] + "\n\n... (список обрезан)"
+    # Не трогаем сообщение, если страница не изменилась
+    message_key = (callback.message.chat.id, callback.message.message_id)
+    content_hash = hash((text, reply_markup.model_dump_json()))
+    if _queue_page_hashes.get(message_key) == content_hash:
+        await callback.answer("Без изменений")
+        return
 
     # ИСПРАВЛЕНО: Используем обычный текст вместо HTML для избежания ошибок парсинга
     await callback.message.edit_text(
-        text=queue_text,
-        reply_markup=create_queue_keyboard()
+        text=text,
+        reply_markup=reply_markup
     )
+
+    _queue_page_hashes.pop(message_key, None)
+    _queue_page_hashes[message_key] = content_hash
+    if len(_queue_page_hashes) > 100:
+        del _queue_page_hashes[next(iter(_queue_page_hashes))]
+
     await callback.answer()
 
 
 # ДОБАВЛЕНО: Обработчик для неизвестных callback'ов из логов
-@router.callback_query(F.data.startswith("post:"))
+@fallback_router.callback_query(F.data.startswith("post:"))
 async def handle_post_callbacks(callback: CallbackQuery):
     """Обработка callback'ов постов, которые попадают в главное меню"""
     callback_parts = callback.data.split(":")
@@ -215,7 +253,7 @@ async def handle_post_callbacks(callback: CallbackQuery):
 
 
 # Обработка неизвестных callback'ов в меню
-@router.callback_query(StateFilter(Menu.main))
+@fallback_router.callback_query(StateFilter(Menu.main))
 async def handle_unknown_menu_callback(callback: CallbackQuery):
     """Обработка неизвестных callback'ов в главном меню"""
     logger.warning(f"Неизвестный callback в главном меню: {callback.data}")
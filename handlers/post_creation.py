@@ -2,7 +2,7 @@
 import asyncio
 import logging
 from collections import defaultdict
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery
@@ -12,14 +12,20 @@ from aiogram.fsm.context import FSMContext
 
 from states import PostCreation, Menu
 from keyboards import (
-    PostAction, create_post_preview_keyboard, create_main_menu,
+    PostAction, VariantAction, create_post_preview_keyboard, create_main_menu,
     create_back_to_menu_keyboard
 )
-from config import ADMIN_ID, MESSAGES, SETTINGS
+from config import MESSAGES, SETTINGS
+from utils.config_store import config_store
 from utils.post_storage import post_storage
-from services.ai_processor import process_with_ai
+from services.ai_processor import (
+    ai_processor, improve_with_ai, process_candidates_with_ai, process_many_with_ai
+)
+from services.post_classifier import FORMAT, SKIP, post_classifier
 from services.link_extractor import extract_links_from_entities, format_links_for_ai
 from services.media_handler import MediaProcessor
+from services.ai_worker import ai_worker_pool
+from handlers.batch import send_batch_preview
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -27,22 +33,19 @@ logger = logging.getLogger(__name__)
 # Хранилище для медиа-групп
 albums: Dict[str, List[Message]] = defaultdict(list)
 album_timers: Dict[str, asyncio.Task] = {}
+# Отправка подтверждения приема (задача регистрируется до ответа Telegram)
+album_acks: Dict[str, asyncio.Task] = {}
 
-media_processor = MediaProcessor()
+# Буферы пакетной пересылки: (user_id, тип задачи) -> сообщения
+forward_buffers: Dict[tuple, List[Message]] = defaultdict(list)
+forward_timers: Dict[tuple, asyncio.Task] = {}
+forward_acks: Dict[tuple, asyncio.Task] = {}
 
+media_processor = MediaProcessor()
 
-async def show_post_preview(user_id: int, processed_text: str, original_messages: List[Message] = None,
-                            original_message: Message = None):
-    """Показывает превью поста пользователю"""
-    # Добавляем пост в хранилище
-    post_id = post_storage.add_pending_post(
-        processed_text=processed_text,
-        user_id=user_id,
-        original_message=original_message,
-        original_messages=original_messages
-    )
 
-    # Формируем текст превью
+def format_post_preview(post_id: int, processed_text: str) -> str:
+    """Текст превью поста с обрезкой по лимиту"""
     preview_text = (
         f"📋 **ПРЕДПРОСМОТР ПОСТА #{post_id}**\n\n"
         f"{processed_text}\n\n"
@@ -53,94 +56,257 @@ async def show_post_preview(user_id: int, processed_text: str, original_messages
     # Ограничиваем длину
     if len(preview_text) > SETTINGS['max_preview_length']:
         preview_text = preview_text[:SETTINGS['max_preview_length'] - 50] + "...\n\n--- ТЕКСТ ОБРЕЗАН ---"
+    return preview_text
+
+
+def post_preview_keyboard(post_data: dict):
+    """Клавиатура превью с листанием вариантов, если они есть"""
+    variants = post_data.get('variants') or []
+    return create_post_preview_keyboard(post_data['id'], post_data.get('variant', 0), len(variants))
+
+
+def preview_recipient(chat_id: Optional[int] = None, user_id: Optional[int] = None) -> Tuple[int, int]:
+    """Чат для превью и владелец поста - отправитель исходного сообщения.
+
+    Задачи, попавшие в очередь до появления этих параметров, идут главному админу.
+    """
+    chat_id = chat_id or config_store.admin_id
+    return chat_id, user_id or chat_id
+
+
+async def show_post_preview(bot, user_id: int, processed_text: str, original_messages: List[Message] = None,
+                            original_message: Message = None, variants: List[str] = None,
+                            chat_id: Optional[int] = None):
+    """Показывает превью поста пользователю (в chat_id, по умолчанию - в личный чат)"""
+    # Добавляем пост в хранилище
+    post_id = post_storage.add_pending_post(
+        processed_text=processed_text,
+        user_id=user_id,
+        original_message=original_message,
+        original_messages=original_messages,
+        variants=variants
+    )
+    await send_post_preview(bot, chat_id or user_id, post_id)
 
-    keyboard = create_post_preview_keyboard(post_id)
+
+async def send_post_preview(bot, chat_id: int, post_id: int):
+    """Отправляет превью ожидающего поста"""
+    post_data = post_storage.get_pending_post(post_id)
 
     try:
-        from bot import bot
         await bot.send_message(
-            chat_id=user_id,
-            text=preview_text,
-            reply_markup=keyboard,
+            chat_id=chat_id,
+            text=format_post_preview(post_id, post_data['processed_text']),
+            reply_markup=post_preview_keyboard(post_data),
             parse_mode="Markdown",
             disable_web_page_preview=True
         )
-        logger.info(f"Отправлен превью поста #{post_id} пользователю {user_id}")
+        logger.info(f"Отправлен превью поста #{post_id} в чат {chat_id}")
     except Exception as e:
         logger.error(f"Ошибка отправки превью: {e}")
 
 
+async def acknowledge_processing(message: Message) -> dict:
+    """Отправляет быстрое подтверждение приема и возвращает параметры для его удаления"""
+    try:
+        ack = await message.reply(MESSAGES['ai_processing_ack'])
+        return {'ack_chat_id': ack.chat.id, 'ack_message_id': ack.message_id}
+    except Exception as e:
+        logger.warning(f"Не удалось отправить подтверждение обработки: {e}")
+        return {}
+
+
+async def enqueue_ai_job(kind: str, message: Message, messages: List[Message] = None,
+                         ack: dict = None, **params):
+    """Ставит AI-обработку в фоновую очередь, не блокируя обработчик апдейтов"""
+    if ack is None:
+        ack = await acknowledge_processing(message)
+
+    try:
+        # Превью и его правки уходят отправителю: у каждого админа свой чат
+        await ai_worker_pool.submit(
+            kind, messages or [message], **ack,
+            chat_id=message.chat.id, user_id=message.from_user.id, **params
+        )
+    except Exception as e:
+        logger.error(f"Ошибка постановки AI-задачи {kind} в очередь: {e}")
+        await message.reply(MESSAGES['ai_processing_error'])
+
+
+async def _pop_ack(acks: Dict[Any, asyncio.Task], key) -> dict:
+    """Забирает подтверждение буфера, дождавшись его отправки"""
+    task = acks.pop(key, None)
+    return await task if task else {}
+
+
 async def process_album_and_preview(media_group_id: str):
-    """Обрабатывает альбом и показывает превью"""
+    """Дожидается всех частей альбома и ставит его в очередь обработки"""
     await asyncio.sleep(SETTINGS['album_processing_delay'])
 
     if media_group_id not in albums:
         return
 
     album_messages = albums.pop(media_group_id)
-    # Очищаем таймер
-    if media_group_id in album_timers:
-        timer_task = album_timers.pop(media_group_id)
-        if timer_task and not timer_task.done():
-            timer_task.cancel()
+    # Таймер - это текущая задача, просто убираем ссылку на нее
+    album_timers.pop(media_group_id, None)
+    ack = await _pop_ack(album_acks, media_group_id)
 
     if not album_messages:
         return
 
-    try:
-        first_message = album_messages[0]
-        original_text = first_message.caption or ""
-        caption_entities = first_message.caption_entities
+    await enqueue_ai_job('album', album_messages[0], messages=album_messages, ack=ack)
+
+
+async def handle_forwarded_part(message: Message, kind: str):
+    """Копит пересланные подряд сообщения, чтобы обработать их одним пакетом"""
+    key = (message.from_user.id, kind)
+    if key not in forward_buffers:
+        # Без await до регистрации в буфере: следующие части не шлют свое подтверждение
+        forward_acks[key] = asyncio.create_task(acknowledge_processing(message))
+    forward_buffers[key].append(message)
+
+    # Окно сдвигается с каждым новым сообщением
+    if key in forward_timers:
+        forward_timers[key].cancel()
+
+    forward_timers[key] = asyncio.create_task(flush_forward_buffer(key))
+
+
+async def flush_forward_buffer(key: tuple):
+    """Отправляет накопленные пересылки в очередь: одну как обычно, несколько - пакетом"""
+    await asyncio.sleep(SETTINGS['bulk_forward_window'])
+
+    messages = forward_buffers.pop(key, [])
+    forward_timers.pop(key, None)
+    ack = await _pop_ack(forward_acks, key)
+
+    if not messages:
+        return
+
+    kind = key[1]
+    if len(messages) == 1:
+        await enqueue_ai_job(kind, messages[0], ack=ack)
+        return
+
+    prompt_type = 'group_processing' if kind == 'auto' else 'style_formatting'
+    logger.info(f"Пакетная пересылка: {len(messages)} сообщений ({prompt_type})")
+    await enqueue_ai_job('batch', messages[0], messages=messages, ack=ack, prompt_type=prompt_type)
+
+
+def message_ai_input(message: Message) -> Tuple[str, str]:
+    """Текст сообщения и найденные в нем ссылки для запроса к ИИ"""
+    text = message.text or message.caption or ""
+    entities = message.entities or message.caption_entities
+
+    links_data = extract_links_from_entities(text, entities)
+    return text, format_links_for_ai(links_data)
+
+
+def local_post_text(message: Message, prompt_type: str) -> Optional[str]:
+    """Текст превью без AI, если предклассификатор его разрешает, иначе None"""
+    text = message.text or message.caption or ""
+    entities = message.entities or message.caption_entities
+
+    decision = post_classifier.classify(text, entities, prompt_type)
+    if decision == SKIP:
+        return ""
+    if decision == FORMAT:
+        return ai_processor.finalize_html(post_classifier.format_locally(text, entities))
+    return None
+
+
+async def prepare_post_variants(message: Message, prompt_type: str) -> List[str]:
+    """Варианты текста превью: локально для простых постов, иначе через ИИ"""
+    local_text = local_post_text(message, prompt_type)
+    if local_text is not None:
+        return [local_text]
+
+    text, links = message_ai_input(message)
+    logger.info(f"Обрабатываем сообщение через ИИ: {text[:100]}...")
+    logger.info(f"Найденные ссылки: {links}")
+    return await process_candidates_with_ai(text=text, links=links, prompt_type=prompt_type)
+
+
+async def prepare_many_posts(messages: List[Message], prompt_type: str) -> List[str]:
+    """Тексты превью для нескольких сообщений: простые локально, остальные общими AI-запросами"""
+    results = [local_post_text(message, prompt_type) for message in messages]
+    pending = [index for index, result in enumerate(results) if result is None]
+
+    processed = await process_many_with_ai([message_ai_input(messages[index]) for index in pending], prompt_type)
+    for index, text in zip(pending, processed):
+        results[index] = text
+    return results
+
 
-        logger.info(f"Обрабатываем альбом с текстом: {original_text[:100]}...")
+async def show_variants_preview(messages: List[Message], variants: List[str], chat_id: int, user_id: int):
+    """Превью по готовым вариантам текста - общий шаг одиночных, альбомных и накопленных задач.
 
-        # Извлекаем ссылки
-        links_data = extract_links_from_entities(original_text, caption_entities)
-        formatted_links = format_links_for_ai(links_data)
+    Для поста с медиа варианты обрезаются по лимиту подписи, как при публикации.
+    """
+    limit = SETTINGS['media_caption_limit']
+    has_media = any(media_processor.is_supported_media_type(message) for message in messages)
+    if has_media and any(len(variant) > limit for variant in variants):
+        logger.warning(f"Текст длиннее {limit} символов, обрезаем для медиа")
+        variants = [variant if len(variant) <= limit else variant[:limit] + "..." for variant in variants]
+
+    if len(messages) > 1:
+        await show_post_preview(
+            messages[0].bot, user_id, variants[0], original_messages=messages, variants=variants, chat_id=chat_id
+        )
+    else:
+        await show_post_preview(
+            messages[0].bot, user_id, variants[0], original_message=messages[0], variants=variants, chat_id=chat_id
+        )
 
-        logger.info(f"Найденные ссылки в альбоме: {formatted_links}")
 
-        # Обрабатываем через ИИ (промпт 1 - стиль и форматирование)
-        processed_text = await process_with_ai(
-            text=original_text,
-            links=formatted_links,
-            prompt_type='style_formatting'
+async def process_batch_job(messages: List[Message], prompt_type: str,
+                            chat_id: int = None, user_id: int = None):
+    """Обрабатывает пакет сообщений (общими AI-запросами) и показывает один общий превью"""
+    chat_id, user_id = preview_recipient(chat_id, user_id)
+    results = await prepare_many_posts(messages, prompt_type)
+
+    post_ids = [
+        post_storage.add_pending_post(
+            processed_text=result,
+            user_id=user_id,
+            original_message=message
         )
+        for message, result in zip(messages, results)
+    ]
+
+    if not post_ids:
+        logger.error("Пакет не содержит успешно обработанных постов")
+        return
 
-        # Проверяем лимит для медиа
-        if len(processed_text) > SETTINGS['media_caption_limit']:
-            logger.warning(f"Текст слишком длинный ({len(processed_text)} символов), обрезаем для медиа")
-            processed_text = processed_text[:SETTINGS['media_caption_limit']] + "..."
+    batch_id = post_storage.add_batch(post_ids, user_id)
+    await send_batch_preview(messages[0].bot, chat_id, batch_id)
 
-        # Показываем превью
-        await show_post_preview(ADMIN_ID, processed_text, original_messages=album_messages)
+
+async def process_album_job(album_messages: List[Message], chat_id: int = None, user_id: int = None):
+    """Обрабатывает альбом и показывает превью (выполняется в AI-воркере)"""
+    chat_id, user_id = preview_recipient(chat_id, user_id)
+    try:
+        logger.info(f"Обрабатываем альбом с текстом: {(album_messages[0].caption or '')[:100]}...")
+
+        # Промпт 1 - стиль и форматирование (подпись без текста или простая - без ИИ)
+        variants = await prepare_post_variants(album_messages[0], 'style_formatting')
+
+        # Показываем превью (с обрезкой по лимиту подписи)
+        await show_variants_preview(album_messages, variants, chat_id, user_id)
 
     except Exception as e:
         logger.error(f"Ошибка обработки альбома: {e}")
 
 
-async def process_single_message_and_preview(message: Message):
+async def process_single_message_and_preview(message: Message, chat_id: int = None, user_id: int = None):
     """Обрабатывает одиночное сообщение и показывает превью"""
+    chat_id, user_id = preview_recipient(chat_id, user_id)
     try:
-        text = message.text or message.caption or ""
-        entities = message.entities or message.caption_entities
-
-        # Извлекаем ссылки
-        links_data = extract_links_from_entities(text, entities)
-        formatted_links = format_links_for_ai(links_data)
-
-        logger.info(f"Обрабатываем одиночное сообщение: {text[:100]}...")
-        logger.info(f"Найденные ссылки: {formatted_links}")
-
-        # Обрабатываем через ИИ (промпт 1 - стиль и форматирование)
-        processed_text = await process_with_ai(
-            text=text,
-            links=formatted_links,
-            prompt_type='style_formatting'
-        )
+        # Промпт 1 - стиль и форматирование (простые посты - без ИИ)
+        variants = await prepare_post_variants(message, 'style_formatting')
 
         # Показываем превью
-        await show_post_preview(ADMIN_ID, processed_text, original_message=message)
+        await show_variants_preview([message], variants, chat_id, user_id)
 
         logger.info("Одиночное сообщение обработано, отправлен превью")
 
@@ -152,7 +318,7 @@ async def process_single_message_and_preview(message: Message):
 # ОБРАБОТЧИКИ СООБЩЕНИЙ
 # =============================================
 
-@router.message(StateFilter(PostCreation.waiting), F.from_user.id == ADMIN_ID)
+@router.message(StateFilter(PostCreation.waiting))
 async def handle_post_creation_content(message: Message, state: FSMContext):
     """Обработка контента для создания поста"""
 
@@ -160,22 +326,29 @@ async def handle_post_creation_content(message: Message, state: FSMContext):
     editing_post_id = post_storage.get_user_editing_post(message.from_user.id)
     if editing_post_id:
         # Это доработка существующего поста
-        await handle_post_improvement(message, editing_post_id)
+        await enqueue_ai_job('improvement', message, post_id=editing_post_id)
         return
 
     # Это новый пост
     if message.media_group_id:
         # Часть альбома
         await handle_album_part(message)
+    elif message.forward_origin:
+        # Пересылка - возможно, часть пакета
+        await handle_forwarded_part(message, 'single')
     else:
         # Одиночное сообщение или медиа
-        await process_single_message_and_preview(message)
+        await enqueue_ai_job('single', message)
 
 
-@router.message(F.media_group_id & (F.from_user.id == ADMIN_ID))
+@router.message(F.media_group_id)
 async def handle_album_part(message: Message):
     """Обработка части альбома"""
     media_group_id = message.media_group_id
+    if media_group_id not in albums:
+        # Подтверждаем прием один раз на весь альбом; без await до регистрации
+        # в буфере, иначе параллельные части тоже отправят подтверждение
+        album_acks[media_group_id] = asyncio.create_task(acknowledge_processing(message))
     albums[media_group_id].append(message)
 
     logger.info(f"Получена часть альбома {media_group_id} ({len(albums[media_group_id])}/...)")
@@ -190,7 +363,7 @@ async def handle_album_part(message: Message):
     )
 
 
-async def handle_post_improvement(message: Message, post_id: int):
+async def handle_post_improvement(message: Message, post_id: int, chat_id: int = None):
     """Обработка доработки поста"""
     post_data = post_storage.get_pending_post(post_id)
     if not post_data:
@@ -201,29 +374,20 @@ async def handle_post_improvement(message: Message, post_id: int):
         original_text = post_data['processed_text']
         improvement_text = message.text
 
-        combined_text = f"Основной пост:\n{original_text}\n\nДополнения:\n{improvement_text}"
-
-        # Обрабатываем через ИИ с промптом 3 (доработка)
-        processed_text = await process_with_ai(
-            text=combined_text,
-            links="Дополнительная информация для интеграции",
-            prompt_type='post_improvement'
-        )
+        # Обрабатываем через ИИ с промптом 3 (доработка), продолжая диалог поста
+        processed_text = await improve_with_ai(original_text, improvement_text, post_id)
 
-        # Обновляем пост
+        # Обновляем пост: доработанный текст заменяет варианты
         post_storage.update_pending_post(
             post_id=post_id,
             processed_text=processed_text,
+            variants=None,
+            variant=0,
             awaiting_edit=False
         )
 
-        # Показываем новый превью
-        await show_post_preview(
-            user_id=ADMIN_ID,
-            processed_text=processed_text,
-            original_messages=post_data.get('original_messages'),
-            original_message=post_data.get('original_message')
-        )
+        # Показываем новый превью того же поста - диалог доработки продолжится с ним
+        await send_post_preview(message.bot, chat_id or message.chat.id, post_id)
 
         logger.info(f"Пост #{post_id} доработан и показан новый превью")
 
@@ -236,6 +400,34 @@ async def handle_post_improvement(message: Message, post_id: int):
 # CALLBACK ОБРАБОТЧИКИ ПОСТОВ
 # =============================================
 
+@router.callback_query(VariantAction.filter())
+async def handle_variant_switch(callback: CallbackQuery, callback_data: VariantAction):
+    """Листание вариантов превью: текст берется из сохраненных, без запроса к AI"""
+    post_id = callback_data.post_id
+    post_data = post_storage.get_pending_post(post_id)
+    variants = post_data.get('variants') if post_data else None
+    if not variants:
+        await callback.answer("❌ Варианты поста не найдены", show_alert=True)
+        return
+
+    index = callback_data.index % len(variants)
+    if index == post_data.get('variant', 0):
+        await callback.answer()
+        return
+
+    post_storage.update_pending_post(post_id, processed_text=variants[index], variant=index)
+    try:
+        await callback.message.edit_text(
+            text=format_post_preview(post_id, variants[index]),
+            reply_markup=post_preview_keyboard(post_data),
+            parse_mode="Markdown",
+            disable_web_page_preview=True
+        )
+    except Exception as e:
+        logger.error(f"Ошибка показа варианта поста #{post_id}: {e}")
+    await callback.answer(f"Вариант {index + 1} из {len(variants)}")
+
+
 @router.callback_query(PostAction.filter())
 async def handle_post_action(callback: CallbackQuery, callback_data: PostAction, state: FSMContext):
     """Обработчик действий с постом"""
@@ -281,11 +473,13 @@ async def handle_publish_now(callback: CallbackQuery, post_data: dict, post_id:
     try:
         await callback.answer("🔄 Публикуем пост...")
 
-        from services.publisher import publish_post_now
-        success = await publish_post_now(post_data)
+        from services.publisher import publish_pending_post
+        success = await publish_pending_post(post_id, bot=callback.bot)
 
-        if success:
-            post_storage.remove_pending_post(post_id)
+        if success is None:
+            # Пост уже опубликован параллельным нажатием
+            logger.info(f"Пост #{post_id} уже опубликован, повторная публикация пропущена")
+        elif success:
             await callback.message.edit_text(
                 text=f"✅ **ПОСТ ОПУБЛИКОВАН**\n\n"
                      f"Пост #{post_id} успешно опубликован в группу!",
@@ -298,7 +492,7 @@ async def handle_publish_now(callback: CallbackQuery, post_data: dict, post_id:
                 text=f"❌ **ОШИБКА ПУБЛИКАЦИИ**\n\n"
                      f"Не удалось опубликовать пост #{post_id}.\n"
                      f"Проверьте настройки группы и попробуйте еще раз.",
-                reply_markup=create_post_preview_keyboard(post_id),
+                reply_markup=post_preview_keyboard(post_data),
                 parse_mode="Markdown"
             )
             logger.error(f"Ошибка публикации поста #{post_id}")
@@ -309,7 +503,7 @@ async def handle_publish_now(callback: CallbackQuery, post_data: dict, post_id:
             text=f"❌ **КРИТИЧЕСКАЯ ОШИБКА**\n\n"
                  f"Произошла ошибка при публикации поста #{post_id}:\n"
                  f"{str(e)}",
-            reply_markup=create_post_preview_keyboard(post_id),
+            reply_markup=post_preview_keyboard(post_data),
             parse_mode="Markdown"
         )
 
@@ -384,7 +578,7 @@ async def handle_delete_post(callback: CallbackQuery, post_id: int):
 # AUTO MODE (вне FSM)
 # =============================================
 
-@router.message(F.from_user.id == ADMIN_ID)
+@router.message()
 async def handle_auto_mode(message: Message, state: FSMContext):
     """Автоматический режим - обработка любых сообщений вне FSM"""
     current_state = await state.get_state()
@@ -397,7 +591,7 @@ async def handle_auto_mode(message: Message, state: FSMContext):
     # Проверяем доработку поста
     editing_post_id = post_storage.get_user_editing_post(message.from_user.id)
     if editing_post_id:
-        await handle_post_improvement(message, editing_post_id)
+        await enqueue_ai_job('improvement', message, post_id=editing_post_id)
         return
 
     # Автоматическая обработка (режим AUTO)
@@ -405,32 +599,25 @@ async def handle_auto_mode(message: Message, state: FSMContext):
 
     if message.media_group_id:
         await handle_album_part(message)
+    elif message.forward_origin:
+        # Пересылка - возможно, часть пакета
+        await handle_forwarded_part(message, 'auto')
     else:
         # Для AUTO режима используем промпт 2 (обработка для группы)
-        await process_single_for_auto_mode(message)
+        await enqueue_ai_job('auto', message)
 
 
-async def process_single_for_auto_mode(message: Message):
+async def process_single_for_auto_mode(message: Message, chat_id: int = None, user_id: int = None):
     """Обрабатывает одиночное сообщение в AUTO режиме"""
+    chat_id, user_id = preview_recipient(chat_id, user_id)
     try:
-        text = message.text or message.caption or ""
-        entities = message.entities or message.caption_entities
-
-        # Извлекаем ссылки
-        links_data = extract_links_from_entities(text, entities)
-        formatted_links = format_links_for_ai(links_data)
+        logger.info(f"AUTO режим: обрабатываем сообщение: {(message.text or message.caption or '')[:100]}...")
 
-        logger.info(f"AUTO режим: обрабатываем сообщение: {text[:100]}...")
-
-        # Обрабатываем через ИИ (промпт 2 - обработка для группы)
-        processed_text = await process_with_ai(
-            text=text,
-            links=formatted_links,
-            prompt_type='group_processing'
-        )
+        # Промпт 2 - обработка для группы (медиа без подписи - без ИИ)
+        variants = await prepare_post_variants(message, 'group_processing')
 
         # Показываем превью
-        await show_post_preview(ADMIN_ID, processed_text, original_message=message)
+        await show_variants_preview([message], variants, chat_id, user_id)
 
         logger.info("AUTO режим: сообщение обработано, отправлен превью")
 
@@ -443,7 +630,7 @@ async def process_single_for_auto_mode(message: Message):
     F.content_type.in_({
         ContentType.PHOTO, ContentType.VIDEO, ContentType.DOCUMENT,
         ContentType.ANIMATION, ContentType.VOICE, ContentType.VIDEO_NOTE
-    }) & (F.from_user.id == ADMIN_ID)
+    })
 )
 async def handle_auto_mode_media(message: Message, state: FSMContext):
     """Обработка медиа в AUTO режиме"""
@@ -458,4 +645,55 @@ async def handle_auto_mode_media(message: Message, state: FSMContext):
         return  # Обработается в handle_album_part
 
     logger.info(f"AUTO режим: получено медиа от пользователя {message.from_user.id}")
-    await process_single_for_auto_mode(message)
\ No newline at end of file
+    if message.forward_origin:
+        await handle_forwarded_part(message, 'auto')
+    else:
+        await enqueue_ai_job('auto', message)
+
+
+# =============================================
+# РЕГИСТРАЦИЯ ФОНОВЫХ AI-ЗАДАЧ
+# =============================================
+
+async def _run_single_job(messages: List[Message], **params):
+    await process_single_message_and_preview(messages[0], **params)
+
+
+async def _run_auto_job(messages: List[Message], **params):
+    await process_single_for_auto_mode(messages[0], **params)
+
+
+async def _run_previews_batch(job_messages: List[List[Message]], job_params: List[Dict[str, Any]], prompt_type: str):
+    """Накопившиеся одиночные задачи - общими AI-запросами, превью по каждой ее отправителю.
+
+    Общий запрос дает один текст на пост; если нужны варианты (ai_candidates > 1),
+    каждый пост готовится отдельным запросом, как одиночная задача.
+    """
+    messages = [messages[0] for messages in job_messages]
+    if SETTINGS['ai_candidates'] > 1:
+        results = await asyncio.gather(*(prepare_post_variants(message, prompt_type) for message in messages))
+    else:
+        results = [[text] for text in await prepare_many_posts(messages, prompt_type)]
+
+    for message, params, variants in zip(messages, job_params, results):
+        chat_id, user_id = preview_recipient(params.get('chat_id'), params.get('user_id'))
+        await show_variants_preview([message], variants, chat_id, user_id)
+
+
+async def _run_single_batch(job_messages: List[List[Message]], job_params: List[Dict[str, Any]]):
+    await _run_previews_batch(job_messages, job_params, 'style_formatting')
+
+
+async def _run_auto_batch(job_messages: List[List[Message]], job_params: List[Dict[str, Any]]):
+    await _run_previews_batch(job_messages, job_params, 'group_processing')
+
+
+async def _run_improvement_job(messages: List[Message], post_id: int, chat_id: int = None, user_id: int = None):
+    await handle_post_improvement(messages[0], post_id, chat_id=chat_id)
+
+
+ai_worker_pool.register('single', _run_single_job, _run_single_batch)
+ai_worker_pool.register('auto', _run_auto_job, _run_auto_batch)
+ai_worker_pool.register('album', process_album_job)
+ai_worker_pool.register('improvement', _run_improvement_job)
+ai_worker_pool.register('batch', process_batch_job)
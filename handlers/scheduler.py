@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 import logging
-from datetime import datetime, timedelta
-import random
+from datetime import datetime
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
@@ -12,9 +11,11 @@ from keyboards import (
     create_simple_scheduler_keyboard, create_back_to_menu_keyboard,
     create_queue_item_keyboard
 )
-from config import ADMIN_ID, MESSAGES, POSTING_SCHEDULE
+from config import MESSAGES, SCHEDULE_PERIODS
+from utils.locks import post_locks
 from utils.post_storage import post_storage
 from utils.time_slots import time_slot_manager
+from utils.clock import clock
 
 router = Router()
 logger = logging.getLogger(__name__)
@@ -81,10 +82,10 @@ async def handle_queue_action(callback: CallbackQuery, callback_data: QueueActio
     logger.info(f"Получено действие с очередью: {action}, post_id: {post_id}")
 
     try:
-        if action == "refresh":
-            # Обновление списка очереди
-            from handlers.menu import show_queue
-            await show_queue(callback, state)
+        if action in ("refresh", "page"):
+            # Обновление или листание списка очереди
+            from handlers.menu import show_queue_page
+            await show_queue_page(callback, callback_data.cursor)
 
         elif action == "publish_now" and post_id:
             # Публикация поста немедленно из очереди
@@ -115,12 +116,13 @@ async def handle_queue_publish_now(callback: CallbackQuery, post_id: int, state:
             await callback.answer("❌ Пост не найден", show_alert=True)
             return
 
-        # Публикуем пост
-        from services.publisher import publish_post_now
-        success = await publish_post_now(post_data)
+        # Публикуем пост (параллельно с планировщиком - только один раз)
+        from services.publisher import publish_scheduled_post
+        success = await publish_scheduled_post(post_id, bot=callback.bot)
 
-        if success:
-            post_storage.mark_post_published(post_id)
+        if success is None:
+            await callback.answer("⏳ Пост уже публикуется или опубликован", show_alert=True)
+        elif success:
             await callback.message.edit_text(
                 text=f"✅ **ПОСТ ОПУБЛИКОВАН**\n\n"
                      f"Пост #{post_id} успешно опубликован!",
@@ -192,112 +194,19 @@ async def handle_queue_cancel(callback: CallbackQuery, post_id: int, state: FSMC
 
 
 # =============================================
-# ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ
+# ВЫБОР ВРЕМЕНИ
 # =============================================
 
-def find_next_available_slot(target_time: datetime) -> datetime:
-    """Находит следующий доступный слот после указанного времени"""
-    current = target_time
-    weekday_names = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-
-    # Ищем в течение 7 дней
-    for days_ahead in range(7):
-        check_date = current + timedelta(days=days_ahead)
-        weekday = check_date.weekday()
-        day_name = weekday_names[weekday]
-
-        day_schedule = POSTING_SCHEDULE.get(day_name, [])
-
-        for slot in day_schedule:
-            start_time = datetime.strptime(slot['start'], '%H:%M').time()
-            end_time = datetime.strptime(slot['end'], '%H:%M').time()
-
-            slot_start = check_date.replace(
-                hour=start_time.hour,
-                minute=start_time.minute,
-                second=0,
-                microsecond=0
-            )
-
-            # Проверяем переход через полночь
-            if end_time < start_time:
-                slot_end = slot_start + timedelta(hours=24)
-                slot_end = slot_end.replace(hour=end_time.hour, minute=end_time.minute)
-            else:
-                slot_end = check_date.replace(
-                    hour=end_time.hour,
-                    minute=end_time.minute,
-                    second=0,
-                    microsecond=0
-                )
-
-            # Если слот начинается после целевого времени
-            if slot_start > target_time:
-                # Генерируем случайное время в слоте
-                slot_duration = (slot_end - slot_start).total_seconds()
-                random_offset = random.randint(0, int(slot_duration) // 60)  # В минутах
-                return slot_start + timedelta(minutes=random_offset)
-
-    return None
-
-
 async def handle_day_schedule(callback: CallbackQuery, post_id: int, selected_day: str, time_period: str,
                               state: FSMContext):
-    """Планирует пост на конкретный день в определенное время"""
+    """Планирует пост на ближайший указанный день недели"""
     try:
-        # Находим следующий такой день
-        now = datetime.now()
-        weekday_names = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-        target_weekday = weekday_names.index(selected_day)
-
-        # Ищем ближайший такой день недели
-        current_weekday = now.weekday()
-        days_ahead = (target_weekday - current_weekday) % 7
+        schedule_time = time_slot_manager.time_on_day(selected_day, clock.now())
 
-        if days_ahead == 0:
-            days_ahead = 7  # Следующая неделя если сегодня тот же день
-
-        target_date = now + timedelta(days=days_ahead)
-
-        # Получаем расписание для дня
-        day_schedule = POSTING_SCHEDULE.get(selected_day, [])
-        if not day_schedule:
-            await callback.answer("❌ Нет расписания для этого дня", show_alert=True)
+        if not schedule_time:
+            await callback.answer("❌ Нет свободных слотов в этот день", show_alert=True)
             return
 
-        # Выбираем случайный слот из доступных
-        slot = random.choice(day_schedule)
-
-        # Генерируем случайное время в пределах слота
-        start_time = datetime.strptime(slot['start'], '%H:%M').time()
-        end_time = datetime.strptime(slot['end'], '%H:%M').time()
-
-        # Обработка перехода через полночь
-        if end_time < start_time:
-            end_hour = end_time.hour + 24
-        else:
-            end_hour = end_time.hour
-
-        # Генерируем случайное время
-        start_minutes = start_time.hour * 60 + start_time.minute
-        end_minutes = end_hour * 60 + end_time.minute
-
-        random_minutes = random.randint(start_minutes, end_minutes - 1)
-        random_hour = random_minutes // 60
-        random_minute = random_minutes % 60
-
-        # Обработка перехода через полночь
-        if random_hour >= 24:
-            random_hour -= 24
-            target_date += timedelta(days=1)
-
-        schedule_time = target_date.replace(
-            hour=random_hour,
-            minute=random_minute,
-            second=0,
-            microsecond=0
-        )
-
         await schedule_post_and_finish(callback, post_id, schedule_time, state)
 
     except Exception as e:
@@ -308,71 +217,11 @@ async def handle_day_schedule(callback: CallbackQuery, post_id: int, selected_da
 async def handle_quick_time_selection(callback: CallbackQuery, post_id: int, time_slot: str, state: FSMContext):
     """Обрабатывает быстрый выбор времени (утро/вечер/ночь)"""
     try:
-        now = datetime.now()
-        schedule_time = None
-
-        time_ranges = {
-            'morning': (10, 12),  # 10:00-12:00
-            'evening': (19, 22),  # 19:00-22:00
-            'night': (23, 1)  # 23:00-01:00
-        }
-
-        if time_slot not in time_ranges:
+        if time_slot not in SCHEDULE_PERIODS:
             await callback.answer("❌ Неизвестный временной слот", show_alert=True)
             return
 
-        start_hour, end_hour = time_ranges[time_slot]
-
-        # Ищем ближайший подходящий день
-        for days_ahead in range(7):
-            check_date = now + timedelta(days=days_ahead)
-            weekday = check_date.weekday()
-
-            weekday_names = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
-            day_name = weekday_names[weekday]
-
-            day_schedule = POSTING_SCHEDULE.get(day_name, [])
-
-            for slot in day_schedule:
-                slot_start_hour = int(slot['start'].split(':')[0])
-                slot_end_hour = int(slot['end'].split(':')[0])
-
-                # Обработка перехода через полночь
-                if slot_end_hour < slot_start_hour:
-                    slot_end_hour += 24
-
-                # Проверяем пересечение с нужным временем
-                if time_slot == 'night' and start_hour == 23:
-                    if (slot_start_hour >= 23 or slot_end_hour <= 1 or
-                            (slot_start_hour <= 23 and slot_end_hour >= 24)):
-                        if slot_start_hour >= 23:
-                            random_hour = random.randint(23, min(23, slot_end_hour))
-                        else:
-                            random_hour = random.randint(max(0, slot_start_hour), min(1, slot_end_hour))
-
-                        random_minute = random.randint(0, 59)
-                        schedule_time = check_date.replace(hour=random_hour, minute=random_minute, second=0,
-                                                           microsecond=0)
-                        break
-                else:
-                    if (slot_start_hour <= start_hour and slot_end_hour >= end_hour) or \
-                            (slot_start_hour < end_hour and slot_end_hour > start_hour):
-                        actual_start = max(slot_start_hour, start_hour)
-                        actual_end = min(slot_end_hour, end_hour)
-
-                        if actual_start < actual_end:
-                            random_hour = random.randint(actual_start, actual_end - 1)
-                            random_minute = random.randint(0, 59)
-                            schedule_time = check_date.replace(hour=random_hour, minute=random_minute, second=0,
-                                                               microsecond=0)
-                            break
-
-            if schedule_time:
-                # Проверяем, что время не в прошлом
-                if schedule_time > now:
-                    break
-                else:
-                    schedule_time = None
+        schedule_time = time_slot_manager.random_time_in_period(time_slot, clock.now())
 
         if not schedule_time:
             await callback.answer("❌ Не найдено подходящее время в расписании", show_alert=True)
@@ -388,18 +237,12 @@ async def handle_quick_time_selection(callback: CallbackQuery, post_id: int, tim
 async def handle_very_quick_schedule(callback: CallbackQuery, post_id: int, time_slot: str, state: FSMContext):
     """Обрабатывает очень быстрое планирование (30 мин, 1 час)"""
     try:
-        now = datetime.now()
-
-        if time_slot == "30min":
-            target_time = now + timedelta(minutes=30)
-        elif time_slot == "1hour":
-            target_time = now + timedelta(hours=1)
-        else:
+        if time_slot not in ("30min", "1hour"):
             await callback.answer("❌ Неизвестная опция", show_alert=True)
             return
 
-        # Находим ближайший доступный слот
-        schedule_time = find_next_available_slot(target_time)
+        # Находим ближайшее свободное время
+        schedule_time = time_slot_manager.quick_offset(time_slot, clock.now())
 
         if not schedule_time:
             await callback.answer("❌ Нет доступных слотов", show_alert=True)
@@ -415,23 +258,24 @@ async def handle_very_quick_schedule(callback: CallbackQuery, post_id: int, time
 async def schedule_post_and_finish(callback: CallbackQuery, post_id: int, schedule_time: datetime, state: FSMContext):
     """Завершает планирование поста"""
     try:
-        # Получаем данные поста
-        post_data = post_storage.get_pending_post(post_id)
-        if not post_data:
-            await callback.answer("❌ Пост не найден", show_alert=True)
-            return
-
-        # Планируем пост
-        scheduled_id = post_storage.schedule_post(
-            processed_text=post_data['processed_text'],
-            publish_time=schedule_time,
-            user_id=post_data['user_id'],
-            original_message=post_data.get('original_message'),
-            original_messages=post_data.get('original_messages')
-        )
+        # Та же блокировка, что у немедленной публикации: пост уходит либо в группу, либо в очередь
+        async with post_locks.lock(('pending', post_id)):
+            post_data = post_storage.get_pending_post(post_id)
+            if not post_data:
+                await callback.answer("❌ Пост не найден", show_alert=True)
+                return
+
+            # Планируем пост
+            post_storage.schedule_post(
+                processed_text=post_data['processed_text'],
+                publish_time=schedule_time,
+                user_id=post_data['user_id'],
+                original_message=post_data.get('original_message'),
+                original_messages=post_data.get('original_messages')
+            )
 
-        # Удаляем из ожидающих
-        post_storage.remove_pending_post(post_id)
+            # Удаляем из ожидающих
+            post_storage.remove_pending_post(post_id)
 
         # Форматируем время для пользователя
         formatted_time = time_slot_manager.format_datetime_for_user(schedule_time)
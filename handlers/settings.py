@@ -12,11 +12,18 @@ from keyboards import (
     create_admin_confirm_keyboard, create_back_to_settings_keyboard,
     create_back_to_menu_keyboard
 )
-from config import ADMIN_ID, MESSAGES, PROMPT_NAMES, GROUP_ID, update_admin_id, update_group_id
+from config import MESSAGES, PROMPT_NAMES
 from services.ai_processor import ai_processor
+from services.improvement_sessions import improvement_sessions
+from services.post_classifier import post_classifier
+from utils.admin_middleware import admin_middleware
+from utils.config_store import config_store
 from utils.post_storage import post_storage
+from utils.usage_stats import usage_stats
 
 router = Router()
+# Подключается последним: ловит только то, что не обработали другие роутеры
+fallback_router = Router()
 logger = logging.getLogger(__name__)
 
 
@@ -135,7 +142,7 @@ async def reset_prompt(callback: CallbackQuery, callback_data: PromptAction):
         await callback.answer("❌ Ошибка сброса", show_alert=True)
 
 
-@router.message(StateFilter(Settings.editing_prompt), F.from_user.id == ADMIN_ID)
+@router.message(StateFilter(Settings.editing_prompt))
 async def handle_prompt_edit(message: Message, state: FSMContext):
     """Обрабатывает новый текст промпта"""
     data = await state.get_data()
@@ -172,11 +179,49 @@ async def handle_prompt_edit(message: Message, state: FSMContext):
         await message.reply("❌ Ошибка сохранения")
 
 
+def format_usage_stats(days: int = 7) -> str:
+    """Блок статистики AI: токены по промптам и дням, посты без AI, доработки"""
+    by_prompt = usage_stats.by_prompt(days)
+    lines = [f"🤖 **AI за {days} дн.:**" if by_prompt else f"🤖 AI-запросов за {days} дн. не было"]
+    for prompt_type, totals in sorted(by_prompt.items()):
+        # Имена без подчеркиваний, чтобы не ломать Markdown
+        name = PROMPT_NAMES.get(prompt_type, prompt_type.replace('_', ' '))
+        cached = totals['cached_tokens'] / totals['prompt_tokens'] if totals['prompt_tokens'] else 0
+        lines.append(
+            f"• {name}: {totals['calls']} запр. (ошибок {totals['errors']}), "
+            f"{totals['prompt_tokens'] + totals['completion_tokens']} ток., "
+            f"кэш {cached:.0%}, ~{totals['latency'] / totals['calls']:.1f} с, "
+            f"${usage_stats.cost(totals):.4f}"
+        )
+
+    classified = post_classifier.get_stats()
+    lines.append(
+        f"⚡ Без ИИ: {classified['skip'] + classified['format']} из {classified['total']} постов "
+        f"({classified['bypass_rate']:.0%}): без текста {classified['skip']}, оформлено локально {classified['format']}"
+    )
+    sessions = improvement_sessions.stats
+    lines.append(
+        f"✏️ Доработки: новых диалогов {sessions['started']}, продолжено {sessions['continued']}, "
+        f"правками {sessions['patched']} (полным текстом после ошибки {sessions['patch_fallbacks']})"
+    )
+
+    lines.append("")
+    for day, totals in usage_stats.by_day(days):
+        lines.append(
+            f"{day:%d.%m}: {totals['calls']} запр., "
+            f"{totals['prompt_tokens'] + totals['completion_tokens']} ток., "
+            f"${usage_stats.cost(totals):.4f}"
+        )
+    return "\n".join(lines)
+
+
 @router.callback_query(SettingsAction.filter(F.action == "stats"))
 async def show_stats(callback: CallbackQuery):
     """Показывает статистику бота"""
     try:
         stats = post_storage.get_stats()
+        compaction = post_storage.get_compaction_stats()
+        access = admin_middleware.get_stats()
 
         stats_text = (
             f"📊 **СТАТИСТИКА БОТА**\n\n"
@@ -184,8 +229,15 @@ async def show_stats(callback: CallbackQuery):
             f"⏰ Запланированных постов: {stats['scheduled_posts']}\n"
             f"✅ Опубликованных постов: {stats['published_posts']}\n"
             f"📈 Всего обработано: {stats['total_processed']}\n\n"
-            f"👤 Текущий админ: `{ADMIN_ID}`\n"
-            f"📢 Группа: `{GROUP_ID}`"
+            f"🧹 Вытеснено превью: {compaction['evicted_pending']}, "
+            f"в архиве: {compaction['archived_entries']}\n"
+            f"💾 В памяти: {compaction['resident_posts']} постов, "
+            f"~{compaction['resident_bytes'] // 1024} КБ\n\n"
+            f"🚫 Отклонено апдейтов: {access['rejected']} "
+            f"(от {access['rejected_users']} пользователей)\n\n"
+            f"👤 Текущий админ: `{config_store.admin_id}`, всего админов: {access['admins']}\n"
+            f"📢 Группа: `{config_store.group_id}`\n\n"
+            f"{format_usage_stats()}"
         )
 
         await callback.message.edit_text(
@@ -219,13 +271,13 @@ async def start_admin_change(callback: CallbackQuery, state: FSMContext):
     await callback.answer("👤 Отправьте ID нового админа")
 
 
-@router.message(StateFilter(Settings.changing_admin), F.from_user.id == ADMIN_ID)
+@router.message(StateFilter(Settings.changing_admin))
 async def handle_admin_change(message: Message, state: FSMContext):
     """Обрабатывает смену админа"""
     try:
         new_admin_id = int(message.text.strip())
 
-        if new_admin_id == ADMIN_ID:
+        if new_admin_id == config_store.admin_id:
             await message.reply("❌ Вы уже являетесь админом")
             return
 
@@ -256,20 +308,19 @@ async def confirm_admin_change(callback: CallbackQuery, callback_data: AdminActi
 
     try:
         # Обновляем ID админа в конфиге
-        success = update_admin_id(new_admin_id)
+        success = await config_store.set_admin_id(new_admin_id)
 
         if success:
             await callback.message.edit_text(
                 text=f"✅ **АДМИН ИЗМЕНЕН**\n\n"
                      f"Новый админ: `{new_admin_id}`\n\n"
-                     f"Передаю права и перезапускаю бота...",
+                     f"Права переданы, перезапуск не требуется.",
                 parse_mode="Markdown"
             )
 
             # Уведомляем нового админа
             try:
-                from bot import bot
-                await bot.send_message(
+                await callback.bot.send_message(
                     chat_id=new_admin_id,
                     text="🎉 **Вы назначены администратором бота!**\n\n"
                          "Теперь вы можете управлять ботом. Отправьте /start для начала работы.",
@@ -281,10 +332,6 @@ async def confirm_admin_change(callback: CallbackQuery, callback_data: AdminActi
             await callback.answer("✅ Админ изменен")
             await state.clear()
 
-            # Завершаем работу для перезапуска
-            import sys
-            sys.exit(0)
-
         else:
             await callback.answer("❌ Ошибка изменения админа", show_alert=True)
 
@@ -300,7 +347,7 @@ async def start_group_change(callback: CallbackQuery, state: FSMContext):
 
     change_text = (
         f"📢 **СМЕНА ГРУППЫ**\n\n"
-        f"Текущая группа: `{GROUP_ID}`\n\n"
+        f"Текущая группа: `{config_store.group_id}`\n\n"
         f"Отправьте ID новой группы (начинается с -100):"
     )
 
@@ -312,13 +359,13 @@ async def start_group_change(callback: CallbackQuery, state: FSMContext):
     await callback.answer("📢 Отправьте ID новой группы")
 
 
-@router.message(StateFilter(Settings.changing_group), F.from_user.id == ADMIN_ID)
+@router.message(StateFilter(Settings.changing_group))
 async def handle_group_change(message: Message, state: FSMContext):
     """Обрабатывает смену группы"""
     try:
         new_group_id = int(message.text.strip())
 
-        if new_group_id == GROUP_ID:
+        if new_group_id == config_store.group_id:
             await message.reply("❌ Эта группа уже используется")
             return
 
@@ -330,7 +377,7 @@ async def handle_group_change(message: Message, state: FSMContext):
         await message.reply("🧪 Проверяю доступ к группе...")
 
         try:
-            from bot import bot
+            bot = message.bot
             # Пытаемся отправить тестовое сообщение
             test_msg = await bot.send_message(
                 chat_id=new_group_id,
@@ -340,7 +387,7 @@ async def handle_group_change(message: Message, state: FSMContext):
             await bot.delete_message(new_group_id, test_msg.message_id)
 
             # Обновляем ID группы
-            success = update_group_id(new_group_id)
+            success = await config_store.set_group_id(new_group_id)
 
             if success:
                 await message.reply(
@@ -383,14 +430,15 @@ async def show_settings_from_callback(callback: CallbackQuery, state: FSMContext
 
     # Получаем информацию об админе
     admin_username = "admin"  # Заглушка
-    admin_id = ADMIN_ID
-    group_name = f"Группа {GROUP_ID}"  # Заглушка
+    admin_id = config_store.admin_id
+    group_id = config_store.group_id
+    group_name = f"Группа {group_id}"  # Заглушка
 
     settings_text = (
         f"⚙️ **НАСТРОЙКИ БОТА**\n\n"
         f"👤 Текущий админ: @{admin_username} ({admin_id})\n"
         f"📢 Группа для постов: {group_name}\n"
-        f"ID: `{GROUP_ID}`\n\n"
+        f"ID: `{group_id}`\n\n"
         f"Выберите что настроить:"
     )
 
@@ -400,7 +448,7 @@ async def show_settings_from_callback(callback: CallbackQuery, state: FSMContext
             admin_username=admin_username,
             admin_id=admin_id,
             group_name=group_name,
-            group_id=GROUP_ID
+            group_id=group_id
         ),
         parse_mode="Markdown"
     )
@@ -408,7 +456,7 @@ async def show_settings_from_callback(callback: CallbackQuery, state: FSMContext
 
 
 # Обработка неизвестных callback'ов в настройках
-@router.callback_query(StateFilter(Settings))
+@fallback_router.callback_query(StateFilter(Settings))
 async def handle_unknown_settings_callback(callback: CallbackQuery):
     """Обработка неизвестных callback'ов в настройках"""
     logger.warning(f"Неизвестный callback в настройках: {callback.data}")
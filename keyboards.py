@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from aiogram.filters.callback_data import CallbackData
+from functools import lru_cache
 from typing import List, Optional
 from config import BUTTONS
+from utils.post_storage import post_storage
 
 
 # =============================================
@@ -18,6 +20,11 @@ class PostAction(CallbackData, prefix="post"):
     post_id: int
 
 
+class VariantAction(CallbackData, prefix="variant"):
+    post_id: int
+    index: int
+
+
 class ScheduleAction(CallbackData, prefix="schedule"):
     action: str
     post_id: int
@@ -28,6 +35,13 @@ class ScheduleAction(CallbackData, prefix="schedule"):
 class QueueAction(CallbackData, prefix="queue"):
     action: str
     post_id: Optional[int] = None
+    cursor: Optional[str] = None
+
+
+class BatchAction(CallbackData, prefix="batch"):
+    action: str
+    batch_id: int
+    page: int = 0
 
 
 class SettingsAction(CallbackData, prefix="settings"):
@@ -46,55 +60,58 @@ class AdminAction(CallbackData, prefix="admin"):
 
 
 # =============================================
-# ГЛАВНОЕ МЕНЮ
+# ШАБЛОНЫ КЛАВИАТУР
 # =============================================
 
-def create_main_menu() -> InlineKeyboardMarkup:
-    """Создает главное меню"""
-    try:
-        from utils.post_storage import post_storage
-        scheduled_count = len(post_storage.get_scheduled_posts())
-    except Exception:
-        scheduled_count = 0
-
-    buttons = [
-        [InlineKeyboardButton(
-            text=BUTTONS['create_post'],
-            callback_data=MenuAction(action="create_post").pack()
-        )],
-        [
-            InlineKeyboardButton(
-                text=BUTTONS['auto_mode'],
-                callback_data=MenuAction(action="auto_mode_info").pack()
-            ),
-            InlineKeyboardButton(
-                text=BUTTONS['settings'],
-                callback_data=MenuAction(action="settings").pack()
-            )
+class KeyboardTemplate:
+    """Клавиатура для поста, собранная один раз.
+
+    Кнопки и их callback-данные упаковываются при импорте с ID-заглушкой;
+    при выводе готовые кнопки копируются с подставленным ID поста, без
+    повторных CallbackData.pack() и валидации полей.
+    """
+
+    _PLACEHOLDER = 2 ** 62
+
+    def __init__(self, builder):
+        markup = builder(self._PLACEHOLDER)
+        placeholder = str(self._PLACEHOLDER)
+        self._rows = [
+            [(button, button.callback_data.split(placeholder)) for button in row]
+            for row in markup.inline_keyboard
         ]
-    ]
 
-    # Добавляем кнопку очереди с количеством
-    if scheduled_count > 0:
-        queue_text = f"📋 Очередь ({scheduled_count})"
-    else:
-        queue_text = "📋 Очередь"
+    def render(self, post_id: int) -> InlineKeyboardMarkup:
+        post_id = str(post_id)
+        return InlineKeyboardMarkup(inline_keyboard=[
+            [
+                button.model_copy(update={'callback_data': post_id.join(parts)})
+                for button, parts in row
+            ]
+            for row in self._rows
+        ])
 
-    buttons.append([
-        InlineKeyboardButton(
-            text=queue_text,
-            callback_data=MenuAction(action="queue").pack()
-        )
-    ])
 
-    return InlineKeyboardMarkup(inline_keyboard=buttons)
+# =============================================
+# ГЛАВНОЕ МЕНЮ
+# =============================================
+
+def create_main_menu() -> InlineKeyboardMarkup:
+    """Создает главное меню (меняется только подпись кнопки очереди)"""
+    scheduled_count = post_storage.count_scheduled()
+    queue_text = f"📋 Очередь ({scheduled_count})" if scheduled_count > 0 else "📋 Очередь"
+
+    return InlineKeyboardMarkup(inline_keyboard=[
+        *_MAIN_MENU_ROWS,
+        [_QUEUE_BUTTON.model_copy(update={'text': queue_text})]
+    ])
 
 
 # =============================================
 # ПРЕВЬЮ ПОСТА
 # =============================================
 
-def create_post_preview_keyboard(post_id: int) -> InlineKeyboardMarkup:
+def _build_post_preview_keyboard(post_id: int) -> InlineKeyboardMarkup:
     """Создает клавиатуру для превью поста"""
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -126,11 +143,60 @@ def create_post_preview_keyboard(post_id: int) -> InlineKeyboardMarkup:
     ])
 
 
+# =============================================
+# ПАКЕТНОЕ ПРЕВЬЮ
+# =============================================
+
+def create_batch_preview_keyboard(batch_id: int, page: int, pages: int) -> InlineKeyboardMarkup:
+    """Создает клавиатуру пакетного превью с пагинацией и массовыми действиями"""
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton(
+            text="◀️",
+            callback_data=BatchAction(action="page", batch_id=batch_id, page=page - 1).pack()
+        ))
+    navigation.append(InlineKeyboardButton(
+        text=f"{page + 1}/{pages}",
+        callback_data=BatchAction(action="none", batch_id=batch_id, page=page).pack()
+    ))
+    if page < pages - 1:
+        navigation.append(InlineKeyboardButton(
+            text="▶️",
+            callback_data=BatchAction(action="page", batch_id=batch_id, page=page + 1).pack()
+        ))
+
+    return InlineKeyboardMarkup(inline_keyboard=[
+        navigation,
+        [
+            InlineKeyboardButton(
+                text=BUTTONS['batch_publish_all'],
+                callback_data=BatchAction(action="publish_all", batch_id=batch_id).pack()
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                text=BUTTONS['batch_distribute_all'],
+                callback_data=BatchAction(action="distribute_all", batch_id=batch_id).pack()
+            ),
+            InlineKeyboardButton(
+                text=BUTTONS['batch_delete_all'],
+                callback_data=BatchAction(action="delete_all", batch_id=batch_id).pack()
+            )
+        ],
+        [
+            InlineKeyboardButton(
+                text=BUTTONS['back_to_menu'],
+                callback_data=MenuAction(action="main").pack()
+            )
+        ]
+    ])
+
+
 # =============================================
 # УПРОЩЕННЫЙ ПЛАНИРОВЩИК
 # =============================================
 
-def create_simple_scheduler_keyboard(post_id: int) -> InlineKeyboardMarkup:
+def _build_simple_scheduler_keyboard(post_id: int) -> InlineKeyboardMarkup:
     """Создает упрощенный планировщик"""
     return InlineKeyboardMarkup(inline_keyboard=[
         # Дни недели
@@ -216,13 +282,38 @@ def create_simple_scheduler_keyboard(post_id: int) -> InlineKeyboardMarkup:
 # ОЧЕРЕДЬ ПОСТОВ
 # =============================================
 
-def create_queue_keyboard() -> InlineKeyboardMarkup:
-    """Создает клавиатуру для очереди постов"""
+def create_queue_keyboard(
+        first_id: Optional[int] = None,
+        last_id: Optional[int] = None,
+        has_prev: bool = False,
+        has_next: bool = False
+) -> InlineKeyboardMarkup:
+    """Создает клавиатуру для очереди постов.
+
+    Курсор страницы - направление и ID поста на ее границе: a<id> - после поста,
+    b<id> - перед ним, f<id> - начиная с него.
+    """
+    navigation = []
+    if has_prev:
+        navigation.append(InlineKeyboardButton(
+            text="◀️",
+            callback_data=QueueAction(action="page", cursor=f"b{first_id}").pack()
+        ))
+    if has_next:
+        navigation.append(InlineKeyboardButton(
+            text="▶️",
+            callback_data=QueueAction(action="page", cursor=f"a{last_id}").pack()
+        ))
+
     return InlineKeyboardMarkup(inline_keyboard=[
+        *([navigation] if navigation else []),
         [
             InlineKeyboardButton(
                 text=BUTTONS['refresh_queue'],
-                callback_data=QueueAction(action="refresh").pack()
+                callback_data=QueueAction(
+                    action="refresh",
+                    cursor=f"f{first_id}" if first_id else None
+                ).pack()
             )
         ],
         [
@@ -234,7 +325,7 @@ def create_queue_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
-def create_queue_item_keyboard(post_id: int) -> InlineKeyboardMarkup:
+def _build_queue_item_keyboard(post_id: int) -> InlineKeyboardMarkup:
     """Создает клавиатуру для элемента очереди"""
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -268,8 +359,7 @@ def create_queue_item_keyboard(post_id: int) -> InlineKeyboardMarkup:
 # НАСТРОЙКИ
 # =============================================
 
-def create_settings_keyboard(admin_username: str, admin_id: int, group_name: str,
-                             group_id: int) -> InlineKeyboardMarkup:
+def _build_settings_keyboard() -> InlineKeyboardMarkup:
     """Создает клавиатуру настроек"""
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -331,7 +421,7 @@ def create_settings_keyboard(admin_username: str, admin_id: int, group_name: str
 # РЕДАКТИРОВАНИЕ ПРОМПТОВ
 # =============================================
 
-def create_prompt_edit_keyboard(prompt_type: str) -> InlineKeyboardMarkup:
+def _build_prompt_edit_keyboard(prompt_type: str) -> InlineKeyboardMarkup:
     """Создает клавиатуру для редактирования промпта"""
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -387,7 +477,7 @@ def create_admin_confirm_keyboard(new_admin_id: int) -> InlineKeyboardMarkup:
 # НАВИГАЦИЯ
 # =============================================
 
-def create_back_to_menu_keyboard() -> InlineKeyboardMarkup:
+def _build_back_to_menu_keyboard() -> InlineKeyboardMarkup:
     """Создает простую клавиатуру с кнопкой "Назад в меню" """
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -399,7 +489,7 @@ def create_back_to_menu_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
-def create_back_to_settings_keyboard() -> InlineKeyboardMarkup:
+def _build_back_to_settings_keyboard() -> InlineKeyboardMarkup:
     """Создает клавиатуру с кнопкой "Назад к настройкам" """
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -411,7 +501,7 @@ def create_back_to_settings_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
-def create_back_to_queue_keyboard() -> InlineKeyboardMarkup:
+def _build_back_to_queue_keyboard() -> InlineKeyboardMarkup:
     """Создает клавиатуру с кнопкой "Назад к очереди" """
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -447,7 +537,7 @@ def create_confirm_keyboard(callback_data: str, confirm_text: str = "✅ Да",
     ])
 
 
-def create_loading_keyboard() -> InlineKeyboardMarkup:
+def _build_loading_keyboard() -> InlineKeyboardMarkup:
     """Создает заглушечную клавиатуру во время обработки"""
     return InlineKeyboardMarkup(inline_keyboard=[
         [
@@ -505,4 +595,100 @@ def split_keyboard_rows(buttons: List[InlineKeyboardButton],
     rows = []
     for i in range(0, len(buttons), buttons_per_row):
         rows.append(buttons[i:i + buttons_per_row])
-    return rows
\ No newline at end of file
+    return rows
+
+
+# =============================================
+# ГОТОВЫЕ КЛАВИАТУРЫ
+# =============================================
+
+_MAIN_MENU_ROWS = [
+    [InlineKeyboardButton(
+        text=BUTTONS['create_post'],
+        callback_data=MenuAction(action="create_post").pack()
+    )],
+    [
+        InlineKeyboardButton(
+            text=BUTTONS['auto_mode'],
+            callback_data=MenuAction(action="auto_mode_info").pack()
+        ),
+        InlineKeyboardButton(
+            text=BUTTONS['settings'],
+            callback_data=MenuAction(action="settings").pack()
+        )
+    ]
+]
+_QUEUE_BUTTON = InlineKeyboardButton(text="📋 Очередь", callback_data=MenuAction(action="queue").pack())
+
+_BACK_TO_MENU_KEYBOARD = _build_back_to_menu_keyboard()
+_BACK_TO_SETTINGS_KEYBOARD = _build_back_to_settings_keyboard()
+_BACK_TO_QUEUE_KEYBOARD = _build_back_to_queue_keyboard()
+_LOADING_KEYBOARD = _build_loading_keyboard()
+_SETTINGS_KEYBOARD = _build_settings_keyboard()
+
+_POST_PREVIEW_TEMPLATE = KeyboardTemplate(_build_post_preview_keyboard)
+_SCHEDULER_TEMPLATE = KeyboardTemplate(_build_simple_scheduler_keyboard)
+_QUEUE_ITEM_TEMPLATE = KeyboardTemplate(_build_queue_item_keyboard)
+
+
+def create_post_preview_keyboard(post_id: int, variant: int = 0, variants: int = 1) -> InlineKeyboardMarkup:
+    """Создает клавиатуру для превью поста (с листанием, если вариантов несколько)"""
+    markup = _POST_PREVIEW_TEMPLATE.render(post_id)
+    if variants > 1:
+        markup.inline_keyboard.insert(0, [
+            InlineKeyboardButton(
+                text="◀️",
+                callback_data=VariantAction(post_id=post_id, index=(variant - 1) % variants).pack()
+            ),
+            InlineKeyboardButton(
+                text=f"Вариант {variant + 1}/{variants}",
+                callback_data=VariantAction(post_id=post_id, index=variant).pack()
+            ),
+            InlineKeyboardButton(
+                text="▶️",
+                callback_data=VariantAction(post_id=post_id, index=(variant + 1) % variants).pack()
+            )
+        ])
+    return markup
+
+
+def create_simple_scheduler_keyboard(post_id: int) -> InlineKeyboardMarkup:
+    """Создает упрощенный планировщик"""
+    return _SCHEDULER_TEMPLATE.render(post_id)
+
+
+def create_queue_item_keyboard(post_id: int) -> InlineKeyboardMarkup:
+    """Создает клавиатуру для элемента очереди"""
+    return _QUEUE_ITEM_TEMPLATE.render(post_id)
+
+
+def create_settings_keyboard(admin_username: str, admin_id: int, group_name: str,
+                             group_id: int) -> InlineKeyboardMarkup:
+    """Создает клавиатуру настроек"""
+    return _SETTINGS_KEYBOARD
+
+
+@lru_cache(maxsize=None)
+def create_prompt_edit_keyboard(prompt_type: str) -> InlineKeyboardMarkup:
+    """Создает клавиатуру для редактирования промпта"""
+    return _build_prompt_edit_keyboard(prompt_type)
+
+
+def create_back_to_menu_keyboard() -> InlineKeyboardMarkup:
+    """Создает простую клавиатуру с кнопкой "Назад в меню" """
+    return _BACK_TO_MENU_KEYBOARD
+
+
+def create_back_to_settings_keyboard() -> InlineKeyboardMarkup:
+    """Создает клавиатуру с кнопкой "Назад к настройкам" """
+    return _BACK_TO_SETTINGS_KEYBOARD
+
+
+def create_back_to_queue_keyboard() -> InlineKeyboardMarkup:
+    """Создает клавиатуру с кнопкой "Назад к очереди" """
+    return _BACK_TO_QUEUE_KEYBOARD
+
+
+def create_loading_keyboard() -> InlineKeyboardMarkup:
+    """Создает заглушечную клавиатуру во время обработки"""
+    return _LOADING_KEYBOARD
@@ -3,6 +3,10 @@ import asyncio
 import logging
 import sys
 import os
+import time
+
+# Момент запуска процесса - для замера времени до первого апдейта
+BOOT_STARTED = time.perf_counter()
 
 # Исправляем кодировку консоли для Windows
 if sys.platform.startswith('win'):
@@ -18,20 +22,84 @@ if sys.platform.startswith('win'):
         sys.stdout = codecs.getwriter('utf-8')(sys.stdout.detach())
         sys.stderr = codecs.getwriter('utf-8')(sys.stderr.detach())
 
+
+def profile_imports(top: int = 25):
+    """Режим профилирования запуска: время импорта модулей бота.
+
+    Запускает импорт main в отдельном процессе с -X importtime и печатает
+    самые дорогие модули и вклад модулей проекта.
+    """
+    import subprocess
+
+    # Для импорта нужен только синтаксически верный токен - к Telegram никто не обращается
+    env = dict(os.environ)
+    env.setdefault('API_TOKEN', '123456:profile-imports')
+
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        capture_output=True, text=True, encoding='utf-8',
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env
+    )
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((int(self_us), int(cumulative_us), module.strip()))
+
+    if result.returncode != 0 or not rows:
+        print("❌ Не удалось выполнить импорт main:")
+        print(result.stderr[-2000:])
+        return
+
+    total_us = next((cumulative for _, cumulative, module in rows if module == 'main'), 0)
+    print(f"⏱ Импорт main: {total_us / 1000:.1f} мс, модулей: {len(rows)}\n")
+
+    print(f"Самые дорогие модули (собственное время), топ-{top}:")
+    for self_us, cumulative_us, module in sorted(rows, reverse=True)[:top]:
+        print(f"  {self_us / 1000:8.1f} мс  (всего {cumulative_us / 1000:8.1f} мс)  {module}")
+
+    project_prefixes = ('handlers', 'services', 'utils', 'config', 'bot', 'keyboards', 'states')
+    print("\nМодули проекта (с зависимостями):")
+    for self_us, cumulative_us, module in sorted(rows, key=lambda row: -row[1]):
+        if module.split('.')[0] in project_prefixes:
+            print(f"  {cumulative_us / 1000:8.1f} мс  {module}")
+
+
+# Профилирование запуска проверяется до импортов проекта: им нужен рабочий
+# API_TOKEN, а профилировщику - нет (импорт идет в отдельном процессе)
+if __name__ == "__main__" and '--profile-imports' in sys.argv:
+    profile_imports()
+    sys.exit(0)
+
 from bot import bot, dp
-from config import ADMIN_ID, MESSAGES, SETTINGS, validate_config, get_config_summary
+from config import MESSAGES, SETTINGS, validate_config, get_config_summary
 
 # Импорт всех хендлеров
-from handlers import menu, post_creation, settings
+from handlers import menu, post_creation, settings, batch, archive
 from handlers import scheduler
 
 # Импорт сервисов
 from services.scheduler_service import SchedulerService
 from services.ai_processor import ai_processor
+from services.ai_worker import ai_worker_pool
+from utils.admin_middleware import admin_middleware
+from utils.config_store import config_store
+from utils.instance_lock import InstanceLockError, instance_lock
+from utils.locks import callback_dedup
+from utils.post_archive import post_archive
+from utils.post_storage import post_storage
+from utils.storage_journal import storage_journal
+from utils.usage_stats import usage_stats
 
 # Инициализируем планировщик
 scheduler_service = None
 
+# Фоновые задачи запуска (держим ссылки, чтобы их не собрал GC)
+background_tasks = set()
+first_update_seen = False
+
 
 async def create_prompt_files():
     """Создает файлы промптов если их нет"""
@@ -78,28 +146,51 @@ async def on_startup():
             print("DEEPSEEK=ваш_deepseek_api_key")
             sys.exit(1)
 
+        # Каталоги данных принадлежат одному процессу: второй экземпляр с теми же путями не запускаем
+        try:
+            instance_lock.acquire([
+                SETTINGS['journal_dir'],
+                SETTINGS['archive_dir'],
+                os.path.dirname(SETTINGS['ai_job_queue_file']) or '.',
+            ])
+        except InstanceLockError as e:
+            logging.error(str(e))
+            print(f"\n❌ {e}")
+            print("Для нескольких экземпляров задайте каждому свои journal_dir, archive_dir и ai_job_queue_file")
+            sys.exit(1)
+
+        # Применяем сохраненные настройки и расписание, следим за их изменением
+        await config_store.start()
+
+        # Загружаем статистику токенов AI
+        usage_stats.load()
+
         # Создаем файлы промптов если нужно
         await create_prompt_files()
 
-        # Проверяем подключение к AI
-        ai_connected = await ai_processor.validate_connection()
-        if ai_connected:
-            logging.info("✅ Подключение к AI сервису проверено")
-        else:
-            logging.warning("⚠️ Проблемы с подключением к AI сервису")
+        # Проверка AI и прогрев соединений - в фоне, не задерживая обработку апдейтов
+        warmup_task = asyncio.create_task(ai_processor.warmup())
+        background_tasks.add(warmup_task)
+        warmup_task.add_done_callback(background_tasks.discard)
+
+        # Восстанавливаем посты из снимка и журнала до запуска планировщика
+        await storage_journal.start(post_storage, bot)
 
         # Запускаем планировщик
         scheduler_service = SchedulerService(bot)
         await scheduler_service.start()
 
+        # Запускаем фоновые AI-воркеры
+        await ai_worker_pool.start(bot)
+
         # Уведомляем админа о запуске
         try:
             startup_message = f"{MESSAGES['bot_started']}\n\n{get_config_summary()}"
-            await bot.send_message(ADMIN_ID, startup_message, parse_mode="Markdown")
+            await bot.send_message(config_store.admin_id, startup_message, parse_mode="Markdown")
         except Exception as e:
             logging.warning(f"Не удалось отправить стартовое сообщение админу: {e}")
 
-        logging.info("🚀 Бот успешно запущен")
+        logging.info(f"🚀 Бот успешно запущен ({time.perf_counter() - BOOT_STARTED:.2f} с от старта процесса)")
 
     except Exception as e:
         logging.error(f"Ошибка при запуске бота: {e}")
@@ -115,9 +206,30 @@ async def on_shutdown():
         if scheduler_service:
             await scheduler_service.stop()
 
+        # Останавливаем AI-воркеры
+        await ai_worker_pool.stop()
+
+        # Сбрасываем журнал и пишем снимок хранилища
+        await storage_journal.stop()
+
+        # Закрываем архив опубликованных постов
+        post_archive.close()
+
+        # Закрываем HTTP-клиент AI
+        await ai_processor.close()
+
+        # Сохраняем статистику токенов AI
+        await asyncio.to_thread(usage_stats.save)
+
+        # Останавливаем отслеживание конфигурации
+        await config_store.stop()
+
+        # Освобождаем каталоги данных
+        instance_lock.release()
+
         # Уведомляем админа о завершении
         try:
-            await bot.send_message(ADMIN_ID, MESSAGES['bot_stopping'])
+            await bot.send_message(config_store.admin_id, MESSAGES['bot_stopping'])
         except:
             pass  # Игнорируем ошибки при завершении
 
@@ -127,6 +239,17 @@ async def on_shutdown():
         logging.error(f"Ошибка при завершении работы бота: {e}")
 
 
+async def log_first_update(handler, event, data):
+    """Логирует время от старта процесса до первого апдейта"""
+    global first_update_seen
+
+    if not first_update_seen:
+        first_update_seen = True
+        logging.info(f"⏱ Первый апдейт получен через {time.perf_counter() - BOOT_STARTED:.2f} с после старта")
+
+    return await handler(event, data)
+
+
 def setup_logging():
     """Настройка логирования"""
     # Создаем форматтер
@@ -177,15 +300,20 @@ def check_python_version():
 
 
 def check_dependencies():
-    """Проверяет установку зависимостей"""
-    required_packages = ['aiogram', 'openai', 'python-dotenv', 'httpx']
-    missing_packages = []
-
-    for package in required_packages:
-        try:
-            __import__(package)
-        except ImportError:
-            missing_packages.append(package)
+    """Проверяет установку зависимостей (без импорта самих пакетов)"""
+    import importlib.util
+
+    # Имя пакета в pip -> имя импортируемого модуля
+    required_packages = {
+        'aiogram': 'aiogram',
+        'openai': 'openai',
+        'python-dotenv': 'dotenv',
+        'httpx': 'httpx'
+    }
+    missing_packages = [
+        package for package, module in required_packages.items()
+        if importlib.util.find_spec(module) is None
+    ]
 
     if missing_packages:
         print("❌ Отсутствуют необходимые пакеты:")
@@ -209,13 +337,32 @@ async def main():
     logger = logging.getLogger(__name__)
 
     # Проверяем основные настройки
-    if not ADMIN_ID:
+    if not config_store.admin_id:
         logger.error("❌ Не задан ADMIN_ID")
         sys.exit(1)
 
     # Регистрируем события
     dp.startup.register(on_startup)
     dp.shutdown.register(on_shutdown)
+    dp.update.outer_middleware(log_first_update)
+
+    # Посторонние апдейты отбрасываются до обхода роутеров
+    dp.update.outer_middleware(admin_middleware)
+
+    # Повторные нажатия кнопок отвечаются сразу, без повторной обработки
+    dp.callback_query.outer_middleware(callback_dedup)
+
+    # Порядок важен: перехватчики всех сообщений и неизвестных callback'ов - в конце
+    dp.include_routers(
+        menu.router,
+        settings.router,
+        archive.router,
+        scheduler.router,
+        batch.router,
+        post_creation.router,
+        menu.fallback_router,
+        settings.fallback_router
+    )
 
     try:
         logger.info("🚀 Запускаем бота...")
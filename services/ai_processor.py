@@ -1,71 +1,90 @@
 # -*- coding: utf-8 -*-
 import asyncio
+import json
 import logging
 import re
-import os
-from typing import Optional
-from openai import AsyncOpenAI
+import time
+from typing import Dict, List, Optional, Tuple
 from config import (
-    DEEPSEEK_API_KEY, SETTINGS, PROMPT_PATHS, MESSAGES
+    SETTINGS, MESSAGES
 )
+from services.ai_providers import ProviderRouter
+from services.prompt_registry import prompt_registry
+from services.improvement_sessions import (
+    PATCH_RULES, ImprovementSession, PatchError, apply_patch, improvement_sessions
+)
+from utils.usage_stats import usage_stats, usage_tokens
 
 logger = logging.getLogger(__name__)
 
+# Неизменная преамбула к системному промпту: правила вывода для Telegram.
+# Любая правка меняет префикс всех запросов и сбрасывает кэш контекста у провайдера
+OUTPUT_RULES = """ФОРМАТ ОТВЕТА:
+- Переработай присланный контент согласно инструкциям выше
+- Обязательно сохрани все ссылки в правильном HTML формате
+- НЕ используй теги <p>, <div>, <html>, <!doctype> и другие структурные теги
+- Используй только теги: <a>, <b>, <i>, <u>, <s>, <code>, <pre>
+- ОБЯЗАТЕЛЬНО закрывай все открытые теги"""
 
-class AIProcessor:
-    """Класс для обработки текста через ИИ"""
+# Разделитель вариантов, если провайдер не умеет возвращать несколько choices
+VARIANT_SEPARATOR = "===ВАРИАНТ==="
 
-    def __init__(self):
-        self.client = None
-        self._prompts_cache = {}
-
-    async def _get_client(self) -> Optional[AsyncOpenAI]:
-        """Получает клиента OpenAI"""
-        if not self.client:
-            if not DEEPSEEK_API_KEY:
-                logger.error("DEEPSEEK API ключ не найден в конфигурации")
-                return None
-
-            self.client = AsyncOpenAI(
-                api_key=DEEPSEEK_API_KEY,
-                base_url=SETTINGS['deepseek_base_url'],
-                timeout=SETTINGS['ai_request_timeout']
-            )
+# Преамбула пакетного режима: добавляется к системному промпту после OUTPUT_RULES
+BATCH_RULES = """ПАКЕТНЫЙ РЕЖИМ:
+На вход приходит JSON-массив объектов {"id": число, "text": текст, "links": ссылки}.
+Обработай каждый текст независимо от остальных по инструкциям выше.
+Верни только JSON-массив объектов {"id": тот же id, "text": готовый пост} в том же порядке,
+без пояснений и без обрамления ```."""
 
-        return self.client
 
-    async def load_prompt(self, prompt_type: str) -> str:
-        """Загружает промпт из файла с кешированием"""
-        if prompt_type in self._prompts_cache:
-            return self._prompts_cache[prompt_type]
+def estimate_tokens(text: str) -> int:
+    """Грубая оценка числа токенов (кириллица - около трех символов на токен)"""
+    return len(text) // 3 + 1
 
-        filename = PROMPT_PATHS.get(prompt_type)
-        if not filename:
-            logger.warning(f"Неизвестный тип промпта: {prompt_type}")
-            return self._get_default_prompt(prompt_type)
 
-        if not os.path.exists(filename):
-            logger.warning(f"Файл промпта {filename} не найден, используется стандартный")
-            return self._get_default_prompt(prompt_type)
+def parse_batch_reply(reply: str, ids: List[int]) -> Dict[int, str]:
+    """Разбирает JSON-ответ пакетного запроса: id -> текст (только корректные элементы)"""
+    reply = reply.strip()
+    if reply.startswith("```"):
+        reply = reply.split("\n", 1)[-1].rsplit("```", 1)[0]
 
-        # Пробуем разные кодировки
-        encodings = ['utf-8', 'cp1251', 'windows-1251', 'iso-8859-1']
+    items = json.loads(reply)
+    if not isinstance(items, list):
+        raise ValueError("Ответ не JSON-массив")
+
+    results = {}
+    for item in items:
+        if (
+                isinstance(item, dict) and item.get('id') in ids and item['id'] not in results
+                and isinstance(item.get('text'), str) and item['text'].strip()
+        ):
+            results[item['id']] = item['text']
+    return results
 
-        for encoding in encodings:
-            try:
-                with open(filename, 'r', encoding=encoding) as f:
-                    content = f.read().strip()
-                    logger.info(f"Промпт загружен из {filename} (кодировка: {encoding})")
-                    self._prompts_cache[prompt_type] = content
-                    return content
-            except (UnicodeDecodeError, UnicodeError):
-                continue
-            except Exception as e:
-                logger.error(f"Ошибка при чтении {filename}: {e}")
-                continue
 
-        logger.error(f"Не удалось прочитать {filename} ни в одной кодировке")
-        return self._get_default_prompt(prompt_type)
+class AIProcessor:
+    """Класс для обработки текста через ИИ"""
+
+    def __init__(self):
+        # OpenAI-совместимые провайдеры с маршрутизацией по задержке
+        self.router = ProviderRouter()
+        # Последний результат проверки API: (доступен, время проверки)
+        self._health: Optional[tuple] = None
+        # Ограничение числа одновременных запросов к AI
+        self._semaphore = asyncio.Semaphore(SETTINGS['ai_max_concurrency'])
+        # Сколько текстов обработано пакетами и сколько одиночными запросами
+        self.batch_stats = {'batched': 0, 'single': 0}
+
+    async def close(self):
+        """Закрывает HTTP-клиент провайдеров"""
+        await self.router.close()
+
+    async def load_prompt(self, prompt_type: str) -> str:
+        """Текст промпта из реестра (файл перечитывается при изменении) или стандартный"""
+        content = await prompt_registry.get(prompt_type)
+        if content is None:
+            return self._get_default_prompt(prompt_type)
+        return content
 
     def _get_default_prompt(self, prompt_type: str) -> str:
         """Возвращает стандартный промпт для типа"""
@@ -203,10 +222,9 @@ class AIProcessor:
             logger.warning(f"Текст слишком длинный ({len(text)} символов), обрезаем до 4096")
             text = text[:4093] + "..."
 
-        # Проверяем корректность HTML
+        # Проверяем корректность HTML (парсер нужен только здесь - импорт по требованию)
+        import xml.etree.ElementTree as ET
         try:
-            # Простая проверка на корректность HTML тегов
-            import xml.etree.ElementTree as ET
             # Оборачиваем в корневой элемент для проверки
             test_xml = f"<root>{text}</root>"
             ET.fromstring(test_xml)
@@ -215,105 +233,327 @@ class AIProcessor:
             logger.warning(f"Некорректный HTML, исправляем: {e}")
             return self.clean_html_for_telegram(text)
 
-    async def validate_connection(self) -> bool:
-        """Проверяет подключение к DeepSeek API"""
-        client = await self._get_client()
-        if not client:
-            return False
+    async def check_health(self, force: bool = False) -> bool:
+        """Проверяет доступность API дешевым запросом списка моделей.
 
-        try:
-            response = await client.chat.completions.create(
-                model=SETTINGS['deepseek_model'],
-                messages=[{"role": "user", "content": "test"}],
-                max_tokens=1
-            )
-            logger.info("Соединение с DeepSeek API успешно")
-            return True
-        except Exception as e:
-            logger.error(f"Ошибка подключения к DeepSeek API: {e}")
+        API считается доступным, если отвечает хотя бы один провайдер.
+        Результат кешируется на ai_health_ttl секунд.
+        """
+        if not force and self._health is not None:
+            healthy, checked_at = self._health
+            if time.monotonic() - checked_at < SETTINGS['ai_health_ttl']:
+                return healthy
+
+        if not self.router.providers:
+            logger.error("Не настроен ни один AI-провайдер (нет ключа DEEPSEEK)")
             return False
 
+        healthy = False
+        for provider in self.router.providers:
+            try:
+                await provider.get_client(self.router._http()).models.list()
+                healthy = True
+                logger.info(f"Соединение с AI-провайдером {provider.name} успешно")
+            except Exception as e:
+                logger.error(f"Ошибка подключения к AI-провайдеру {provider.name}: {e}")
+
+        self._health = (healthy, time.monotonic())
+        return healthy
+
+    async def validate_connection(self) -> bool:
+        """Проверяет подключение к AI API"""
+        return await self.check_health(force=True)
+
+    async def warmup(self):
+        """Фоновый прогрев: проверка API и установка соединения в пуле"""
+        started = time.perf_counter()
+        if await self.check_health(force=True):
+            logger.info(f"✅ AI сервис готов (прогрев {time.perf_counter() - started:.2f} с)")
+        else:
+            logger.warning("⚠️ Проблемы с подключением к AI сервису")
+
+    async def build_system_prompt(self, prompt_type: str) -> str:
+        """Системное сообщение: промпт плюс неизменная преамбула с правилами вывода.
+
+        Все статичные инструкции собраны здесь, чтобы префикс запроса был
+        побайтно одинаковым между вызовами и попадал в кэш контекста провайдера.
+        """
+        return f"{await self.load_prompt(prompt_type)}\n\n{OUTPUT_RULES}"
+
+    async def _request_choices(
+            self,
+            prompt_type: str,
+            messages: List[Dict[str, str]],
+            max_tokens: Optional[int] = None,
+            **params
+    ) -> List[Tuple[str, Optional[str]]]:
+        """Отправляет запрос лучшему провайдеру и учитывает токены.
+
+        Возвращает сырые варианты ответа парами (текст, finish_reason).
+        """
+        async with self._semaphore:
+            started = time.monotonic()
+            try:
+                response = await self.router.chat_completion(
+                    messages=messages,
+                    max_tokens=max_tokens or SETTINGS['ai_max_tokens'],
+                    temperature=SETTINGS['ai_temperature'],
+                    **params
+                )
+            except Exception:
+                usage_stats.record(prompt_type, latency=time.monotonic() - started, ok=False)
+                raise
+
+        usage_stats.record(prompt_type, response.usage, time.monotonic() - started)
+
+        choices = [(choice.message.content.strip(), choice.finish_reason) for choice in response.choices]
+        prompt_tokens, cached_tokens, _ = usage_tokens(response.usage)
+        logger.info(
+            f"AI обработка завершена успешно через {response.provider} "
+            f"(ответ: {sum(len(content) for content, _ in choices)} символов, вариантов: {len(choices)}, "
+            f"из кэша {cached_tokens} из {prompt_tokens} токенов запроса)"
+        )
+        return choices
+
+    async def _request(self, prompt_type: str, messages: List[Dict[str, str]]) -> str:
+        """Запрос с одним вариантом ответа"""
+        return (await self._request_choices(prompt_type, messages))[0][0]
+
+    @staticmethod
+    def _variants_request(provider, request: Dict) -> Dict:
+        """Для провайдера без n - все варианты одним ответом через VARIANT_SEPARATOR"""
+        count = request.get('n', 1)
+        if count <= 1 or provider.supports_n:
+            return request
+
+        request = {key: value for key, value in request.items() if key != 'n'}
+        # Все варианты придут одним ответом - лимит на каждый
+        request['max_tokens'] = request['max_tokens'] * count
+        messages = list(request['messages'])
+        messages[-1] = {**messages[-1], 'content': messages[-1]['content'] + (
+            f"\n\nПодготовь {count} разных варианта поста. "
+            f"Раздели варианты строкой {VARIANT_SEPARATOR} и больше ничего между ними не пиши."
+        )}
+        request['messages'] = messages
+        return request
+
+    def finalize_html(self, text: str) -> str:
+        """Приводит ответ модели к HTML, который примет Telegram"""
+        return self.validate_telegram_html(self.clean_html_for_telegram(text))
+
     async def process_text(self, text: str, links: str, prompt_type: str = 'style_formatting') -> str:
-        """Обрабатывает текст через DeepSeek AI"""
+        """Обрабатывает текст через AI (лучший доступный провайдер)"""
+        return (await self.process_candidates(text, links, prompt_type, count=1))[0]
+
+    async def process_candidates(
+            self,
+            text: str,
+            links: str,
+            prompt_type: str = 'style_formatting',
+            count: Optional[int] = None
+    ) -> List[str]:
+        """Обрабатывает текст и возвращает до count вариантов за один запрос.
+
+        Провайдер с поддержкой n возвращает варианты отдельными choices, иначе
+        модель пишет их в одном ответе через VARIANT_SEPARATOR (тогда и
+        max_tokens умножается на count). Способ выбирается для того провайдера,
+        который выполняет запрос, в том числе страхующего и резервного.
+        Обрезанные по лимиту токенов варианты отбрасываются. При ошибке
+        возвращается один вариант с текстом ошибки, как в process_text.
+        """
+        if count is None:
+            count = SETTINGS['ai_candidates']
+
         if not text.strip():
             logger.warning("Пустой текст для обработки")
-            return ""
+            return [""]
 
-        # Проверяем соединение
-        client = await self._get_client()
-        if not client:
-            return f"{MESSAGES.get('ai_processing_error', 'Ошибка ИИ')}. Исходный текст:\n{text}"
+        # Проверяем, есть ли куда отправить запрос
+        if not self.router.providers:
+            logger.error("Не настроен ни один AI-провайдер")
+            return [f"{MESSAGES.get('ai_processing_error', 'Ошибка ИИ')}. Исходный текст:\n{text}"]
 
         try:
-            # Загружаем промпт
-            system_prompt = await self.load_prompt(prompt_type)
-
-            # Формируем пользовательский запрос
-            user_content = f"""
-Текст для обработки:
-{text}
-
-Найденные ссылки и упоминания:
-{links}
-
-Переработай этот контент согласно инструкциям в системном промпте.
-Обязательно сохрани все ссылки в правильном HTML формате.
-ВАЖНО: НЕ используй теги <p>, <div>, <html>, <!doctype> и другие структурные теги!
-Используй только теги: <a>, <b>, <i>, <u>, <s>, <code>, <pre>
-ОБЯЗАТЕЛЬНО закрывай все открытые теги!
-"""
-
-            logger.info(f"Отправляем запрос в DeepSeek (тип: {prompt_type}, длина: {len(text)} символов)")
-
-            response = await client.chat.completions.create(
-                model=SETTINGS['deepseek_model'],
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_content}
-                ],
-                max_tokens=SETTINGS['ai_max_tokens'],
-                temperature=SETTINGS['ai_temperature']
-            )
+            system_prompt = await self.build_system_prompt(prompt_type)
 
-            result = response.choices[0].message.content.strip()
-            cleaned_result = self.clean_html_for_telegram(result)
-            validated_result = self.validate_telegram_html(cleaned_result)
+            # Только переменная часть - в конце запроса
+            user_content = f"Текст для обработки:\n{text}\n\nНайденные ссылки и упоминания:\n{links}"
 
-            logger.info(f"AI обработка завершена успешно (результат: {len(validated_result)} символов)")
-            return validated_result
+            params = {'n': count, 'adapt': self._variants_request} if count > 1 else {}
 
-        except Exception as e:
-            logger.error(f"Ошибка AI обработки: {e}")
-            return f"{MESSAGES.get('ai_processing_error', 'Ошибка ИИ')}: {str(e)}\n\nИсходный текст:\n{text}"
+            logger.info(f"Отправляем запрос в AI (тип: {prompt_type}, длина: {len(text)} символов, вариантов: {count})")
 
-    def clear_cache(self):
-        """Очищает кеш промптов"""
-        self._prompts_cache.clear()
-        logger.info("Кеш промптов очищен")
+            choices = await self._request_choices(prompt_type, [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_content}
+            ], **params)
 
-    async def save_prompt(self, prompt_type: str, content: str) -> bool:
-        """Сохраняет промпт в файл"""
-        filename = PROMPT_PATHS.get(prompt_type)
-        if not filename:
-            logger.error(f"Неизвестный тип промпта: {prompt_type}")
-            return False
+            if count > 1 and len(choices) == 1:
+                content, finish_reason = choices[0]
+                parts = content.split(VARIANT_SEPARATOR)
+                # При обрыве по лимиту недописан только последний вариант
+                choices = [(part, 'stop') for part in parts[:-1]] + [(parts[-1], finish_reason)]
 
-        try:
-            # Создаем директорию если не существует
-            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            complete = [content for content, finish_reason in choices if finish_reason != 'length']
+            if len(complete) < len(choices):
+                logger.warning(f"Отброшено вариантов, обрезанных по лимиту токенов: {len(choices) - len(complete)}")
+            # Если обрезано все, лучше показать неполный текст, чем ничего
+            texts = complete or [content for content, _ in choices[:1]]
 
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(content)
+            candidates = []
+            for choice in texts[:count]:
+                candidate = self.finalize_html(choice.strip())
+                if candidate and candidate not in candidates:
+                    candidates.append(candidate)
+            return candidates or [""]
 
-            # Обновляем кеш
-            self._prompts_cache[prompt_type] = content
+        except Exception as e:
+            logger.error(f"Ошибка AI обработки: {e}")
+            return [f"{MESSAGES.get('ai_processing_error', 'Ошибка ИИ')}: {str(e)}\n\nИсходный текст:\n{text}"]
+
+    def pack_batches(self, items: List[Tuple[str, str]]) -> Tuple[List[List[int]], List[int]]:
+        """Раскладывает тексты по пакетам в пределах ai_batch_token_budget.
+
+        Возвращает (пакеты индексов, индексы для одиночной обработки): текст,
+        который один не влезает в бюджет, идет отдельным запросом.
+        """
+        batches, singles = [], []
+        current, current_tokens = [], 0
+        for index, (text, links) in enumerate(items):
+            tokens = estimate_tokens(text) + estimate_tokens(links)
+            if not text.strip() or tokens > SETTINGS['ai_batch_token_budget']:
+                singles.append(index)
+                continue
+            if current and (
+                    current_tokens + tokens > SETTINGS['ai_batch_token_budget']
+                    or len(current) >= SETTINGS['ai_batch_max_items']
+            ):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+
+        # Пакет из одного текста - обычный запрос
+        singles.extend(batch[0] for batch in batches if len(batch) == 1)
+        return [batch for batch in batches if len(batch) > 1], sorted(singles)
+
+    async def process_many(self, items: List[Tuple[str, str]], prompt_type: str = 'style_formatting') -> List[str]:
+        """Обрабатывает несколько текстов (текст, ссылки), упаковывая их в общие запросы.
+
+        Пакет уходит одним запросом с JSON-массивом на входе и на выходе.
+        Тексты, для которых ответ не разобрался или не прошел проверку,
+        обрабатываются одиночными запросами.
+        """
+        results: List[Optional[str]] = [None] * len(items)
+        batches, singles = self.pack_batches(items)
+
+        async def run_batch(batch: List[int]):
+            try:
+                for index, text in (await self._process_batch(items, batch, prompt_type)).items():
+                    results[index] = text
+            except Exception as e:
+                logger.warning(f"Пакетный запрос на {len(batch)} текстов не удался ({e}), обрабатываем по одному")
+
+        await asyncio.gather(*(run_batch(batch) for batch in batches))
+
+        missing = sorted(set(singles) | {index for batch in batches for index in batch if results[index] is None})
+        texts = await asyncio.gather(*(self.process_text(*items[index], prompt_type) for index in missing))
+        for index, text in zip(missing, texts):
+            results[index] = text
+
+        self.batch_stats['batched'] += len(items) - len(missing)
+        self.batch_stats['single'] += len(missing)
+        return results
+
+    async def _process_batch(self, items: List[Tuple[str, str]], batch: List[int], prompt_type: str) -> Dict[int, str]:
+        """Один пакетный запрос; возвращает индекс -> обработанный текст"""
+        system_prompt = f"{await self.build_system_prompt(prompt_type)}\n\n{BATCH_RULES}"
+        payload = json.dumps(
+            [{'id': number, 'text': items[index][0], 'links': items[index][1]} for number, index in enumerate(batch)],
+            ensure_ascii=False
+        )
+
+        logger.info(f"Отправляем пакетный запрос в AI (тип: {prompt_type}, текстов: {len(batch)})")
+        reply = await self._request(prompt_type, [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": payload}
+        ])
+
+        parsed = parse_batch_reply(reply, list(range(len(batch))))
+        if len(parsed) < len(batch):
+            logger.warning(f"Пакетный ответ содержит {len(parsed)} из {len(batch)} текстов")
+        return {batch[number]: self.finalize_html(text) for number, text in parsed.items()}
+
+    async def improve_text(self, post_text: str, additions: str, post_id: Optional[int] = None) -> str:
+        """Дорабатывает готовый пост по дополнениям админа.
+
+        Раунды одного поста продолжают общий диалог (improvement_sessions):
+        в запрос дописываются только новые дополнения, а прежние сообщения
+        остаются кэшируемым префиксом. В режиме ai_improvement_patch модель
+        возвращает правки, которые применяются к посту локально.
+        """
+        if not self.router.providers:
+            logger.error("Не настроен ни один AI-провайдер")
+            return f"{MESSAGES.get('ai_processing_error', 'Ошибка ИИ')}. Исходный текст:\n{post_text}"
 
-            logger.info(f"Промпт {prompt_type} сохранен в {filename}")
-            return True
+        try:
+            patch_mode = SETTINGS['ai_improvement_patch']
+            system_prompt = await self.build_system_prompt('post_improvement')
+            if patch_mode:
+                system_prompt = f"{system_prompt}\n\n{PATCH_RULES}"
+
+            if post_id is None:
+                session = ImprovementSession(system_prompt, post_text)
+            else:
+                # Диалог продолжается, только пока не изменились промпт и режим правок
+                prompt_key = (prompt_registry.version, patch_mode)
+                session = improvement_sessions.get(post_id, system_prompt, post_text, prompt_key)
+
+            logger.info(
+                f"Отправляем запрос доработки в AI (раунд {session.rounds + 1}, "
+                f"дополнения: {len(additions)} символов, правки: {'да' if patch_mode else 'нет'})"
+            )
+
+            # Сообщения раунда в том виде, в каком они ушли модели
+            turns = [{"role": "user", "content": f"Дополнения:\n{additions}"}]
+            reply = await self._request('post_improvement', session.messages + turns)
+
+            if patch_mode:
+                try:
+                    text = apply_patch(session.text, reply)
+                    improvement_sessions.stats['patched'] += 1
+                except PatchError as e:
+                    # Правки не легли на текст - просим пост целиком в том же диалоге
+                    logger.warning(f"Правки не применены ({e}), запрашиваем пост целиком")
+                    improvement_sessions.stats['patch_fallbacks'] += 1
+                    turns += [
+                        {"role": "assistant", "content": reply},
+                        {"role": "user", "content": "Эти правки не применились. Верни пост целиком, без блоков правок."}
+                    ]
+                    reply = await self._request('post_improvement', session.messages + turns)
+                    text = reply
+            else:
+                text = reply
+
+            text = self.finalize_html(text)
+            turns.append({"role": "assistant", "content": reply})
+            improvement_sessions.commit(session, turns, text)
+            return text
 
         except Exception as e:
-            logger.error(f"Ошибка сохранения промпта {prompt_type}: {e}")
-            return False
+            logger.error(f"Ошибка AI доработки: {e}")
+            return f"{MESSAGES.get('ai_processing_error', 'Ошибка ИИ')}: {str(e)}\n\nИсходный текст:\n{post_text}"
+
+    def clear_cache(self):
+        """Очищает кеш промптов"""
+        prompt_registry.invalidate()
+        logger.info("Кеш промптов очищен")
+
+    async def save_prompt(self, prompt_type: str, content: str) -> bool:
+        """Сохраняет промпт в файл (атомарно, вне event loop)"""
+        return await prompt_registry.save(prompt_type, content)
 
 
 # Глобальный экземпляр процессора
@@ -323,4 +563,19 @@ ai_processor = AIProcessor()
 # Функция-обертка для совместимости
 async def process_with_ai(text: str, links: str, prompt_type: str = 'style_formatting') -> str:
     """Обертка для обработки текста через ИИ"""
-    return await ai_processor.process_text(text, links, prompt_type)
\ No newline at end of file
+    return await ai_processor.process_text(text, links, prompt_type)
+
+
+async def process_candidates_with_ai(text: str, links: str, prompt_type: str = 'style_formatting') -> List[str]:
+    """Обертка для обработки текста через ИИ с несколькими вариантами"""
+    return await ai_processor.process_candidates(text, links, prompt_type)
+
+
+async def process_many_with_ai(items: List[Tuple[str, str]], prompt_type: str = 'style_formatting') -> List[str]:
+    """Обертка для пакетной обработки текстов (текст, ссылки) через ИИ"""
+    return await ai_processor.process_many(items, prompt_type)
+
+
+async def improve_with_ai(post_text: str, additions: str, post_id: Optional[int] = None) -> str:
+    """Обертка для доработки поста через ИИ"""
+    return await ai_processor.improve_text(post_text, additions, post_id)
\ No newline at end of file
@@ -0,0 +1,328 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import importlib.util
+import logging
+import os
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional
+
+from config import DEEPSEEK_API_KEY, SETTINGS
+
+if TYPE_CHECKING:
+    import httpx
+    from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+# Подгонка запроса под провайдер: (провайдер, запрос) -> запрос
+RequestAdapter = Callable[['AIProvider', Dict[str, Any]], Dict[str, Any]]
+
+
+class AllProvidersFailed(Exception):
+    """Ни один AI-провайдер не ответил"""
+
+
+def create_http_client() -> 'httpx.AsyncClient':
+    """Общий HTTP-клиент с keep-alive и пулом соединений (HTTP/2, если есть h2)"""
+    import httpx
+
+    http2 = importlib.util.find_spec('h2') is not None
+
+    client = httpx.AsyncClient(
+        http2=http2,
+        timeout=httpx.Timeout(SETTINGS['ai_request_timeout'], connect=10),
+        limits=httpx.Limits(
+            max_connections=SETTINGS['ai_http_max_connections'],
+            max_keepalive_connections=SETTINGS['ai_http_max_keepalive'],
+            keepalive_expiry=SETTINGS['ai_http_keepalive_expiry']
+        )
+    )
+
+    logger.info(f"HTTP-клиент AI создан (HTTP/2: {'да' if http2 else 'нет'})")
+    return client
+
+
+class AIProvider:
+    """OpenAI-совместимый бэкенд со скользящей статистикой и предохранителем.
+
+    Предохранитель (circuit breaker) размыкается после ai_breaker_failures
+    ошибок подряд: провайдер пропускается ai_breaker_cooldown секунд, затем
+    получает один пробный запрос - успех замыкает цепь, ошибка снова размыкает.
+    """
+
+    def __init__(self, name: str, base_url: str, model: str, api_key: Optional[str], supports_n: bool = False):
+        self.name = name
+        self.base_url = base_url
+        self.model = model
+        self.api_key = api_key
+        # Умеет ли API вернуть несколько вариантов ответа (параметр n)
+        self.supports_n = supports_n
+        self.client: Optional['AsyncOpenAI'] = None
+
+        # Последние запросы: (время, задержка, успех; None - запрос отменен)
+        self._samples: deque = deque(maxlen=SETTINGS['ai_provider_window'])
+        self._consecutive_failures = 0
+        self._open_until: Optional[float] = None
+        self._probe_in_flight = False
+
+    def get_client(self, http_client: 'httpx.AsyncClient') -> 'AsyncOpenAI':
+        if self.client is None:
+            from openai import AsyncOpenAI
+
+            # Повторы делает роутер (на другом провайдере), а не клиент
+            self.client = AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                timeout=SETTINGS['ai_request_timeout'],
+                max_retries=0,
+                http_client=http_client
+            )
+        return self.client
+
+    # =============================================
+    # СТАТИСТИКА
+    # =============================================
+
+    def record(self, latency: float, ok: bool):
+        """Учитывает результат запроса"""
+        self._samples.append((time.monotonic(), latency, ok))
+
+        if ok:
+            if self._open_until is not None:
+                logger.info(f"AI-провайдер {self.name} снова доступен")
+            self._consecutive_failures = 0
+            self._open_until = None
+        else:
+            self._consecutive_failures += 1
+            # Ответы запросов, отправленных до отключения, отключение не продлевают
+            if self._consecutive_failures >= SETTINGS['ai_breaker_failures'] and self.state != 'open':
+                self._open_until = time.monotonic() + SETTINGS['ai_breaker_cooldown']
+                logger.warning(
+                    f"AI-провайдер {self.name} отключен на {SETTINGS['ai_breaker_cooldown']} с "
+                    f"после {self._consecutive_failures} ошибок подряд"
+                )
+        self._probe_in_flight = False
+
+    def record_cancelled(self, latency: float):
+        """Учитывает отмененный запрос (проигравший гонку страховки).
+
+        Это не успех и не ошибка: предохранитель не трогаем, задержка идет в
+        статистику как нижняя оценка - провайдер отвечал не быстрее.
+        """
+        self._samples.append((time.monotonic(), latency, None))
+        self._probe_in_flight = False
+
+    def _recent(self) -> List[tuple]:
+        """Запросы за последние ai_provider_stats_ttl секунд.
+
+        Устаревшая статистика забывается, и провайдер, от которого ушел
+        трафик после замедления, снова получает запросы и шанс восстановиться.
+        """
+        cutoff = time.monotonic() - SETTINGS['ai_provider_stats_ttl']
+        return [(latency, ok) for at, latency, ok in self._samples if at >= cutoff]
+
+    def latency_percentile(self, percent: float) -> Optional[float]:
+        """Перцентиль задержки успешных запросов"""
+        latencies = sorted(latency for latency, ok in self._recent() if ok is not False)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percent / 100))]
+
+    @property
+    def error_rate(self) -> float:
+        samples = [ok for _, ok in self._recent() if ok is not None]
+        if not samples:
+            return 0.0
+        return samples.count(False) / len(samples)
+
+    @property
+    def state(self) -> str:
+        if self._open_until is None:
+            return 'closed'
+        return 'open' if time.monotonic() < self._open_until else 'half_open'
+
+    def available(self) -> bool:
+        """Можно ли отправить запрос (в полуоткрытом состоянии - только один пробный)"""
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half_open' and not self._probe_in_flight:
+            return True
+        return False
+
+    def score(self) -> float:
+        """Оценка для маршрутизации (меньше - лучше): p95 с поправкой на долю ошибок.
+
+        Провайдер без статистики получает нулевую оценку, чтобы ее набрать.
+        """
+        p95 = self.latency_percentile(95)
+        if p95 is None:
+            return 0.0
+        return p95 * (1 + 4 * self.error_rate)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'state': self.state,
+            'requests': len(self._recent()),
+            'p50': self.latency_percentile(50),
+            'p95': self.latency_percentile(95),
+            'error_rate': self.error_rate
+        }
+
+
+class ProviderRouter:
+    """Маршрутизация запросов между AI-провайдерами.
+
+    Запрос уходит провайдеру с лучшей оценкой по скользящим p95 и доле ошибок.
+    Если ответа нет дольше ai_hedge_after секунд, параллельно отправляется
+    страхующий запрос следующему провайдеру - берется первый ответ. При ошибке
+    запрос повторяется на следующем доступном провайдере.
+    """
+
+    def __init__(self, providers: Optional[List[AIProvider]] = None):
+        self.providers = providers if providers is not None else self._providers_from_settings()
+        self._http_client: Optional['httpx.AsyncClient'] = None
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @staticmethod
+    def _providers_from_settings() -> List[AIProvider]:
+        """DeepSeek из основных настроек плюс дополнительные из SETTINGS['ai_providers']"""
+        providers = []
+        if DEEPSEEK_API_KEY:
+            providers.append(AIProvider(
+                'deepseek', SETTINGS['deepseek_base_url'], SETTINGS['deepseek_model'], DEEPSEEK_API_KEY
+            ))
+
+        for extra in SETTINGS['ai_providers']:
+            api_key = os.getenv(extra['api_key_env']) if extra.get('api_key_env') else extra.get('api_key')
+            providers.append(AIProvider(
+                extra['name'], extra['base_url'], extra['model'], api_key or 'none', extra.get('supports_n', False)
+            ))
+
+        return providers
+
+    def _http(self) -> 'httpx.AsyncClient':
+        if self._http_client is None:
+            self._http_client = create_http_client()
+        return self._http_client
+
+    async def close(self):
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+            for provider in self.providers:
+                provider.client = None
+
+    def ranked(self) -> List[AIProvider]:
+        """Доступные провайдеры от лучшего к худшему"""
+        return sorted((p for p in self.providers if p.available()), key=lambda p: p.score())
+
+    # =============================================
+    # ЗАПРОСЫ
+    # =============================================
+
+    async def chat_completion(self, adapt: Optional[RequestAdapter] = None, **request):
+        """Выполняет chat.completions.create на лучшем доступном провайдере.
+
+        adapt подгоняет запрос под провайдер, который его выполняет: основной,
+        страхующий или резервный после ошибки.
+        """
+        candidates = self.ranked()
+        if not candidates:
+            raise AllProvidersFailed("Нет доступных AI-провайдеров")
+
+        last_error: Optional[Exception] = None
+        while candidates:
+            primary = candidates.pop(0)
+            secondary = candidates[0] if candidates else None
+            try:
+                if secondary is not None and SETTINGS['ai_hedge_after']:
+                    return await self._hedged(primary, secondary, request, candidates, adapt)
+                return await self._call(primary, request, adapt)
+            except Exception as e:
+                last_error = e
+                logger.warning(f"AI-провайдер {primary.name} не ответил: {e}")
+                # Кандидаты могли отключиться, пока шел запрос
+                candidates = [p for p in candidates if p.available()]
+
+        raise AllProvidersFailed(str(last_error))
+
+    async def _call(self, provider: AIProvider, request: Dict[str, Any], adapt: Optional[RequestAdapter] = None):
+        if provider.state == 'half_open':
+            provider._probe_in_flight = True
+
+        if adapt is not None:
+            request = adapt(provider, request)
+
+        if request.get('n', 1) > 1 and not provider.supports_n:
+            # Провайдер без n вернет один вариант (или ошибку) - не передаем
+            request = {key: value for key, value in request.items() if key != 'n'}
+
+        client = provider.get_client(self._http())
+        started = time.monotonic()
+        try:
+            response = await client.chat.completions.create(model=provider.model, **request)
+        except asyncio.CancelledError:
+            provider.record_cancelled(time.monotonic() - started)
+            raise
+        except Exception:
+            provider.record(time.monotonic() - started, False)
+            raise
+
+        provider.record(time.monotonic() - started, True)
+        response.provider = provider.name
+        return response
+
+    async def _hedged(
+            self,
+            primary: AIProvider,
+            secondary: AIProvider,
+            request: Dict[str, Any],
+            candidates: List[AIProvider],
+            adapt: Optional[RequestAdapter] = None
+    ):
+        """Запрос со страховкой: второй провайдер подключается после задержки"""
+        first = asyncio.create_task(self._call(primary, request, adapt))
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait({first}, timeout=SETTINGS['ai_hedge_after'])
+            if done:
+                return first.result()
+
+            if not secondary.available():
+                return await first
+
+            self.hedges += 1
+            logger.info(f"{primary.name} отвечает дольше {SETTINGS['ai_hedge_after']} с, страхуем через {secondary.name}")
+            # Страхующий провайдер уже задействован - из очереди повторов его убираем
+            candidates.remove(secondary)
+            second = asyncio.create_task(self._call(secondary, request, adapt))
+            tasks.append(second)
+
+            pending = {first, second}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+
+            raise error
+        finally:
+            # Проигравший запрос и оба запроса при отмене вызывающего - снимаем
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'providers': [provider.get_stats() for provider in self.providers],
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins
+        }
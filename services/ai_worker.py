@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import logging
+import os
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from aiogram.types import Message
+from config import SETTINGS
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[..., Awaitable[None]]
+BatchJobHandler = Callable[[List[List[Message]], List[Dict[str, Any]]], Awaitable[None]]
+
+
+class AIWorkerPool:
+    """Пул фоновых воркеров для AI-обработки с персистентной очередью задач"""
+
+    def __init__(self, workers: int = None, queue_file: str = None):
+        self.workers_count = workers or SETTINGS['ai_workers']
+        self.queue_file = queue_file or SETTINGS['ai_job_queue_file']
+        self.bot = None
+        self.is_running = False
+
+        self._handlers: Dict[str, JobHandler] = {}
+        self._batch_handlers: Dict[str, BatchJobHandler] = {}
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+        self._persist_lock = asyncio.Lock()
+
+    def register(self, kind: str, handler: JobHandler, batch_handler: Optional[BatchJobHandler] = None):
+        """Регистрирует обработчик для типа задачи.
+
+        batch_handler получает сообщения нескольких задач сразу и параметры
+        каждой из них: когда в очереди скопились задачи этого типа (поток
+        пересылок, догон после перезапуска), воркер забирает до
+        ai_batch_max_items из них одним вызовом.
+        """
+        self._handlers[kind] = handler
+        if batch_handler:
+            self._batch_handlers[kind] = batch_handler
+
+    async def start(self, bot):
+        """Запускает воркеры и восстанавливает незавершенные задачи"""
+        if self.is_running:
+            logger.warning("Пул AI-воркеров уже запущен")
+            return
+
+        self.bot = bot
+        self.is_running = True
+
+        # Очередь собирается заново: после stop() в _jobs остаются прерванные
+        # и не начатые задачи, и их ID не должны попасть в нее дважды
+        restored = await asyncio.to_thread(self._load_jobs)
+        for job in restored:
+            self._jobs.setdefault(job['id'], job)
+        self._queue = asyncio.Queue()
+        for job_id in self._jobs:
+            self._queue.put_nowait(job_id)
+
+        if restored:
+            logger.info(f"Восстановлено {len(restored)} незавершенных AI-задач")
+
+        self._workers = [
+            asyncio.create_task(self._worker_loop(idx))
+            for idx in range(self.workers_count)
+        ]
+        logger.info(f"Пул AI-воркеров запущен ({self.workers_count} шт.)")
+
+    async def stop(self):
+        """Останавливает воркеры (незавершенные задачи остаются в файле очереди)"""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        logger.info("Пул AI-воркеров остановлен")
+
+    async def submit(self, kind: str, messages: List[Message], **params) -> str:
+        """Ставит задачу в очередь и сразу возвращает ее ID"""
+        if kind not in self._handlers:
+            raise ValueError(f"Неизвестный тип AI-задачи: {kind}")
+
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'messages': [
+                message.model_dump(mode='json', exclude_none=True)
+                for message in messages
+            ],
+            'params': params
+        }
+
+        self._jobs[job['id']] = job
+        await self._persist()
+        self._queue.put_nowait(job['id'])
+
+        logger.info(f"AI-задача {job['kind']} ({job['id'][:8]}) поставлена в очередь, "
+                    f"в очереди: {self._queue.qsize()}")
+        return job['id']
+
+    def get_stats(self) -> Dict[str, int]:
+        """Возвращает состояние очереди"""
+        return {
+            'workers': len(self._workers),
+            'queued': self._queue.qsize(),
+            'in_progress': len(self._jobs) - self._queue.qsize()
+        }
+
+    async def _worker_loop(self, worker_idx: int):
+        """Цикл одного воркера"""
+        try:
+            while self.is_running:
+                job_ids = [await self._queue.get()]
+                job_ids += self._take_queued(job_ids[0])
+                jobs = [self._jobs[job_id] for job_id in dict.fromkeys(job_ids) if job_id in self._jobs]
+                try:
+                    await self._run_jobs(jobs)
+                except asyncio.CancelledError:
+                    # Остановка посреди задачи: она остается в _jobs и в файле
+                    # очереди, start() поставит ее заново
+                    for _ in job_ids:
+                        self._queue.task_done()
+                    await self._persist()
+                    raise
+
+                for job_id in job_ids:
+                    self._jobs.pop(job_id, None)
+                    self._queue.task_done()
+                await self._persist()
+        except asyncio.CancelledError:
+            logger.debug(f"AI-воркер #{worker_idx} остановлен")
+
+    def _take_queued(self, job_id: str) -> List[str]:
+        """Забирает из очереди накопившиеся задачи того же типа, если он поддерживает пакеты.
+
+        Задачи других типов возвращаются в очередь в прежнем порядке - их
+        возьмут свободные воркеры.
+        """
+        job = self._jobs.get(job_id)
+        if not job or job['kind'] not in self._batch_handlers:
+            return []
+
+        taken, others = [], []
+        while not self._queue.empty():
+            queued_id = self._queue.get_nowait()
+            queued = self._jobs.get(queued_id)
+            if (
+                    len(taken) + 1 < SETTINGS['ai_batch_max_items']
+                    and queued and queued['kind'] == job['kind']
+            ):
+                taken.append(queued_id)
+            else:
+                others.append(queued_id)
+
+        for queued_id in others:
+            self._queue.put_nowait(queued_id)
+            self._queue.task_done()
+        return taken
+
+    async def _run_jobs(self, jobs: List[Dict[str, Any]]):
+        """Задачи одного типа с пакетным обработчиком - одним вызовом, одиночная - отдельно"""
+        if not jobs:
+            return
+
+        if len(jobs) > 1:
+            kind = jobs[0]['kind']
+            logger.info(f"Пакетная обработка {len(jobs)} AI-задач {kind}")
+            await self._run_batch(kind, jobs)
+        else:
+            await self._run_job(jobs[0])
+
+    async def _run_batch(self, kind: str, jobs: List[Dict[str, Any]]):
+        """Выполняет несколько задач одного типа пакетным обработчиком"""
+        try:
+            await self._batch_handlers[kind](
+                [self._restore_messages(job) for job in jobs],
+                [self._handler_params(job) for job in jobs]
+            )
+        except Exception as e:
+            logger.error(f"Ошибка пакетной AI-задачи {kind} ({len(jobs)} шт.): {e}")
+
+        for job in jobs:
+            await self._delete_ack(job.get('params') or {})
+
+    def _restore_messages(self, job: Dict[str, Any]) -> List[Message]:
+        return [
+            Message.model_validate(data).as_(self.bot)
+            for data in job['messages']
+        ]
+
+    @staticmethod
+    def _handler_params(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Параметры задачи для обработчика (без служебных полей подтверждения)"""
+        params = dict(job.get('params') or {})
+        params.pop('ack_message_id', None)
+        params.pop('ack_chat_id', None)
+        return params
+
+    async def _run_job(self, job: Dict[str, Any]):
+        """Выполняет задачу и убирает сообщение-подтверждение"""
+        handler = self._handlers.get(job['kind'])
+        if not handler:
+            logger.error(f"Нет обработчика для AI-задачи {job['kind']}")
+            return
+
+        try:
+            await handler(self._restore_messages(job), **self._handler_params(job))
+        except Exception as e:
+            logger.error(f"Ошибка выполнения AI-задачи {job['kind']} ({job['id'][:8]}): {e}")
+
+        await self._delete_ack(job.get('params') or {})
+
+    async def _delete_ack(self, params: Dict[str, Any]):
+        """Удаляет сообщение-подтверждение приема задачи"""
+        ack_message_id = params.get('ack_message_id')
+        ack_chat_id = params.get('ack_chat_id')
+        if ack_message_id and ack_chat_id:
+            try:
+                await self.bot.delete_message(ack_chat_id, ack_message_id)
+            except Exception as e:
+                logger.debug(f"Не удалось удалить сообщение-подтверждение: {e}")
+
+    async def _persist(self):
+        """Сохраняет очередь задач на диск вне event loop.
+
+        Отмена (остановка пула) не прерывает начатую запись: иначе файл
+        остался бы с уже выполненными задачами, и следующий start() повторил бы их.
+        """
+        async with self._persist_lock:
+            snapshot = list(self._jobs.values())
+            write = asyncio.ensure_future(asyncio.to_thread(self._write_jobs, snapshot))
+            try:
+                await asyncio.shield(write)
+            except asyncio.CancelledError:
+                await write
+                raise
+
+    def _write_jobs(self, jobs: List[Dict[str, Any]]):
+        """Атомарно записывает файл очереди"""
+        try:
+            os.makedirs(os.path.dirname(self.queue_file) or '.', exist_ok=True)
+            tmp_path = f"{self.queue_file}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(jobs, f, ensure_ascii=False)
+            os.replace(tmp_path, self.queue_file)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения очереди AI-задач: {e}")
+
+    def _load_jobs(self) -> List[Dict[str, Any]]:
+        """Загружает незавершенные задачи с диска"""
+        if not os.path.exists(self.queue_file):
+            return []
+
+        try:
+            with open(self.queue_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Ошибка чтения очереди AI-задач: {e}")
+            return []
+
+
+# Глобальный экземпляр пула
+ai_worker_pool = AIWorkerPool()
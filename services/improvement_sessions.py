@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import logging
+import re
+import time
+from typing import Any, Dict, List, Optional
+
+from config import SETTINGS
+from utils.post_storage import post_storage
+
+logger = logging.getLogger(__name__)
+
+# Инструкция для режима правок: добавляется к системному промпту доработки
+PATCH_RULES = """РЕЖИМ ПРАВОК:
+Не переписывай пост целиком. Верни только правки, каждую отдельным блоком:
+<<<<<<< ИСКАТЬ
+фрагмент текущего поста дословно
+=======
+новый фрагмент
+>>>>>>> ЗАМЕНИТЬ
+Чтобы добавить текст, найди соседний фрагмент и замени его на фрагмент с дополнением.
+Ничего кроме блоков правок не пиши."""
+
+_PATCH_BLOCK = re.compile(r'<<<<<<< ИСКАТЬ\n(.*?)\n=======\n(.*?)\n?>>>>>>> ЗАМЕНИТЬ', re.DOTALL)
+
+
+class PatchError(Exception):
+    """Ответ модели не удалось применить как набор правок"""
+
+
+def apply_patch(text: str, reply: str) -> str:
+    """Применяет блоки ИСКАТЬ/ЗАМЕНИТЬ к тексту поста"""
+    blocks = _PATCH_BLOCK.findall(reply)
+    if not blocks:
+        raise PatchError("В ответе нет блоков правок")
+
+    for search, replace in blocks:
+        if search not in text:
+            raise PatchError(f"Фрагмент не найден в посте: {search[:50]!r}")
+        text = text.replace(search, replace, 1)
+    return text
+
+
+class ImprovementSession:
+    """Диалог доработки одного поста.
+
+    Хранит сообщения в том виде, в каком они уже отправлялись: каждый новый
+    раунд дописывает в конец только дополнения админа, поэтому весь прежний
+    диалог остается побайтно тем же префиксом и берется провайдером из кэша.
+    """
+
+    def __init__(self, system_prompt: str, post_text: str, prompt_key: Any = None):
+        self.messages: List[Dict[str, str]] = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": f"Основной пост:\n{post_text}"}
+        ]
+        # Текст поста после последнего раунда (то, что видит админ)
+        self.text = post_text
+        self.rounds = 0
+        self.touched = time.monotonic()
+        # Версия системного промпта, с которой начат диалог
+        self.prompt_key = prompt_key
+
+
+class ImprovementSessions:
+    """Сессии доработки по id ожидающего поста.
+
+    Сессия начинается заново, если текст поста изменился в обход нее или
+    сменился системный промпт (prompt_key - версия реестра промптов), если
+    она простаивала дольше ai_improvement_session_ttl (кэш провайдера к этому
+    времени уже остыл) или набрала ai_improvement_max_rounds раундов.
+    Удаление поста из ожидающих закрывает сессию.
+    """
+
+    def __init__(self):
+        self._sessions: Dict[int, ImprovementSession] = {}
+        self.stats = {'started': 0, 'continued': 0, 'patched': 0, 'patch_fallbacks': 0}
+        post_storage.subscribe(self._on_post_event)
+
+    def _on_post_event(self, event: str, post: Dict[str, Any]):
+        if event == 'pending_removed':
+            self._sessions.pop(post['id'], None)
+
+    def get(self, post_id: int, system_prompt: str, post_text: str, prompt_key: Any) -> ImprovementSession:
+        """Текущая сессия поста или новая, если продолжать нельзя"""
+        session = self._sessions.get(post_id)
+        expired = session is not None and (
+            time.monotonic() - session.touched > SETTINGS['ai_improvement_session_ttl']
+            or session.rounds >= SETTINGS['ai_improvement_max_rounds']
+            or session.text != post_text
+            or session.prompt_key != prompt_key
+        )
+
+        if session is None or expired:
+            session = ImprovementSession(system_prompt, post_text, prompt_key)
+            self._sessions[post_id] = session
+            self.stats['started'] += 1
+        else:
+            self.stats['continued'] += 1
+
+        session.touched = time.monotonic()
+        return session
+
+    def commit(self, session: ImprovementSession, turns: List[Dict[str, str]], text: str):
+        """Фиксирует завершенный раунд в диалоге.
+
+        turns - все сообщения раунда, отправленные модели, и ее последний
+        ответ: вместе с неудачными правками и просьбой вернуть пост целиком,
+        чтобы следующий раунд продолжил тот же префикс.
+        """
+        session.messages.extend(turns)
+        session.text = text
+        session.rounds += 1
+
+    def drop(self, post_id: int):
+        self._sessions.pop(post_id, None)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+# Глобальные сессии доработки
+improvement_sessions = ImprovementSessions()
@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
-from typing import List, Optional, Dict, Any
+from typing import TYPE_CHECKING, List, Optional, Dict, Any
 from aiogram import types
-from aiogram.utils.media_group import MediaGroupBuilder
 import logging
 
+if TYPE_CHECKING:
+    from aiogram.utils.media_group import MediaGroupBuilder
+
 logger = logging.getLogger(__name__)
 
 
@@ -65,8 +67,9 @@ class MediaProcessor:
 
         return media_info
 
-    def build_media_group(self, messages: List[types.Message], processed_caption: str) -> MediaGroupBuilder:
+    def build_media_group(self, messages: List[types.Message], processed_caption: str) -> 'MediaGroupBuilder':
         """Строит медиа-группу для отправки (для альбомов)"""
+        from aiogram.utils.media_group import MediaGroupBuilder
         media_group = MediaGroupBuilder()
 
         for idx, msg in enumerate(messages):
@@ -99,8 +102,9 @@ class MediaProcessor:
 
         return media_group
 
-    def build_single_media_group(self, message: types.Message, processed_caption: str) -> MediaGroupBuilder:
+    def build_single_media_group(self, message: types.Message, processed_caption: str) -> 'MediaGroupBuilder':
         """Строит медиа-группу для одиночного медиа (для единообразия отправки)"""
+        from aiogram.utils.media_group import MediaGroupBuilder
         media_group = MediaGroupBuilder()
         media_info = self.extract_media_info(message)
 
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import logging
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from aiogram import types
+from aiogram.utils.text_decorations import html_decoration
+
+from config import SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# Решения классификатора
+SKIP = 'skip'  # Текста нет - превью без обработки
+FORMAT = 'format'  # Локальное форматирование по entities, без AI
+AI = 'ai'  # Полная обработка через AI
+
+# Entities, означающие, что автор уже оформил текст
+_FORMATTING_ENTITIES = {'bold', 'italic', 'underline', 'strikethrough', 'code', 'pre', 'text_link', 'blockquote'}
+
+
+class PostClassifier:
+    """Дешевая локальная предварительная классификация поста перед AI.
+
+    Правила, по порядку:
+    - пустой текст или подпись (медиа без подписи) - skip;
+    - промпт style_formatting и короткий текст (до preclassifier_short_length)
+      или уже оформленный автором (есть entities форматирования, до
+      preclassifier_formatted_length) - format;
+    - остальное - ai.
+
+    Промпт group_processing меняет содержимое (убирает упоминания, добавляет
+    подпись), поэтому для него локальное форматирование не применяется.
+    """
+
+    def __init__(self):
+        self.stats: Counter = Counter()
+
+    def classify(self, text: str, entities: Optional[List[types.MessageEntity]], prompt_type: str) -> str:
+        decision = self._decide(text or "", entities or [], prompt_type)
+        self.stats[decision] += 1
+        if decision != AI:
+            logger.info(f"Предклассификатор: {decision} (тип: {prompt_type}, длина: {len(text or '')} символов)")
+        return decision
+
+    @staticmethod
+    def _decide(text: str, entities: List[types.MessageEntity], prompt_type: str) -> str:
+        if not SETTINGS['preclassifier_enabled']:
+            return AI if text.strip() else SKIP
+
+        if not text.strip():
+            return SKIP
+
+        if prompt_type != 'style_formatting':
+            return AI
+
+        if len(text) <= SETTINGS['preclassifier_short_length']:
+            return FORMAT
+
+        formatted = any(entity.type in _FORMATTING_ENTITIES for entity in entities)
+        if formatted and len(text) <= SETTINGS['preclassifier_formatted_length']:
+            return FORMAT
+
+        return AI
+
+    @staticmethod
+    def format_locally(text: str, entities: Optional[List[types.MessageEntity]]) -> str:
+        """Детерминированное форматирование: текст и entities сообщения в HTML"""
+        return html_decoration.unparse(text, entities or [])
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = sum(self.stats.values())
+        return {
+            'total': total,
+            SKIP: self.stats[SKIP],
+            FORMAT: self.stats[FORMAT],
+            AI: self.stats[AI],
+            'bypass_rate': (self.stats[SKIP] + self.stats[FORMAT]) / total if total else 0.0
+        }
+
+
+# Глобальный предклассификатор постов
+post_classifier = PostClassifier()
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from config import PROMPT_PATHS, SETTINGS
+from utils.config_store import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Кодировки, которые пробуем при чтении файла промпта
+_ENCODINGS = ('utf-8', 'cp1251', 'iso-8859-1')
+
+
+class PromptEntry:
+    """Загруженный промпт и отпечаток файла, из которого он прочитан"""
+
+    __slots__ = ('content', 'mtime_ns', 'size', 'checked_at')
+
+    def __init__(self, content: Optional[str], mtime_ns: Optional[int], size: Optional[int]):
+        self.content = content
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.checked_at = time.monotonic()
+
+
+class PromptRegistry:
+    """Реестр промптов с перезагрузкой при изменении файлов.
+
+    Промпт отдается из памяти. Не чаще раза в prompt_check_interval секунд
+    get() запускает фоновую проверку: один stat файла, и только если
+    изменились mtime или размер - чтение в отдельном потоке. Пока проверка
+    идет, отдается прежний текст. Каждое изменение любого промпта
+    увеличивает version - по нему можно сбрасывать производные кэши.
+    """
+
+    def __init__(self, paths: Optional[Dict[str, str]] = None):
+        self.paths = paths if paths is not None else PROMPT_PATHS
+        self.version = 0
+        self._entries: Dict[str, PromptEntry] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._save_lock = asyncio.Lock()
+
+    async def get(self, prompt_type: str) -> Optional[str]:
+        """Текст промпта или None, если файла нет или он не читается"""
+        entry = self._entries.get(prompt_type)
+        if entry is None:
+            return await self._refresh(prompt_type)
+
+        if (
+                time.monotonic() - entry.checked_at >= SETTINGS['prompt_check_interval']
+                and prompt_type not in self._refreshing
+        ):
+            entry.checked_at = time.monotonic()
+            task = asyncio.create_task(self._refresh(prompt_type))
+            self._refreshing[prompt_type] = task
+            task.add_done_callback(lambda _: self._refreshing.pop(prompt_type, None))
+
+        return entry.content
+
+    async def _refresh(self, prompt_type: str) -> Optional[str]:
+        """Перечитывает файл промпта, если его отпечаток изменился"""
+        path = self.paths.get(prompt_type)
+        if not path:
+            logger.warning(f"Неизвестный тип промпта: {prompt_type}")
+            return None
+
+        entry = self._entries.get(prompt_type)
+        try:
+            content, mtime_ns, size = await asyncio.to_thread(self._read_if_changed, path, entry)
+        except Exception as e:
+            logger.error(f"Ошибка чтения промпта {path}: {e}")
+            return entry.content if entry else None
+
+        current = self._entries.get(prompt_type)
+        if current is not entry:
+            if current is not None:
+                # Пока шло чтение, промпт сохранили через save() - его версия новее
+                return current.content
+            # Пока шло чтение, реестр сбросили через invalidate() - прочитанное свежее
+            entry = None
+
+        if entry is not None and (mtime_ns, size) == (entry.mtime_ns, entry.size):
+            entry.checked_at = time.monotonic()
+            return entry.content
+
+        self._store(prompt_type, content, mtime_ns, size)
+        if mtime_ns is None:
+            logger.warning(f"Файл промпта {path} не найден, используется стандартный")
+        elif entry is not None:
+            logger.info(f"Промпт {prompt_type} изменился на диске и перезагружен (версия {self.version})")
+        return content
+
+    @staticmethod
+    def _read_if_changed(path: str, entry: Optional[PromptEntry]) -> Tuple[Optional[str], Optional[int], Optional[int]]:
+        """stat файла и, если отпечаток новый, чтение (выполняется в потоке)"""
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None, None, None
+
+        if entry is not None and (stat.st_mtime_ns, stat.st_size) == (entry.mtime_ns, entry.size):
+            return entry.content, entry.mtime_ns, entry.size
+
+        with open(path, 'rb') as f:
+            raw = f.read()
+        for encoding in _ENCODINGS:
+            try:
+                content = raw.decode(encoding).strip()
+                logger.info(f"Промпт загружен из {path} (кодировка: {encoding})")
+                return content, stat.st_mtime_ns, stat.st_size
+            except UnicodeDecodeError:
+                continue
+
+        logger.error(f"Не удалось прочитать {path} ни в одной кодировке")
+        return None, stat.st_mtime_ns, stat.st_size
+
+    def _store(self, prompt_type: str, content: Optional[str], mtime_ns: Optional[int], size: Optional[int]):
+        previous = self._entries.get(prompt_type)
+        self._entries[prompt_type] = PromptEntry(content, mtime_ns, size)
+        if previous is None or previous.content != content:
+            self.version += 1
+
+    async def save(self, prompt_type: str, content: str) -> bool:
+        """Атомарно записывает промпт в файл (в потоке) и обновляет реестр"""
+        path = self.paths.get(prompt_type)
+        if not path:
+            logger.error(f"Неизвестный тип промпта: {prompt_type}")
+            return False
+
+        try:
+            async with self._save_lock:
+                stat = await asyncio.to_thread(self._write, path, content)
+            self._store(prompt_type, content.strip(), stat.st_mtime_ns, stat.st_size)
+            logger.info(f"Промпт {prompt_type} сохранен в {path} (версия {self.version})")
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка сохранения промпта {prompt_type}: {e}")
+            return False
+
+    @staticmethod
+    def _write(path: str, content: str) -> os.stat_result:
+        atomic_write(path, content)
+        return os.stat(path)
+
+    def invalidate(self):
+        """Забывает загруженные промпты - следующий get() перечитает файлы"""
+        self._entries.clear()
+        self.version += 1
+
+
+# Глобальный реестр промптов
+prompt_registry = PromptRegistry()
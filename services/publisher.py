@@ -1,26 +1,81 @@
 # -*- coding: utf-8 -*-
 import logging
-from typing import Dict, Any
-from config import GROUP_ID
+from typing import Dict, Any, List, Optional
 from services.media_handler import MediaProcessor
+from utils.clock import clock
+from utils.config_store import config_store
+from utils.locks import post_locks
+from utils.post_archive import post_archive
+from utils.post_storage import post_storage
 
 logger = logging.getLogger(__name__)
 media_processor = MediaProcessor()
 
 
-async def publish_post_now(post_data: Dict[str, Any]) -> bool:
+def _remember_sent(sent_ids: List[int], sent_message):
+    """Запоминает id опубликованного сообщения для архива"""
+    message_id = getattr(sent_message, 'message_id', None)
+    if message_id is not None:
+        sent_ids.append(message_id)
+
+
+def _get_default_bot():
+    """Возвращает основной экземпляр бота"""
+    from bot import bot
+    return bot
+
+
+async def publish_scheduled_post(post_id: int, bot=None) -> Optional[bool]:
+    """Публикует запланированный пост не более одного раза.
+
+    Ручная публикация из очереди и планировщик проходят через блокировку
+    поста и переход scheduled -> publishing -> published. Возвращает None,
+    если пост уже публикуется, опубликован или отменен.
+    """
+    async with post_locks.lock(('scheduled', post_id)):
+        if not post_storage.begin_publishing(post_id):
+            return None
+
+        success = False
+        try:
+            success = await publish_post_now(post_storage.get_scheduled_post(post_id), bot=bot)
+        finally:
+            post_storage.finish_publishing(post_id, success)
+        return success
+
+
+async def publish_pending_post(post_id: int, bot=None) -> Optional[bool]:
+    """Публикует пост из превью и убирает его из ожидающих.
+
+    Возвращает None, если превью уже нет (опубликовано параллельным нажатием
+    или удалено).
+    """
+    async with post_locks.lock(('pending', post_id)):
+        post_data = post_storage.get_pending_post(post_id)
+        if post_data is None:
+            return None
+
+        success = await publish_post_now(post_data, bot=bot)
+        if success:
+            post_storage.remove_pending_post(post_id)
+        return success
+
+
+async def publish_post_now(post_data: Dict[str, Any], bot=None) -> bool:
     """Публикует пост немедленно с повторными попытками"""
     max_retries = 3
+    bot = bot or _get_default_bot()
 
     for attempt in range(max_retries):
         try:
-            success = await _publish_post_attempt(post_data)
+            sent_ids: List[int] = []
+            success = await _publish_post_attempt(post_data, bot, sent_ids)
             if success:
+                await post_archive.record(post_data, sent_ids, config_store.group_id, attempts=attempt + 1)
                 return True
 
             if attempt < max_retries - 1:
-                import asyncio
-                await asyncio.sleep(2 ** attempt)  # Экспоненциальная задержка
+                await clock.sleep(2 ** attempt)  # Экспоненциальная задержка
                 logger.info(f"Повторная попытка публикации #{attempt + 2}")
 
         except Exception as e:
@@ -31,44 +86,42 @@ async def publish_post_now(post_data: Dict[str, Any]) -> bool:
     return False
 
 
-async def _publish_post_attempt(post_data: Dict[str, Any]) -> bool:
+async def _publish_post_attempt(post_data: Dict[str, Any], bot, sent_ids: List[int]) -> bool:
     """Одна попытка публикации поста"""
     try:
-        from bot import bot
         processed_text = post_data['processed_text']
 
-        # Проверяем GROUP_ID
-        if not GROUP_ID:
+        # Проверяем ID группы
+        if not config_store.group_id:
             logger.error("GROUP_ID не настроен")
             return False
 
-        logger.info(f"Публикуем пост #{post_data.get('id', 'unknown')} в группу {GROUP_ID}")
+        logger.info(f"Публикуем пост #{post_data.get('id', 'unknown')} в группу {config_store.group_id}")
 
         if post_data.get('original_messages'):
             # Альбом
-            return await _publish_album(post_data, processed_text)
+            return await _publish_album(post_data, processed_text, bot, sent_ids)
         elif post_data.get('original_message'):
             # Одиночное сообщение
-            return await _publish_single_message(post_data, processed_text)
+            return await _publish_single_message(post_data, processed_text, bot, sent_ids)
         else:
             # Только текст
-            return await _publish_text_only(processed_text)
+            return await _publish_text_only(processed_text, bot, sent_ids)
 
     except Exception as e:
         logger.error(f"Ошибка публикации поста #{post_data.get('id', 'unknown')}: {e}")
         return False
 
 
-async def _publish_album(post_data: Dict[str, Any], processed_text: str) -> bool:
+async def _publish_album(post_data: Dict[str, Any], processed_text: str, bot, sent_ids: List[int]) -> bool:
     """Публикует альбом"""
     try:
-        from bot import bot
         messages = post_data['original_messages']
         logger.info(f"Публикуем альбом из {len(messages)} элементов")
 
         # Берем первое медиа для публикации с подписью
         first_message = messages[0]
-        success = await _send_single_media(first_message, processed_text)
+        success = await _send_single_media(first_message, processed_text, bot, sent_ids)
 
         # Если альбом из одного элемента, возвращаем результат
         if len(messages) == 1:
@@ -77,7 +130,7 @@ async def _publish_album(post_data: Dict[str, Any], processed_text: str) -> bool
         # Если больше одного элемента, отправляем остальные без подписи
         for message in messages[1:]:
             try:
-                await _send_single_media(message, "")
+                await _send_single_media(message, "", bot, sent_ids)
             except Exception as e:
                 logger.error(f"Ошибка отправки элемента альбома: {e}")
                 # Продолжаем отправку остальных
@@ -90,11 +143,13 @@ async def _publish_album(post_data: Dict[str, Any], processed_text: str) -> bool
         return False
 
 
-async def _publish_single_message(post_data: Dict[str, Any], processed_text: str) -> bool:
+async def _publish_single_message(
+        post_data: Dict[str, Any], processed_text: str, bot, sent_ids: List[int]
+) -> bool:
     """Публикует одиночное сообщение"""
     try:
         message = post_data['original_message']
-        success = await _send_single_media(message, processed_text)
+        success = await _send_single_media(message, processed_text, bot, sent_ids)
         if success:
             logger.info(f"Одиночное сообщение опубликовано (пост #{post_data.get('id', 'unknown')})")
         return success
@@ -104,17 +159,16 @@ async def _publish_single_message(post_data: Dict[str, Any], processed_text: str
         return False
 
 
-async def _publish_text_only(processed_text: str) -> bool:
+async def _publish_text_only(processed_text: str, bot, sent_ids: List[int]) -> bool:
     """Публикует только текст"""
     try:
-        from bot import bot
         if processed_text.strip():
-            await bot.send_message(
-                chat_id=GROUP_ID,
+            _remember_sent(sent_ids, await bot.send_message(
+                chat_id=config_store.group_id,
                 text=processed_text,
                 parse_mode="HTML",
                 disable_web_page_preview=True
-            )
+            ))
             logger.info("Текстовый пост опубликован")
             return True
         return False
@@ -124,22 +178,20 @@ async def _publish_text_only(processed_text: str) -> bool:
         return False
 
 
-async def _send_single_media(message, caption: str) -> bool:
+async def _send_single_media(message, caption: str, bot, sent_ids: List[int]) -> bool:
     """Отправляет одиночное медиа"""
     try:
-        from bot import bot
-
         media_info = media_processor.extract_media_info(message)
 
         if not media_info['has_media']:
             # Только текст
             if caption.strip():
-                await bot.send_message(
-                    chat_id=GROUP_ID,
+                _remember_sent(sent_ids, await bot.send_message(
+                    chat_id=config_store.group_id,
                     text=caption,
                     parse_mode="HTML",
                     disable_web_page_preview=True
-                )
+                ))
                 return True
             return False
 
@@ -151,76 +203,76 @@ async def _send_single_media(message, caption: str) -> bool:
         success = False
 
         if media_info['type'] == 'photo':
-            await bot.send_photo(
-                chat_id=GROUP_ID,
+            _remember_sent(sent_ids, await bot.send_photo(
+                chat_id=config_store.group_id,
                 photo=media_info['file_id'],
                 caption=caption,
                 parse_mode="HTML"
-            )
+            ))
             success = True
 
         elif media_info['type'] == 'video':
-            await bot.send_video(
-                chat_id=GROUP_ID,
+            _remember_sent(sent_ids, await bot.send_video(
+                chat_id=config_store.group_id,
                 video=media_info['file_id'],
                 caption=caption,
                 parse_mode="HTML"
-            )
+            ))
             success = True
 
         elif media_info['type'] == 'document':
-            await bot.send_document(
-                chat_id=GROUP_ID,
+            _remember_sent(sent_ids, await bot.send_document(
+                chat_id=config_store.group_id,
                 document=media_info['file_id'],
                 caption=caption,
                 parse_mode="HTML"
-            )
+            ))
             success = True
 
         elif media_info['type'] == 'animation':
-            await bot.send_animation(
-                chat_id=GROUP_ID,
+            _remember_sent(sent_ids, await bot.send_animation(
+                chat_id=config_store.group_id,
                 animation=media_info['file_id'],
                 caption=caption,
                 parse_mode="HTML"
-            )
+            ))
             success = True
 
         elif media_info['type'] == 'voice':
-            await bot.send_voice(
-                chat_id=GROUP_ID,
+            _remember_sent(sent_ids, await bot.send_voice(
+                chat_id=config_store.group_id,
                 voice=media_info['file_id'],
                 caption=caption,
                 parse_mode="HTML"
-            )
+            ))
             success = True
 
         elif media_info['type'] == 'video_note':
             # Кружочки не поддерживают caption
-            await bot.send_video_note(
-                chat_id=GROUP_ID,
+            _remember_sent(sent_ids, await bot.send_video_note(
+                chat_id=config_store.group_id,
                 video_note=media_info['file_id']
-            )
+            ))
             # Отправляем текст отдельно
             if caption.strip():
-                await bot.send_message(
-                    chat_id=GROUP_ID,
+                _remember_sent(sent_ids, await bot.send_message(
+                    chat_id=config_store.group_id,
                     text=caption,
                     parse_mode="HTML",
                     disable_web_page_preview=True
-                )
+                ))
             success = True
 
         else:
             logger.warning(f"Неподдерживаемый тип медиа: {media_info['type']}")
             # Отправляем как текст
             if caption.strip():
-                await bot.send_message(
-                    chat_id=GROUP_ID,
+                _remember_sent(sent_ids, await bot.send_message(
+                    chat_id=config_store.group_id,
                     text=caption,
                     parse_mode="HTML",
                     disable_web_page_preview=True
-                )
+                ))
                 success = True
 
         return success
@@ -231,13 +283,12 @@ async def _send_single_media(message, caption: str) -> bool:
         # Пытаемся отправить хотя бы текст при ошибке
         if caption.strip():
             try:
-                from bot import bot
-                await bot.send_message(
-                    chat_id=GROUP_ID,
+                _remember_sent(sent_ids, await bot.send_message(
+                    chat_id=config_store.group_id,
                     text=f"Ошибка отправки медиа. Текст поста:\n\n{caption}",
                     parse_mode="HTML",
                     disable_web_page_preview=True
-                )
+                ))
                 return True
             except Exception as text_error:
                 logger.error(f"Не удалось отправить даже текст: {text_error}")
@@ -249,7 +300,6 @@ async def notify_admin_about_failure(post_data: Dict[str, Any], error_message: s
     """Уведомляет админа о неудачной публикации"""
     try:
         from bot import bot
-        from config import ADMIN_ID
 
         notification_text = (
             f"❌ **ОШИБКА ПУБЛИКАЦИИ**\n\n"
@@ -259,7 +309,7 @@ async def notify_admin_about_failure(post_data: Dict[str, Any], error_message: s
         )
 
         await bot.send_message(
-            chat_id=ADMIN_ID,
+            chat_id=config_store.admin_id,
             text=notification_text,
             parse_mode="Markdown"
         )
@@ -1,22 +1,41 @@
 # -*- coding: utf-8 -*-
 import asyncio
+import json
 import logging
 from datetime import datetime, timedelta
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 from utils.post_storage import post_storage
+from utils.publish_leases import PublishLeaseStore, lease_key
+from utils.storage_journal import deserialize_post, serialize_post
 from utils.time_slots import time_slot_manager
-from config import GROUP_ID
+from utils.usage_stats import usage_stats
+from config import SETTINGS
+from utils.clock import clock
 
 logger = logging.getLogger(__name__)
 
 
 class SchedulerService:
-    """Сервис для планирования и автоматической публикации постов"""
+    """Сервис для планирования и автоматической публикации постов.
 
-    def __init__(self, bot):
+    Если задан SETTINGS['scheduler_lease_db'], несколько экземпляров бота
+    делят готовые посты через аренды в общем файле SQLite. Запланированные
+    посты каждого экземпляра дублируются в общую очередь в той же базе, и
+    публикуется то, что пришло по времени в ней, поэтому пост упавшего
+    экземпляра опубликует живой. Журнал, очередь AI-задач и архив у каждого
+    экземпляра свои: общими каталогами данных экземпляры портили бы записи
+    друг друга, и main.py не запустит второй процесс с теми же путями.
+    """
+
+    def __init__(self, bot, clock_source=None, leases: Optional[PublishLeaseStore] = None):
         self.bot = bot
+        self.clock = clock_source or clock
         self.is_running = False
         self._task: Optional[asyncio.Task] = None
+        self._last_compaction: Optional[datetime] = None
+        self.leases = leases or (PublishLeaseStore() if SETTINGS['scheduler_lease_db'] else None)
+        # Изменения локальной очереди для общей базы: uid -> пост (None - убрать из очереди)
+        self._outbox: Dict[str, Optional[dict]] = {}
 
     async def start(self):
         """Запускает планировщик"""
@@ -24,6 +43,12 @@ class SchedulerService:
             logger.warning("Планировщик уже запущен")
             return
 
+        if self.leases is not None:
+            # Посты, восстановленные из журнала до запуска, тоже идут в общую очередь
+            for post in post_storage.scheduled_posts.values():
+                self._on_storage_event('scheduled', post)
+            post_storage.subscribe(self._on_storage_event)
+
         self.is_running = True
         self._task = asyncio.create_task(self._scheduler_loop())
         logger.info("Планировщик постов запущен")
@@ -41,6 +66,14 @@ class SchedulerService:
             except asyncio.CancelledError:
                 pass
 
+        if self.leases is not None:
+            post_storage.unsubscribe(self._on_storage_event)
+            try:
+                await self._sync_shared_queue()
+            except Exception as e:
+                logger.error(f"Ошибка синхронизации общей очереди при остановке: {e}")
+            self.leases.close()
+
         logger.info("Планировщик постов остановлен")
 
     async def _scheduler_loop(self):
@@ -49,15 +82,20 @@ class SchedulerService:
             while self.is_running:
                 try:
                     await self._check_and_publish_posts()
-                    await asyncio.sleep(60)  # Проверяем каждую минуту
+                    await self._compact_storage_if_due()
+                    await self.clock.sleep(SETTINGS['scheduler_check_interval'])
                 except Exception as e:
                     logger.error(f"Ошибка в цикле планировщика: {e}")
-                    await asyncio.sleep(60)
+                    await self.clock.sleep(SETTINGS['scheduler_check_interval'])
         except asyncio.CancelledError:
             logger.info("Цикл планировщика отменен")
 
     async def _check_and_publish_posts(self):
         """Проверяет и публикует готовые посты"""
+        if self.leases is not None:
+            await self._publish_leased_posts()
+            return
+
         try:
             pending_posts = post_storage.get_pending_scheduled_posts()
         except Exception as e:
@@ -70,22 +108,151 @@ class SchedulerService:
         logger.info(f"Найдено {len(pending_posts)} постов для публикации")
 
         for post_data in pending_posts:
+            await self._publish_and_log(post_data)
+
+    async def _publish_and_log(self, post_data: dict) -> Optional[bool]:
+        """Публикует пост и пишет результат в лог"""
+        success = None
+        try:
+            success = await self._publish_scheduled_post(post_data)
+            if success is None:
+                logger.info(f"Пост #{post_data['id']} уже публикуется или опубликован, пропускаем")
+            elif success:
+                logger.info(f"Пост #{post_data['id']} успешно опубликован по расписанию")
+            else:
+                logger.error(f"Ошибка публикации поста #{post_data['id']}")
+        except Exception as e:
+            logger.error(f"Ошибка публикации поста #{post_data['id']}: {e}")
+        return success
+
+    # =============================================
+    # АРЕНДА ПОСТОВ (НЕСКОЛЬКО ЭКЗЕМПЛЯРОВ)
+    # =============================================
+
+    def _on_storage_event(self, event: str, post: dict):
+        """Запоминает изменение запланированного поста для общей очереди"""
+        if event in ('scheduled', 'updated', 'cancelled', 'published'):
+            self._outbox[post['uid']] = post
+        elif event == 'removed':
+            self._outbox[post['uid']] = None
+
+    async def _sync_shared_queue(self):
+        """Переносит накопленные изменения локальной очереди в общую базу"""
+        if not self._outbox:
+            return
+
+        outbox, self._outbox = self._outbox, {}
+        upserts, removed = {}, []
+        for uid, post in outbox.items():
+            if post is not None and post['status'] == 'scheduled':
+                payload = json.dumps(serialize_post(post), ensure_ascii=False, default=str)
+                upserts[uid] = (post['publish_time'], payload)
+            else:
+                removed.append(uid)
+
+        try:
+            await asyncio.to_thread(self.leases.sync_posts, upserts, removed)
+        except Exception:
+            # Изменения не теряются: повторим на следующей проверке, если их не перекрыли новые
+            for uid, post in outbox.items():
+                self._outbox.setdefault(uid, post)
+            raise
+
+    async def _mark_published_elsewhere(self):
+        """Отмечает опубликованными локальные посты, которые уже опубликовал другой экземпляр"""
+        due = post_storage.get_pending_scheduled_posts()
+        if not due:
+            return
+
+        by_key = {lease_key(post): post for post in due}
+        for key in await asyncio.to_thread(self.leases.done_keys, list(by_key)):
+            post_storage.mark_post_published(by_key[key]['id'])
+
+    async def _claim_posts(self) -> List[Tuple[dict, str, int]]:
+        """Берет в аренду готовые посты общей очереди: [(локальный пост, ключ аренды, fencing-токен)]"""
+        claimed = await asyncio.to_thread(self.leases.claim_due, self.clock.now())
+        if not claimed:
+            return []
+
+        local = {post['uid']: post for post in post_storage.get_pending_scheduled_posts()}
+        leased = []
+        for key, (token, payload) in claimed.items():
+            data = json.loads(payload)
+            post = local.get(data['uid']) or post_storage.find_scheduled_by_uid(data['uid'])
+
+            if post is None:
+                # Пост запланировал другой экземпляр (возможно, упавший) - принимаем к себе
+                post_id = post_storage.adopt_scheduled_post(deserialize_post(data, self.bot))
+                post = post_storage.get_scheduled_post(post_id)
+            elif lease_key(post) != key:
+                # Пост уже перенесли, а общая очередь еще не обновлена
+                await asyncio.to_thread(self.leases.release, key, token)
+                continue
+
+            leased.append((post, key, token))
+        return leased
+
+    async def _publish_leased_posts(self):
+        """Публикует посты общей очереди, взятые в аренду этим экземпляром"""
+        try:
+            await self._sync_shared_queue()
+            await self._mark_published_elsewhere()
+            leased = await self._claim_posts()
+        except Exception as e:
+            logger.error(f"Ошибка аренды постов: {e}")
+            return
+
+        if not leased:
+            return
+
+        logger.info(f"Взято в аренду {len(leased)} готовых постов")
+
+        for post_data, key, token in leased:
+            # Аренда могла истечь, пока публиковались предыдущие посты
+            if not await asyncio.to_thread(self.leases.is_current, key, token):
+                logger.warning(f"Аренда поста #{post_data['id']} потеряна до публикации")
+                continue
+
+            success = await self._publish_and_log(post_data)
             try:
-                success = await self._publish_scheduled_post(post_data)
                 if success:
-                    post_storage.mark_post_published(post_data['id'])
-                    logger.info(f"Пост #{post_data['id']} успешно опубликован по расписанию")
+                    if not await asyncio.to_thread(self.leases.complete, key, token):
+                        logger.warning(f"Пост #{post_data['id']} опубликован, но аренду уже перехватили")
                 else:
-                    logger.error(f"Ошибка публикации поста #{post_data['id']}")
+                    await asyncio.to_thread(self.leases.release, key, token)
             except Exception as e:
-                logger.error(f"Ошибка публикации поста #{post_data['id']}: {e}")
+                logger.error(f"Ошибка обновления аренды поста #{post_data['id']}: {e}")
+
+    async def _compact_storage_if_due(self):
+        """Периодически вытесняет устаревшие посты из хранилища"""
+        now = self.clock.now()
+        interval = timedelta(seconds=SETTINGS['storage_compaction_interval'])
+
+        if self._last_compaction is None:
+            # Первая компактизация - через интервал после запуска
+            self._last_compaction = now
+            return
+
+        if now - self._last_compaction < interval:
+            return
+
+        self._last_compaction = now
+        try:
+            post_storage.compact()
+            if self.leases is not None:
+                self.leases.purge_done(SETTINGS['published_post_ttl_hours'] * 3600)
+        except Exception as e:
+            logger.error(f"Ошибка компактизации хранилища: {e}")
+
+        # Статистика AI пишется и по ходу работы - после сбоя теряется не больше интервала
+        await asyncio.to_thread(usage_stats.save)
 
-    async def _publish_scheduled_post(self, post_data: dict) -> bool:
-        """Публикует запланированный пост"""
+    async def _publish_scheduled_post(self, post_data: dict) -> Optional[bool]:
+        """Публикует запланированный пост (None - его уже публикуют вручную)"""
         try:
             # Используем существующую логику из publisher
-            from services.publisher import publish_post_now
-            return await publish_post_now(post_data)
+            from services.publisher import publish_scheduled_post
+            return await publish_scheduled_post(post_data['id'], bot=self.bot)
 
         except Exception as e:
             logger.error(f"Ошибка публикации поста: {e}")
@@ -113,7 +280,7 @@ class SchedulerService:
 
     def get_quick_schedule_time(self, option: str) -> Optional[datetime]:
         """Получает время для быстрых опций планирования"""
-        now = datetime.now()
+        now = self.clock.now()
         return time_slot_manager.get_quick_schedule_time(option, now)
 
     def parse_custom_time(self, time_str: str) -> Optional[datetime]:
@@ -130,7 +297,7 @@ class SchedulerService:
 
     def distribute_posts_in_schedule(self, count: int, days_ahead: int = 7) -> List[datetime]:
         """Распределяет посты по расписанию"""
-        start_time = datetime.now() + timedelta(minutes=30)  # Начинаем через 30 минут
+        start_time = self.clock.now() + timedelta(minutes=30)  # Начинаем через 30 минут
         return time_slot_manager.distribute_posts_in_slots(count, start_time, days_ahead)
 
     def get_schedule_summary(self) -> str:
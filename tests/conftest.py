@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+# Конфигурация читается из окружения при импорте - задаем тестовые значения до него
+os.environ.setdefault('API_TOKEN', '123456:test-token')
+os.environ.setdefault('GROUP_ID', '-1000000000000')
+os.environ.setdefault('MY_ID', '1')
+os.environ.setdefault('DEEPSEEK', 'test-key')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from config import SETTINGS
+from services.ai_processor import ai_processor, parse_batch_reply
+
+
+def test_parse_batch_reply_keeps_only_requested_valid_items():
+    reply = json.dumps([
+        {'id': 1, 'text': '<b>один</b>'},
+        {'id': 2, 'text': '   '},
+        {'id': 3, 'text': 'чужой'},
+        {'id': 1, 'text': 'дубликат'},
+        {'id': 4},
+        'мусор',
+    ], ensure_ascii=False)
+
+    assert parse_batch_reply(reply, [1, 2, 4]) == {1: '<b>один</b>'}
+
+
+def test_parse_batch_reply_strips_code_fence():
+    reply = '```json\n[{"id": 7, "text": "пост"}]\n```'
+
+    assert parse_batch_reply(reply, [7]) == {7: 'пост'}
+
+
+@pytest.mark.parametrize('reply', ['{"id": 1, "text": "пост"}', '[{"id": 1, "text": "об'])
+def test_parse_batch_reply_rejects_broken_reply(reply):
+    with pytest.raises(ValueError):
+        parse_batch_reply(reply, [1])
+
+
+def test_pack_batches_respects_budget_and_item_limit(monkeypatch):
+    monkeypatch.setitem(SETTINGS, 'ai_batch_token_budget', 100)
+    monkeypatch.setitem(SETTINGS, 'ai_batch_max_items', 3)
+    short = ('а' * 30, '')  # 11 токенов
+
+    batches, singles = ai_processor.pack_batches([short] * 7)
+
+    assert batches == [[0, 1, 2], [3, 4, 5]]
+    assert singles == [6]
+
+
+def test_pack_batches_sends_oversized_and_empty_texts_alone(monkeypatch):
+    monkeypatch.setitem(SETTINGS, 'ai_batch_token_budget', 100)
+    monkeypatch.setitem(SETTINGS, 'ai_batch_max_items', 8)
+    items = [('а' * 400, ''), ('   ', ''), ('а' * 400, ''), ('короткий', ''), ('еще один', '')]
+
+    batches, singles = ai_processor.pack_batches(items)
+
+    assert batches == [[3, 4]]
+    assert singles == [0, 1, 2]
+
+
+def test_variants_fall_back_to_separator_on_provider_without_n(monkeypatch):
+    from services.ai_processor import AIProcessor, VARIANT_SEPARATOR
+    from services.ai_providers import AIProvider, ProviderRouter
+
+    requests = {}
+
+    def fake_client(name, reply=None):
+        async def create(**request):
+            requests[name] = request
+            if reply is None:
+                raise RuntimeError("недоступен")
+            choice = SimpleNamespace(message=SimpleNamespace(content=reply), finish_reason='stop')
+            return SimpleNamespace(choices=[choice], usage=None)
+        return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    with_n = AIProvider('with_n', 'http://a', 'model', 'key', supports_n=True)
+    without_n = AIProvider('without_n', 'http://b', 'model', 'key')
+    with_n.client = fake_client('with_n')
+    without_n.client = fake_client('without_n', f"первый{VARIANT_SEPARATOR}второй")
+
+    monkeypatch.setitem(SETTINGS, 'ai_hedge_after', 0)
+    processor = AIProcessor()
+    processor.router = ProviderRouter([with_n, without_n])
+
+    variants = asyncio.run(processor.process_candidates("новость", "", count=2))
+
+    assert requests['with_n']['n'] == 2
+    assert 'n' not in requests['without_n']
+    assert VARIANT_SEPARATOR in requests['without_n']['messages'][-1]['content']
+    assert requests['without_n']['max_tokens'] == SETTINGS['ai_max_tokens'] * 2
+    assert variants == ['первый', 'второй']
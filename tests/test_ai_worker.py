@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+
+import pytest
+
+from services.ai_worker import AIWorkerPool
+
+
+def make_pool(queue_file: str, handler, batch_handler=None, workers: int = 1) -> AIWorkerPool:
+    pool = AIWorkerPool(workers=workers, queue_file=queue_file)
+    pool.register('post', handler, batch_handler)
+    return pool
+
+
+async def drain(pool: AIWorkerPool):
+    """Ждет, пока воркеры разберут очередь"""
+    await asyncio.wait_for(pool._queue.join(), timeout=5)
+
+
+def saved_jobs(queue_file: str):
+    with open(queue_file, 'r', encoding='utf-8') as f:
+        return [job['params'] for job in json.load(f)]
+
+
+def test_finished_jobs_leave_queue_file(tmp_path):
+    queue_file = str(tmp_path / 'jobs.json')
+    finished = []
+
+    async def handler(messages, **params):
+        finished.append(params['n'])
+
+    async def scenario():
+        pool = make_pool(queue_file, handler)
+        await pool.start(bot=None)
+        await pool.submit('post', [], n=1)
+        await pool.submit('post', [], n=2)
+        await drain(pool)
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+    assert finished == [1, 2]
+    assert saved_jobs(queue_file) == []
+
+
+def test_jobs_saved_before_restart_are_restored(tmp_path):
+    queue_file = str(tmp_path / 'jobs.json')
+    finished = []
+
+    async def handler(messages, **params):
+        finished.append(params['n'])
+
+    async def scenario():
+        # Задачи приняты, но процесс остановился до запуска воркеров
+        stopped = make_pool(queue_file, handler)
+        await stopped.submit('post', [], n=1)
+        await stopped.submit('post', [], n=2)
+        saved = saved_jobs(queue_file)
+
+        restarted = make_pool(queue_file, handler)
+        await restarted.start(bot=None)
+        await drain(restarted)
+        await restarted.stop()
+        return saved
+
+    assert asyncio.run(scenario()) == [{'n': 1}, {'n': 2}]
+    assert finished == [1, 2]
+    assert saved_jobs(queue_file) == []
+
+
+def test_interrupted_jobs_run_after_restart(tmp_path):
+    queue_file = str(tmp_path / 'jobs.json')
+    started, finished = [], []
+    running = asyncio.Event()
+
+    async def slow_handler(messages, **params):
+        started.append(params['n'])
+        running.set()
+        await asyncio.sleep(10)
+
+    async def handler(messages, **params):
+        finished.append(params['n'])
+
+    async def scenario():
+        pool = make_pool(queue_file, slow_handler)
+        await pool.start(bot=None)
+        await pool.submit('post', [], n=1)
+        await pool.submit('post', [], n=2)
+        await asyncio.wait_for(running.wait(), timeout=5)
+        # Остановка посреди первой задачи: обе остаются в файле очереди
+        await pool.stop()
+        interrupted = saved_jobs(queue_file)
+
+        restarted = make_pool(queue_file, handler)
+        await restarted.start(bot=None)
+        await drain(restarted)
+        await restarted.stop()
+        return interrupted
+
+    interrupted = asyncio.run(scenario())
+
+    assert started == [1]
+    assert interrupted == [{'n': 1}, {'n': 2}]
+    assert finished == [1, 2]
+    assert saved_jobs(queue_file) == []
+
+
+def test_stop_and_start_do_not_duplicate_jobs(tmp_path):
+    queue_file = str(tmp_path / 'jobs.json')
+    finished = []
+
+    async def handler(messages, **params):
+        finished.append(params['n'])
+
+    async def scenario():
+        pool = make_pool(queue_file, handler)
+        await pool.submit('post', [], n=1)
+        await pool.start(bot=None)
+        await drain(pool)
+        await pool.stop()
+        await pool.start(bot=None)
+        await asyncio.sleep(0.05)
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+    assert finished == [1]
+
+
+def test_unknown_job_kind_is_rejected(tmp_path):
+    pool = AIWorkerPool(workers=1, queue_file=str(tmp_path / 'jobs.json'))
+
+    async def scenario():
+        await pool.submit('missing', [])
+
+    with pytest.raises(ValueError):
+        asyncio.run(scenario())
+
+
+def test_batch_takes_only_jobs_of_same_kind(tmp_path):
+    calls = []
+
+    async def handler(messages, **params):
+        calls.append(('single', params['n']))
+
+    async def batch_handler(batches, params):
+        calls.append(('batch', [job_params['n'] for job_params in params]))
+
+    async def other(messages, **params):
+        calls.append(('other', params['n']))
+
+    async def scenario():
+        pool = make_pool(str(tmp_path / 'jobs.json'), handler, batch_handler, workers=2)
+        pool.register('other', other)
+        for n in range(4):
+            await pool.submit('post' if n % 2 == 0 else 'other', [], n=n)
+        await pool.start(bot=None)
+        await drain(pool)
+        await pool.stop()
+
+    asyncio.run(scenario())
+
+    assert sorted(calls) == [('batch', [0, 2]), ('other', 1), ('other', 3)]
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from services.improvement_sessions import PatchError, apply_patch
+
+
+def block(search: str, replace: str) -> str:
+    return f"<<<<<<< ИСКАТЬ\n{search}\n=======\n{replace}\n>>>>>>> ЗАМЕНИТЬ"
+
+
+def test_apply_patch_replaces_fragments_in_order():
+    text = "<b>Заголовок</b>\nПервая строка\nВторая строка"
+    reply = f"{block('Первая строка', 'Первая строка!')}\n{block('Вторая', 'Третья')}"
+
+    assert apply_patch(text, reply) == "<b>Заголовок</b>\nПервая строка!\nТретья строка"
+
+
+def test_apply_patch_replaces_only_first_occurrence():
+    assert apply_patch("а а а", block("а", "б")) == "б а а"
+
+
+def test_apply_patch_allows_empty_replacement():
+    assert apply_patch("начало\nлишнее\nконец", block("\nлишнее", "")) == "начало\nконец"
+
+
+def test_apply_patch_without_blocks_raises():
+    with pytest.raises(PatchError):
+        apply_patch("текст", "Вот исправленный пост целиком")
+
+
+def test_apply_patch_with_missing_fragment_raises():
+    with pytest.raises(PatchError):
+        apply_patch("текст поста", block("чего нет", "замена"))
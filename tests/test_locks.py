@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from utils.locks import CallbackDedupMiddleware, post_locks
+
+
+class FakeCallback:
+    """Минимальный CallbackQuery: пользователь, сообщение, данные и ответы"""
+
+    def __init__(self, data: str, user_id: int = 1, message_id: int = 10):
+        self.data = data
+        self.from_user = SimpleNamespace(id=user_id)
+        self.message = SimpleNamespace(message_id=message_id)
+        self.inline_message_id = None
+        self.answers = []
+
+    async def answer(self, text=None, **kwargs):
+        self.answers.append(text)
+
+
+def run_handlers(middleware, events, delay=0.0):
+    calls = []
+
+    async def handler(event, data):
+        calls.append(event.data)
+        await asyncio.sleep(delay)
+        return 'ok'
+
+    async def run():
+        return await asyncio.gather(*(middleware(handler, event, {}) for event in events))
+
+    return asyncio.run(run()), calls
+
+
+def test_parallel_duplicate_is_answered_without_handling():
+    middleware = CallbackDedupMiddleware(ttl=3)
+    first, duplicate = FakeCallback('nav:menu'), FakeCallback('nav:menu')
+
+    results, calls = run_handlers(middleware, [first, duplicate], delay=0.01)
+
+    assert results == ['ok', None]
+    assert calls == ['nav:menu']
+    assert duplicate.answers and middleware.duplicates == 1
+
+
+def test_action_is_rejected_within_ttl_after_completion():
+    middleware = CallbackDedupMiddleware(ttl=3)
+
+    run_handlers(middleware, [FakeCallback('batch:publish_all:1:0')])
+    _, calls = run_handlers(middleware, [FakeCallback('batch:publish_all:1:0')])
+
+    assert calls == []
+
+
+def test_navigation_can_repeat_right_after_completion():
+    middleware = CallbackDedupMiddleware(ttl=3)
+
+    for data in ('batch:page:1:2', 'schedule:none:5::', 'nav:menu'):
+        run_handlers(middleware, [FakeCallback(data)])
+        _, calls = run_handlers(middleware, [FakeCallback(data)])
+        assert calls == [data]
+
+
+def test_other_user_or_message_is_not_a_duplicate():
+    middleware = CallbackDedupMiddleware(ttl=3)
+    events = [
+        FakeCallback('post:publish:1'),
+        FakeCallback('post:publish:1', user_id=2),
+        FakeCallback('post:publish:1', message_id=11),
+    ]
+
+    _, calls = run_handlers(middleware, events, delay=0.01)
+
+    assert len(calls) == 3
+
+
+def test_scheduling_waits_for_publish_of_same_post(monkeypatch):
+    import handlers.scheduler as scheduler_handlers
+    from utils.post_storage import PostStorage
+
+    storage = PostStorage()
+    monkeypatch.setattr(scheduler_handlers, 'post_storage', storage)
+    post_id = storage.add_pending_post("Текст", user_id=1)
+    callback = FakeCallback('schedule:quick:1')
+
+    async def scenario():
+        async with post_locks.lock(('pending', post_id)):
+            task = asyncio.create_task(
+                scheduler_handlers.schedule_post_and_finish(callback, post_id, datetime(2024, 1, 1, 9, 0), None)
+            )
+            await asyncio.sleep(0)
+            # Немедленная публикация забрала пост, пока планирование ждало блокировку
+            storage.remove_pending_post(post_id)
+        await task
+
+    asyncio.run(scenario())
+
+    assert storage.scheduled_posts == {}
+    assert callback.answers == ["❌ Пост не найден"]
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+
+import main
+from config import PROMPT_PATHS
+from utils.instance_lock import InstanceLock
+
+
+def test_startup_and_shutdown(tmp_path, monkeypatch):
+    # Пути к данным относительные - весь запуск идет во временном каталоге
+    monkeypatch.chdir(tmp_path)
+    sent = []
+
+    async def send_message(chat_id, text, **kwargs):
+        sent.append(text)
+
+    async def warmup():
+        pass
+
+    monkeypatch.setattr(main.bot, 'send_message', send_message)
+    monkeypatch.setattr(main.ai_processor, 'warmup', warmup)
+
+    async def scenario():
+        await main.on_startup()
+        running = main.scheduler_service is not None and main.ai_worker_pool.is_running
+        await main.on_shutdown()
+        return running
+
+    assert asyncio.run(scenario())
+    assert len(sent) == 2
+    assert os.path.isdir(main.storage_journal.directory)
+    assert all(os.path.exists(path) for path in PROMPT_PATHS.values())
+
+
+def test_profile_imports_works_without_api_token():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {key: value for key, value in os.environ.items() if key != 'API_TOKEN'}
+
+    result = subprocess.run(
+        [sys.executable, 'main.py', '--profile-imports'],
+        capture_output=True, text=True, encoding='utf-8', cwd=root, env=env, timeout=120
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert 'Импорт main' in result.stdout
+
+
+def test_startup_refuses_directories_of_running_instance(tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    other = InstanceLock()
+    other.acquire([main.SETTINGS['journal_dir']])
+
+    try:
+        with pytest.raises(SystemExit):
+            asyncio.run(main.on_startup())
+    finally:
+        other.release()
+
+    assert 'другой экземпляр' in capsys.readouterr().out
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import handlers.post_creation as post_creation
+from utils.post_storage import PostStorage
+
+
+def make_message(text, bot, **media):
+    fields = dict.fromkeys(('caption', 'caption_entities', 'photo', 'video', 'document',
+                            'animation', 'voice', 'video_note'))
+    return SimpleNamespace(text=text, bot=bot, **{**fields, **media})
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    storage = PostStorage()
+    monkeypatch.setattr(post_creation, 'post_storage', storage)
+
+    async def prepare_post_variants(message, prompt_type):
+        return [f"Пост: {message.text}", f"Вариант: {message.text}"]
+
+    async def prepare_many_posts(messages, prompt_type):
+        return [f"Пост: {message.text}" for message in messages]
+
+    monkeypatch.setattr(post_creation, 'prepare_post_variants', prepare_post_variants)
+    monkeypatch.setattr(post_creation, 'prepare_many_posts', prepare_many_posts)
+
+    sent = []
+
+    async def send_message(chat_id, text, **kwargs):
+        sent.append(chat_id)
+
+    bot = SimpleNamespace(send_message=send_message)
+    return SimpleNamespace(chats=sent, storage=storage, bot=bot)
+
+
+def test_preview_goes_to_sender_chat(sent):
+    message = make_message("новость", sent.bot)
+
+    asyncio.run(post_creation.process_single_message_and_preview(message, chat_id=777, user_id=777))
+
+    assert sent.chats == [777]
+    assert [post['user_id'] for post in sent.storage.pending_posts.values()] == [777]
+
+
+def test_batched_previews_go_to_each_sender(sent):
+    messages = [make_message(f"новость {n}", sent.bot) for n in range(2)]
+    params = [{'chat_id': 111, 'user_id': 111}, {'chat_id': 222, 'user_id': 222}]
+
+    asyncio.run(post_creation._run_single_batch([[message] for message in messages], params))
+
+    assert sent.chats == [111, 222]
+
+
+def test_batched_previews_keep_variants_and_caption_limit(sent, monkeypatch):
+    monkeypatch.setitem(post_creation.SETTINGS, 'ai_candidates', 2)
+    monkeypatch.setitem(post_creation.SETTINGS, 'media_caption_limit', 10)
+    photo = [SimpleNamespace(file_id='photo')]
+    messages = [make_message("длинная новость", sent.bot, photo=photo), make_message("текст", sent.bot)]
+    params = [{'chat_id': 1, 'user_id': 1}, {'chat_id': 1, 'user_id': 1}]
+
+    asyncio.run(post_creation._run_single_batch([[message] for message in messages], params))
+
+    media_post, text_post = sent.storage.pending_posts.values()
+    assert media_post['variants'] == ["Пост: длин...", "Вариант: д..."]
+    assert text_post['variants'] == ["Пост: текст", "Вариант: текст"]
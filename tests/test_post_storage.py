@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.clock import SimulatedClock, clock
+from utils.post_storage import PostStorage
+
+START = datetime(2024, 1, 1, 8, 0)
+
+
+@pytest.fixture
+def simulated(monkeypatch):
+    source = SimulatedClock(START)
+    monkeypatch.setattr(clock, '_source', source)
+    return source
+
+
+def test_status_timestamp_changes_only_with_status(simulated):
+    storage = PostStorage()
+    post_id = storage.schedule_post("Текст", START + timedelta(hours=1), user_id=1)
+    storage.cancel_scheduled_post(post_id)
+    cancelled_at = storage.get_scheduled_post(post_id)['status_changed_at']
+
+    simulated.advance(timedelta(hours=5))
+    storage.update_scheduled_post(post_id, processed_text="Правка")
+
+    assert storage.get_scheduled_post(post_id)['status_changed_at'] == cancelled_at
+
+
+def test_cleanup_removes_stale_pending_and_finished_posts(simulated):
+    storage = PostStorage()
+    pending_id = storage.add_pending_post("Превью", user_id=1)
+    scheduled_id = storage.schedule_post("Текст", START + timedelta(hours=1), user_id=1)
+    storage.mark_post_published(scheduled_id)
+
+    simulated.advance(timedelta(days=10))
+    fresh_id = storage.add_pending_post("Свежее превью", user_id=1)
+    storage.cleanup_old_posts(days=7)
+
+    assert list(storage.pending_posts) == [fresh_id]
+    assert pending_id not in storage.pending_posts
+    assert storage.scheduled_posts == {}
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime
+
+import pytest
+
+from utils.publish_leases import PublishLeaseStore, lease_key
+
+
+@pytest.fixture
+def stores(tmp_path):
+    path = str(tmp_path / 'leases.sqlite3')
+    first, second = PublishLeaseStore(path, owner='first'), PublishLeaseStore(path, owner='second')
+    yield first, second
+    first.close()
+    second.close()
+
+
+def test_claim_is_exclusive_until_completed(stores):
+    first, second = stores
+
+    claimed, _ = first.claim_batch(['post'], ttl=60)
+    assert list(claimed) == ['post']
+    assert second.claim_batch(['post'], ttl=60) == ({}, set())
+
+    assert first.complete('post', claimed['post'])
+    assert second.claim_batch(['post'], ttl=60) == ({}, {'post'})
+
+
+def test_expired_lease_is_taken_over_with_newer_token(stores):
+    first, second = stores
+
+    old_token = first.claim_batch(['post'], ttl=-1)[0]['post']
+    new_token = second.claim_batch(['post'], ttl=60)[0]['post']
+
+    assert new_token > old_token
+    assert not first.is_current('post', old_token)
+    assert second.is_current('post', new_token)
+
+
+def test_stale_token_cannot_complete_renew_or_release(stores):
+    first, second = stores
+
+    old_token = first.claim_batch(['post'], ttl=-1)[0]['post']
+    new_token = second.claim_batch(['post'], ttl=60)[0]['post']
+
+    assert not first.complete('post', old_token)
+    assert not first.renew('post', old_token)
+    assert not first.release('post', old_token)
+    assert second.complete('post', new_token)
+
+
+def test_released_post_can_be_claimed_again(stores):
+    first, second = stores
+
+    token = first.claim_batch(['post'], ttl=60)[0]['post']
+    assert first.release('post', token)
+
+    assert list(second.claim_batch(['post'], ttl=60)[0]) == ['post']
+
+
+def test_claim_batch_respects_limit(stores):
+    first, _ = stores
+
+    claimed, _ = first.claim_batch([f"post-{n}" for n in range(5)], ttl=60, limit=2)
+
+    assert list(claimed) == ['post-0', 'post-1']
+
+
+def test_rescheduled_post_gets_new_lease_key():
+    post = {'id': 1, 'uid': 'abc', 'publish_time': datetime(2024, 1, 1, 9, 0)}
+
+    assert lease_key({**post, 'publish_time': datetime(2024, 1, 1, 10, 0)}) != lease_key(post)
+
+
+def test_lease_key_uses_global_uid_and_publish_time():
+    publish_time = datetime(2024, 1, 1, 9, 0)
+    post = {'id': 1, 'uid': 'abc', 'publish_time': publish_time}
+
+    assert lease_key(post) == f"abc@{publish_time.isoformat()}"
+    assert lease_key({**post, 'uid': 'def'}) != lease_key(post)
+
+
+def test_due_posts_are_claimed_from_shared_queue(stores):
+    first, second = stores
+    publish_time = datetime(2024, 1, 1, 9, 0)
+    first.sync_posts({'abc': (publish_time, '{"uid": "abc"}'), 'def': (publish_time.replace(hour=10), '{}')})
+
+    assert second.claim_due(datetime(2024, 1, 1, 8, 59)) == {}
+
+    claimed = second.claim_due(datetime(2024, 1, 1, 9, 30))
+    key = f"abc@{publish_time.isoformat()}"
+    assert list(claimed) == [key]
+    token, payload = claimed[key]
+    assert payload == '{"uid": "abc"}'
+
+    # Опубликованный пост уходит из очереди и не возвращается при повторной синхронизации
+    assert second.complete(key, token)
+    first.sync_posts({'abc': (publish_time, '{"uid": "abc"}')})
+    assert first.claim_due(datetime(2024, 1, 1, 9, 30)) == {}
+
+
+def test_removed_post_is_not_claimed(stores):
+    first, second = stores
+    first.sync_posts({'abc': (datetime(2024, 1, 1, 9, 0), '{}')})
+    first.sync_posts({}, removed=['abc'])
+
+    assert second.claim_due(datetime(2024, 1, 1, 10, 0)) == {}
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+import services.scheduler_service as scheduler_module
+from services.scheduler_service import SchedulerService
+from utils.clock import SimulatedClock, clock
+from utils.post_storage import PostStorage
+from utils.publish_leases import PublishLeaseStore
+
+START = datetime(2024, 1, 1, 8, 0)
+
+
+@pytest.fixture
+def simulated(monkeypatch):
+    source = SimulatedClock(START)
+    monkeypatch.setattr(clock, '_source', source)
+    return source
+
+
+@pytest.fixture
+def published(monkeypatch):
+    published = []
+
+    async def publish(self, post_data):
+        published.append((self.leases.owner, post_data['uid']))
+        return scheduler_module.post_storage.mark_post_published(post_data['id'])
+
+    monkeypatch.setattr(SchedulerService, '_publish_scheduled_post', publish)
+    return published
+
+
+def make_instance(db_path, owner, storage, monkeypatch):
+    monkeypatch.setattr(scheduler_module, 'post_storage', storage)
+    service = SchedulerService(bot=None, leases=PublishLeaseStore(db_path, owner=owner))
+    storage.subscribe(service._on_storage_event)
+    return service
+
+
+def test_survivor_publishes_post_of_crashed_instance(tmp_path, monkeypatch, simulated, published):
+    db_path = str(tmp_path / 'leases.sqlite3')
+    storage_first, storage_second = PostStorage(), PostStorage()
+
+    async def scenario():
+        first = make_instance(db_path, 'first', storage_first, monkeypatch)
+        post_id = storage_first.schedule_post("Текст", START + timedelta(minutes=5), user_id=1)
+        uid = storage_first.get_scheduled_post(post_id)['uid']
+        await first._sync_shared_queue()
+        # Первый экземпляр падает до времени публикации
+        first.leases.close()
+
+        simulated.advance(timedelta(minutes=10))
+        second = make_instance(db_path, 'second', storage_second, monkeypatch)
+        await second._check_and_publish_posts()
+        await second._check_and_publish_posts()
+
+        # Вернувшийся экземпляр не публикует пост повторно, а отмечает его опубликованным
+        first = make_instance(db_path, 'first', storage_first, monkeypatch)
+        await first._check_and_publish_posts()
+
+        second.leases.close()
+        first.leases.close()
+        return uid, post_id
+
+    uid, post_id = asyncio.run(scenario())
+
+    assert published == [('second', uid)]
+    assert [post['uid'] for post in storage_second.scheduled_posts.values()] == [uid]
+    assert storage_first.get_scheduled_post(post_id)['status'] == 'published'
+
+
+def test_cancelled_post_leaves_shared_queue(tmp_path, monkeypatch, simulated, published):
+    db_path = str(tmp_path / 'leases.sqlite3')
+    storage = PostStorage()
+
+    async def scenario():
+        service = make_instance(db_path, 'first', storage, monkeypatch)
+        post_id = storage.schedule_post("Текст", START + timedelta(minutes=5), user_id=1)
+        await service._sync_shared_queue()
+        storage.cancel_scheduled_post(post_id)
+
+        simulated.advance(timedelta(minutes=10))
+        await service._check_and_publish_posts()
+        service.leases.close()
+
+    asyncio.run(scenario())
+
+    assert published == []
+
+
+def test_compaction_saves_usage_stats_off_event_loop(monkeypatch, simulated):
+    threads = []
+    monkeypatch.setattr(scheduler_module, 'post_storage', PostStorage())
+    monkeypatch.setattr(scheduler_module.usage_stats, 'save', lambda: threads.append(threading.get_ident()))
+
+    async def scenario():
+        service = SchedulerService(bot=None)
+        await service._compact_storage_if_due()
+        simulated.advance(timedelta(days=1))
+        await service._compact_storage_if_due()
+
+    asyncio.run(scenario())
+
+    assert len(threads) == 1 and threads[0] != threading.get_ident()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+from datetime import datetime, timedelta
+
+from utils.slot_index import SlotOccupancyIndex
+
+SLOT_START = datetime(2024, 1, 1, 9, 0)
+SLOT_END = datetime(2024, 1, 1, 10, 0)
+
+
+def make_index(*times, spacing=10, max_posts=0):
+    index = SlotOccupancyIndex(min_spacing_minutes=spacing, max_posts_per_slot=max_posts)
+    for post_id, publish_time in enumerate(times):
+        index.add(post_id, publish_time)
+    return index
+
+
+def test_empty_slot_gives_whole_minute_inside_slot():
+    minute = make_index().find_free_minute(SLOT_START, SLOT_END)
+
+    assert SLOT_START <= minute < SLOT_END
+    assert minute.second == minute.microsecond == 0
+
+
+def test_picks_middle_of_widest_gap():
+    index = make_index(datetime(2024, 1, 1, 9, 0), datetime(2024, 1, 1, 9, 40), datetime(2024, 1, 1, 9, 50))
+
+    assert index.find_free_minute(SLOT_START, SLOT_END) == datetime(2024, 1, 1, 9, 20)
+
+
+def test_respects_spacing_to_neighbours_with_seconds():
+    left, right = datetime(2024, 1, 1, 9, 0, 30), datetime(2024, 1, 1, 9, 20, 45)
+    index = make_index(left, right)
+
+    # Между соседями 20 мин 15 с: при spacing 10 мин целой минуты там нет
+    assert index.find_free_minute(SLOT_START, datetime(2024, 1, 1, 9, 31)) is None
+
+    # Ближайшая допустимая минута после соседа в 9:00:30 - 9:11, а не 9:10
+    minute = make_index(left).find_free_minute(SLOT_START, datetime(2024, 1, 1, 9, 12))
+    assert minute == datetime(2024, 1, 1, 9, 11)
+    assert minute - left >= timedelta(minutes=10)
+
+
+def test_full_slot_returns_none():
+    index = make_index(datetime(2024, 1, 1, 9, 10), datetime(2024, 1, 1, 9, 40), max_posts=2)
+
+    assert index.find_free_minute(SLOT_START, SLOT_END) is None
+
+
+def test_removed_post_frees_its_place():
+    index = make_index(datetime(2024, 1, 1, 9, 30), spacing=31)
+    assert index.find_free_minute(SLOT_START, SLOT_END) is None
+
+    index.remove(0)
+    assert index.find_free_minute(SLOT_START, SLOT_END) is not None
+
+
+def test_distribution_uses_occupancy_and_short_slots():
+    from utils.time_slots import TimeSlotManager
+
+    # 2024-01-01 - понедельник; второй слот короче двух минут
+    schedule = {'monday': [{'start': '09:00', 'end': '09:30'}, {'start': '10:00', 'end': '10:01'}]}
+    occupancy = make_index(datetime(2024, 1, 1, 9, 15), spacing=10)
+    manager = TimeSlotManager(schedule=schedule, periods={}, occupancy=occupancy)
+
+    times = manager.distribute_posts_in_slots(3, datetime(2024, 1, 1, 8, 0), days_ahead=1)
+
+    assert len(times) == 3 and times[-1] == datetime(2024, 1, 1, 10, 0)
+    taken = sorted(times[:2] + [datetime(2024, 1, 1, 9, 15)])
+    assert all(later - earlier >= timedelta(minutes=10) for earlier, later in zip(taken, taken[1:]))
+    # Резервы распределения не остаются в индексе
+    assert occupancy.count_between(SLOT_START, SLOT_END + timedelta(hours=1)) == 1
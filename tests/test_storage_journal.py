@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import os
+from datetime import datetime
+
+from utils.post_storage import PostStorage
+from utils.storage_journal import StorageJournal
+
+PUBLISH_TIME = datetime(2030, 1, 1, 9, 0)
+
+
+async def open_storage(directory: str):
+    storage, journal = PostStorage(), StorageJournal(directory)
+    await journal.start(storage, bot=None)
+    return storage, journal
+
+
+async def crash(journal: StorageJournal):
+    """Сбрасывает буфер на диск и останавливает журнал без финального снимка"""
+    journal._task.cancel()
+    await asyncio.gather(journal._task, return_exceptions=True)
+    await journal._commit()
+
+
+def scheduled_state(storage: PostStorage):
+    return {
+        post_id: (post['processed_text'], post['status'], post['publish_time'])
+        for post_id, post in storage.scheduled_posts.items()
+    }
+
+
+def test_replay_of_journal_tail_after_snapshot(tmp_path):
+    async def scenario():
+        storage, journal = await open_storage(str(tmp_path))
+        kept = storage.add_pending_post('первый', user_id=1)
+        dropped = storage.add_pending_post('второй', user_id=1)
+        cancelled = storage.schedule_post('отменен', PUBLISH_TIME, user_id=1)
+        await journal.snapshot()
+
+        # После снимка журнал обрезан до хвоста - эти записи восстанавливаются из него
+        storage.update_pending_post(kept, processed_text='первый, доработан')
+        storage.remove_pending_post(dropped)
+        storage.cancel_scheduled_post(cancelled)
+        storage.schedule_post('новый', PUBLISH_TIME, user_id=1)
+        await crash(journal)
+
+        restored, journal = await open_storage(str(tmp_path))
+        await crash(journal)
+        return storage, restored, journal
+
+    storage, restored, journal = asyncio.run(scenario())
+
+    assert {post_id: post['processed_text'] for post_id, post in restored.pending_posts.items()} == {
+        1: 'первый, доработан'
+    }
+    assert scheduled_state(restored) == scheduled_state(storage)
+    assert journal.get_stats()['seq'] == 7
+
+
+def test_torn_record_is_cut_off_on_replay(tmp_path):
+    async def scenario():
+        storage, journal = await open_storage(str(tmp_path))
+        storage.add_pending_post('целый', user_id=1)
+        await crash(journal)
+
+        size = os.path.getsize(journal._journal_path)
+        with open(journal._journal_path, 'ab') as f:
+            # Заголовок записи без полезной нагрузки - сбой посреди дозаписи
+            f.write(b'\x02\x00\x00\x00\x00\x00\x00\x00\xff\x00\x00\x00')
+
+        restored, journal = await open_storage(str(tmp_path))
+        await crash(journal)
+        return size, restored, journal
+
+    size, restored, journal = asyncio.run(scenario())
+
+    assert [post['processed_text'] for post in restored.pending_posts.values()] == ['целый']
+    assert os.path.getsize(journal._journal_path) == size
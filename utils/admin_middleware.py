@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import logging
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, FrozenSet
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from utils.config_store import config_store
+
+logger = logging.getLogger(__name__)
+
+# Сколько разных отклоненных пользователей помнить поименно
+_MAX_TRACKED_USERS = 1000
+
+
+class AdminOnlyMiddleware(BaseMiddleware):
+    """Внешний middleware диспетчера: пропускает к роутерам только админов.
+
+    Список админов хранится готовым множеством и обновляется по подписке на
+    хранилище конфигурации, поэтому апдейт от постороннего отбрасывается одной
+    проверкой в множестве, до обхода роутеров и их фильтров.
+    """
+
+    def __init__(self, store=config_store):
+        self._allowed: FrozenSet[int] = store.admin_ids
+        self.rejected = 0
+        self.rejected_users: Counter = Counter()
+        store.subscribe('admin_ids', self._on_admin_ids_changed)
+
+    def _on_admin_ids_changed(self, admin_ids: FrozenSet[int]):
+        self._allowed = admin_ids
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        # Пользователя события уже определил встроенный UserContextMiddleware
+        user = data.get('event_from_user')
+        if user is not None and user.id in self._allowed:
+            return await handler(event, data)
+
+        self.rejected += 1
+        if user is not None and (user.id in self.rejected_users or len(self.rejected_users) < _MAX_TRACKED_USERS):
+            self.rejected_users[user.id] += 1
+        logger.debug(f"Апдейт отклонен: пользователь {user.id if user else 'неизвестен'}")
+        return None
+
+    def get_stats(self) -> Dict[str, int]:
+        """Статистика отклоненных апдейтов"""
+        return {
+            'admins': len(self._allowed),
+            'rejected': self.rejected,
+            'rejected_users': len(self.rejected_users)
+        }
+
+
+# Глобальный фильтр доступа
+admin_middleware = AdminOnlyMiddleware()
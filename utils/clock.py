@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import heapq
+import itertools
+import logging
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SystemClock:
+    """Реальные часы: текущее время и ожидание через asyncio"""
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    async def sleep(self, seconds: float):
+        await asyncio.sleep(seconds)
+
+
+class SimulatedClock:
+    """Виртуальные часы для симуляций и бенчмарков.
+
+    sleep() не ждет реально, а регистрирует пробуждение; run_until() продвигает
+    время от события к событию, поэтому месяц работы проходит за секунды.
+    """
+
+    def __init__(self, start: datetime):
+        self._now = start
+        self._sleepers: List[Tuple[datetime, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    def now(self) -> datetime:
+        return self._now
+
+    def advance(self, delta: timedelta):
+        """Сдвигает время вперед без пробуждения ожидающих задач"""
+        self._now += delta
+
+    async def sleep(self, seconds: float):
+        future = asyncio.get_running_loop().create_future()
+        wake_time = self._now + timedelta(seconds=seconds)
+        heapq.heappush(self._sleepers, (wake_time, next(self._sequence), future))
+        await future
+
+    async def run_until(self, end: datetime, settle_steps: int = 5):
+        """Прокручивает время до end, по очереди пробуждая спящие задачи"""
+        while True:
+            # Даем проснувшимся задачам доработать до следующего ожидания
+            for _ in range(settle_steps):
+                await asyncio.sleep(0)
+
+            if not self._sleepers or self._sleepers[0][0] > end:
+                break
+
+            wake_time, _, future = heapq.heappop(self._sleepers)
+            self._now = max(self._now, wake_time)
+            if not future.done():
+                future.set_result(None)
+
+        self._now = max(self._now, end)
+
+
+class Clock:
+    """Подменяемые часы приложения (по умолчанию - системные)"""
+
+    def __init__(self):
+        self._source = SystemClock()
+
+    def use(self, source):
+        """Подменяет источник времени (например, на SimulatedClock)"""
+        self._source = source
+        logger.info(f"Источник времени: {type(source).__name__}")
+
+    def reset(self):
+        """Возвращает системные часы"""
+        self._source = SystemClock()
+
+    def now(self) -> datetime:
+        return self._source.now()
+
+    async def sleep(self, seconds: float):
+        await self._source.sleep(seconds)
+
+
+# Глобальные часы приложения
+clock = Clock()
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import logging
+import os
+import tempfile
+from collections import defaultdict
+from typing import Any, Callable, Dict, FrozenSet, List, Optional
+
+import config
+from config import POSTING_SCHEDULE, SCHEDULE_PERIODS, SETTINGS
+
+logger = logging.getLogger(__name__)
+
+
+def atomic_write(path: str, content: str):
+    """Записывает файл целиком через временный файл и rename"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class ConfigStore:
+    """Изменяемая конфигурация бота без перезапуска.
+
+    ID админа и группы хранятся в .env, переопределения SETTINGS и расписание
+    постинга - в JSON-файле данных. Запись атомарная и выполняется вне цикла
+    событий. После изменения подписчики получают новое значение по ключу:
+    'admin_id', 'admin_ids', 'group_id', 'settings' или 'schedule'.
+    """
+
+    def __init__(self, env_path: str = '.env', data_file: Optional[str] = None):
+        self.env_path = env_path
+        self.data_file = data_file or SETTINGS['config_data_file']
+
+        self._subscribers: Dict[str, List[Callable[[Any], None]]] = defaultdict(list)
+        self._write_lock = asyncio.Lock()
+        self._mtimes: Dict[str, Optional[float]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._admin_ids = self._build_admin_ids()
+
+    # =============================================
+    # ЧТЕНИЕ
+    # =============================================
+
+    @property
+    def admin_id(self) -> Optional[int]:
+        return config.ADMIN_ID
+
+    @property
+    def group_id(self) -> Optional[int]:
+        return config.GROUP_ID
+
+    @property
+    def admin_ids(self) -> FrozenSet[int]:
+        """Все пользователи с доступом к боту: основной админ и дополнительные"""
+        return self._admin_ids
+
+    def is_admin(self, user_id: int) -> bool:
+        """Проверяет, есть ли пользователь в списке админов"""
+        return user_id in self._admin_ids
+
+    @staticmethod
+    def _build_admin_ids() -> FrozenSet[int]:
+        admin_ids = {int(user_id) for user_id in SETTINGS['extra_admin_ids']}
+        if config.ADMIN_ID:
+            admin_ids.add(config.ADMIN_ID)
+        return frozenset(admin_ids)
+
+    def _refresh_admin_ids(self):
+        admin_ids = self._build_admin_ids()
+        if admin_ids != self._admin_ids:
+            self._admin_ids = admin_ids
+            self._notify('admin_ids', admin_ids)
+
+    # =============================================
+    # ПОДПИСКИ
+    # =============================================
+
+    def subscribe(self, key: str, callback: Callable[[Any], None]):
+        """Подписывает обработчик на изменение ключа конфигурации"""
+        self._subscribers[key].append(callback)
+
+    def _notify(self, key: str, value: Any):
+        for callback in self._subscribers[key]:
+            try:
+                callback(value)
+            except Exception as e:
+                logger.error(f"Ошибка подписчика конфигурации ({key}): {e}")
+
+    # =============================================
+    # ID АДМИНА И ГРУППЫ (.env)
+    # =============================================
+
+    async def set_admin_id(self, new_admin_id: int) -> bool:
+        """Меняет ID админа в .env и применяет без перезапуска"""
+        if not await self._update_env('MY_ID', new_admin_id):
+            return False
+        self._apply_ids(admin_id=new_admin_id)
+        return True
+
+    async def set_group_id(self, new_group_id: int) -> bool:
+        """Меняет ID группы в .env и применяет без перезапуска"""
+        if not await self._update_env('GROUP_ID', new_group_id):
+            return False
+        self._apply_ids(group_id=new_group_id)
+        return True
+
+    async def _update_env(self, key: str, value: Any) -> bool:
+        try:
+            async with self._write_lock:
+                await asyncio.to_thread(self._write_env_value, key, value)
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка обновления {key} в {self.env_path}: {e}")
+            return False
+
+    def _write_env_value(self, key: str, value: Any):
+        """Обновляет или добавляет ключ в .env (в рабочем потоке)"""
+        lines = []
+        if os.path.exists(self.env_path):
+            with open(self.env_path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+
+        for i, line in enumerate(lines):
+            if line.startswith(f'{key}='):
+                lines[i] = f'{key}={value}\n'
+                break
+        else:
+            if lines and not lines[-1].endswith('\n'):
+                lines[-1] += '\n'
+            lines.append(f'{key}={value}\n')
+
+        atomic_write(self.env_path, ''.join(lines))
+        self._mtimes[self.env_path] = os.path.getmtime(self.env_path)
+
+    def _apply_ids(self, admin_id: Optional[int] = None, group_id: Optional[int] = None):
+        if admin_id is not None and admin_id != config.ADMIN_ID:
+            config.ADMIN_ID = admin_id
+            logger.info(f"ID админа изменен на {admin_id}")
+            self._notify('admin_id', admin_id)
+            self._refresh_admin_ids()
+
+        if group_id is not None and group_id != config.GROUP_ID:
+            config.GROUP_ID = group_id
+            logger.info(f"ID группы изменен на {group_id}")
+            self._notify('group_id', group_id)
+
+    # =============================================
+    # НАСТРОЙКИ И РАСПИСАНИЕ (файл данных)
+    # =============================================
+
+    async def update_settings(self, changes: Dict[str, Any]) -> bool:
+        """Переопределяет значения SETTINGS и сохраняет их в файл данных"""
+        unknown = set(changes) - set(SETTINGS)
+        if unknown:
+            logger.error(f"Неизвестные настройки: {', '.join(sorted(unknown))}")
+            return False
+
+        return await self._update_data({'settings': changes})
+
+    async def update_schedule(self, schedule: Dict[str, List[Dict[str, str]]]) -> bool:
+        """Заменяет расписание постинга и сохраняет его в файл данных"""
+        return await self._update_data({'posting_schedule': schedule})
+
+    async def _update_data(self, changes: Dict[str, Any]) -> bool:
+        try:
+            async with self._write_lock:
+                data = await asyncio.to_thread(self._read_data)
+                for section, value in changes.items():
+                    if section == 'settings':
+                        data.setdefault('settings', {}).update(value)
+                    else:
+                        data[section] = value
+                await asyncio.to_thread(self._write_data, data)
+        except Exception as e:
+            logger.error(f"Ошибка сохранения {self.data_file}: {e}")
+            return False
+
+        self._apply_data(data)
+        return True
+
+    def _read_data(self) -> Dict[str, Any]:
+        if not os.path.exists(self.data_file):
+            return {}
+        with open(self.data_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write_data(self, data: Dict[str, Any]):
+        atomic_write(self.data_file, json.dumps(data, ensure_ascii=False, indent=2))
+        self._mtimes[self.data_file] = os.path.getmtime(self.data_file)
+
+    def _apply_data(self, data: Dict[str, Any]):
+        """Применяет файл данных к SETTINGS и расписанию (словари меняются на месте)"""
+        overrides = {
+            key: value for key, value in data.get('settings', {}).items()
+            if key in SETTINGS and SETTINGS[key] != value
+        }
+        if overrides:
+            SETTINGS.update(overrides)
+            logger.info(f"Применены настройки: {', '.join(sorted(overrides))}")
+            self._notify('settings', overrides)
+            if 'extra_admin_ids' in overrides:
+                self._refresh_admin_ids()
+
+        schedule_changed = False
+        for section, target in (('posting_schedule', POSTING_SCHEDULE), ('schedule_periods', SCHEDULE_PERIODS)):
+            if section in data and data[section] != target:
+                target.clear()
+                target.update(data[section])
+                schedule_changed = True
+
+        if schedule_changed:
+            logger.info("Применено новое расписание постинга")
+            self._notify('schedule', POSTING_SCHEDULE)
+
+    # =============================================
+    # ЗАГРУЗКА И ОТСЛЕЖИВАНИЕ ИЗМЕНЕНИЙ
+    # =============================================
+
+    async def start(self):
+        """Загружает файл данных и начинает следить за изменениями файлов"""
+        await self.reload()
+        self._task = asyncio.create_task(self._watch_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def reload(self):
+        """Перечитывает измененные с прошлой загрузки .env и файл данных"""
+        if self._changed(self.data_file):
+            try:
+                self._apply_data(await asyncio.to_thread(self._read_data))
+            except Exception as e:
+                logger.error(f"Ошибка чтения {self.data_file}: {e}")
+
+        if self._changed(self.env_path):
+            try:
+                from dotenv import dotenv_values
+                values = await asyncio.to_thread(dotenv_values, self.env_path)
+                self._apply_ids(
+                    admin_id=int(values['MY_ID']) if values.get('MY_ID') else None,
+                    group_id=int(values['GROUP_ID']) if values.get('GROUP_ID') else None
+                )
+            except Exception as e:
+                logger.error(f"Ошибка чтения {self.env_path}: {e}")
+
+    def _changed(self, path: str) -> bool:
+        """Изменился ли файл с прошлой проверки (по mtime)"""
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        changed = mtime != self._mtimes.get(path)
+        self._mtimes[path] = mtime
+        return changed and mtime is not None
+
+    async def _watch_loop(self):
+        while True:
+            await asyncio.sleep(SETTINGS['config_watch_interval'])
+            await self.reload()
+
+
+# Глобальное хранилище конфигурации
+config_store = ConfigStore()
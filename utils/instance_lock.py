@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+from typing import IO, Dict, Iterable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+class InstanceLockError(RuntimeError):
+    """Каталог данных уже занят другим запущенным экземпляром бота"""
+
+
+class InstanceLock:
+    """Эксклюзивная блокировка каталогов данных одним экземпляром бота.
+
+    Журнал хранилища, очередь AI-задач и архив пишет только свой процесс:
+    у каждого экземпляра свой счетчик записей журнала, и его снимок затер бы
+    чужие записи. Несколько экземпляров делят только базу аренд
+    (SETTINGS['scheduler_lease_db']). Блокировка - файл .instance.lock в
+    каталоге под flock (msvcrt на Windows); если процесс упал, ее снимает ОС.
+    """
+
+    LOCK_NAME = '.instance.lock'
+
+    def __init__(self):
+        self._handles: Dict[str, IO] = {}
+
+    def acquire(self, directories: Iterable[str]):
+        """Блокирует каталоги; InstanceLockError, если любой из них уже занят"""
+        try:
+            for directory in directories:
+                self._acquire_one(os.path.abspath(directory))
+        except Exception:
+            self.release()
+            raise
+
+    def _acquire_one(self, directory: str):
+        if directory in self._handles:
+            return
+
+        os.makedirs(directory, exist_ok=True)
+        handle = open(os.path.join(directory, self.LOCK_NAME), 'a+', encoding='utf-8')
+        try:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            owner = self._read_owner(handle)
+            handle.close()
+            raise InstanceLockError(f"Каталог {directory} уже использует другой экземпляр бота (PID {owner})")
+
+        handle.seek(0)
+        handle.truncate()
+        handle.write(str(os.getpid()))
+        handle.flush()
+        self._handles[directory] = handle
+        logger.debug(f"Каталог {directory} закреплен за процессом {os.getpid()}")
+
+    @staticmethod
+    def _read_owner(handle: IO) -> str:
+        try:
+            handle.seek(0)
+            return handle.read().strip() or '?'
+        except OSError:
+            return '?'
+
+    def release(self):
+        """Снимает все блокировки (закрытие файла освобождает flock)"""
+        for handle in self._handles.values():
+            handle.close()
+        self._handles.clear()
+
+
+# Глобальная блокировка каталогов данных процесса
+instance_lock = InstanceLock()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery
+
+from config import MESSAGES, SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# Кнопки действий над постами: повтор после завершения тоже считается дублем.
+# Навигацию (меню, листание пакета, выбор дня) повторять можно сразу после обработки.
+_ACTION_PREFIXES = (
+    'post:', 'queue:publish_now:', 'queue:cancel:', 'admin:',
+    'batch:publish_all:', 'batch:distribute_all:', 'batch:delete_all:',
+    'schedule:day_morning:', 'schedule:quick_time:', 'schedule:quick:'
+)
+
+
+class KeyedLockRegistry:
+    """Реестр asyncio-блокировок по ключу (например, по ID поста).
+
+    Блокировка создается при первом обращении и удаляется, когда ее больше
+    никто не держит и не ждет, поэтому реестр не растет с числом постов.
+    """
+
+    def __init__(self):
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._waiters: Dict[Hashable, int] = {}
+
+    @asynccontextmanager
+    async def lock(self, key: Hashable):
+        """Захватывает блокировку ключа на время блока async with"""
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                del self._locks[key]
+
+    def locked(self, key: Hashable) -> bool:
+        """Занят ли ключ прямо сейчас"""
+        lock = self._locks.get(key)
+        return lock is not None and lock.locked()
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+class CallbackDedupMiddleware(BaseMiddleware):
+    """Отвечает на повторные нажатия той же кнопки без повторной обработки.
+
+    Ключ - пользователь, сообщение и данные кнопки. Пока первая обработка
+    идет (а для действий над постами - еще ttl секунд после нее), дубликат
+    сразу получает ответ из кэша.
+    """
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = SETTINGS['callback_dedup_ttl'] if ttl is None else ttl
+        self._in_flight: Set[Tuple] = set()
+        # Завершенные нажатия: ключ -> момент истечения (по возрастанию)
+        self._recent: "OrderedDict[Tuple, float]" = OrderedDict()
+        self.duplicates = 0
+
+    async def __call__(
+            self,
+            handler: Callable[[CallbackQuery, Dict[str, Any]], Awaitable[Any]],
+            event: CallbackQuery,
+            data: Dict[str, Any]
+    ) -> Any:
+        self._prune(time.monotonic())
+
+        message_id = event.message.message_id if event.message else event.inline_message_id
+        key = (event.from_user.id, message_id, event.data)
+
+        if key in self._in_flight or key in self._recent:
+            self.duplicates += 1
+            logger.info(f"Повторный callback {event.data} отклонен")
+            await event.answer(MESSAGES['duplicate_callback'])
+            return None
+
+        self._in_flight.add(key)
+        try:
+            return await handler(event, data)
+        finally:
+            self._in_flight.discard(key)
+            if event.data and event.data.startswith(_ACTION_PREFIXES):
+                self._recent[key] = time.monotonic() + self.ttl
+
+    def _prune(self, now: float):
+        """Удаляет истекшие записи"""
+        while self._recent:
+            key, expires_at = next(iter(self._recent.items()))
+            if expires_at > now:
+                break
+            del self._recent[key]
+
+
+# Глобальный реестр блокировок постов
+post_locks = KeyedLockRegistry()
+
+# Глобальный фильтр повторных нажатий
+callback_dedup = CallbackDedupMiddleware()
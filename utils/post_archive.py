@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import logging
+import os
+import re
+import sqlite3
+import struct
+import threading
+import zlib
+from typing import Any, Dict, List, Optional
+
+from config import SETTINGS
+from services.link_extractor import extract_urls_with_regex
+from services.media_handler import MediaProcessor
+from utils.clock import clock
+
+logger = logging.getLogger(__name__)
+media_processor = MediaProcessor()
+
+# Заголовок записи в сегменте: длина сжатого блока
+_RECORD_HEADER = struct.Struct('<I')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    post_id INTEGER,
+    chat_id INTEGER,
+    message_ids TEXT,
+    published_at TEXT,
+    segment INTEGER,
+    offset INTEGER,
+    length INTEGER
+);
+CREATE INDEX IF NOT EXISTS posts_published_at ON posts (published_at);
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5 (
+    text, links, hashtags, content=''
+);
+"""
+
+
+class PostArchive:
+    """Архив опубликованных постов.
+
+    Записи хранятся только дозаписью в сжатых zlib-сегментах, а SQLite FTS5
+    индексирует текст, ссылки и хэштеги. В памяти архив не держится: поиск
+    читает из сегментов только найденные записи.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or SETTINGS['archive_dir']
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._segment_number = 0
+        self._segment_size = 0
+        # Запись в рабочем потоке; симуляции на виртуальном времени пишут синхронно
+        self.offload = True
+
+    # =============================================
+    # ЗАПИСЬ
+    # =============================================
+
+    async def record(
+            self,
+            post_data: Dict[str, Any],
+            message_ids: List[int],
+            chat_id: int,
+            attempts: int = 1
+    ) -> Optional[int]:
+        """Добавляет опубликованный пост в архив, возвращает номер записи"""
+        try:
+            entry = self._build_entry(post_data, message_ids, chat_id, attempts)
+            if not self.offload:
+                return self._append(entry)
+            return await asyncio.to_thread(self._append, entry)
+        except Exception as e:
+            logger.error(f"Ошибка записи поста #{post_data.get('id', 'unknown')} в архив: {e}")
+            return None
+
+    @staticmethod
+    def _build_entry(
+            post_data: Dict[str, Any],
+            message_ids: List[int],
+            chat_id: int,
+            attempts: int
+    ) -> Dict[str, Any]:
+        """Собирает запись архива из данных поста (без объектов Message)"""
+        messages = post_data.get('original_messages') or (
+            [post_data['original_message']] if post_data.get('original_message') else []
+        )
+        media = []
+        for message in messages:
+            media_info = media_processor.extract_media_info(message)
+            if media_info['has_media']:
+                media.append({'type': media_info['type'], 'file_id': media_info['file_id']})
+
+        publish_time = post_data.get('publish_time')
+        created_at = post_data.get('created_at')
+
+        return {
+            'post_id': post_data.get('id'),
+            'chat_id': chat_id,
+            'message_ids': message_ids,
+            'text': post_data.get('processed_text') or "",
+            'media': media,
+            'created_at': created_at.isoformat() if created_at else None,
+            'publish_time': publish_time.isoformat() if publish_time else None,
+            'published_at': clock.now().isoformat(),
+            'attempts': attempts
+        }
+
+    def _append(self, entry: Dict[str, Any]) -> int:
+        """Дописывает запись в текущий сегмент и индексирует ее (в рабочем потоке)"""
+        with self._lock:
+            self._ensure_open()
+
+            if self._segment_size >= SETTINGS['archive_segment_size']:
+                self._segment_number += 1
+                self._segment_size = 0
+
+            blob = zlib.compress(json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+            with open(self._segment_path(self._segment_number), 'ab') as f:
+                f.write(_RECORD_HEADER.pack(len(blob)))
+                offset = self._segment_size + _RECORD_HEADER.size
+                f.write(blob)
+            self._segment_size = offset + len(blob)
+
+            plain_text = re.sub(r'<[^>]+>', ' ', entry['text'])
+            links = re.findall(r'href="([^"]+)"', entry['text']) + extract_urls_with_regex(plain_text)
+            hashtags = re.findall(r'#(\w+)', plain_text)
+
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT INTO posts (post_id, chat_id, message_ids, published_at, segment, offset, length) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (entry['post_id'], entry['chat_id'], json.dumps(entry['message_ids']),
+                     entry['published_at'], self._segment_number, offset, len(blob))
+                )
+                record_id = cursor.lastrowid
+                self._conn.execute(
+                    "INSERT INTO posts_fts (rowid, text, links, hashtags) VALUES (?, ?, ?, ?)",
+                    (record_id, plain_text, " ".join(sorted(set(links))), " ".join(hashtags))
+                )
+
+            logger.debug(f"Пост #{entry['post_id']} записан в архив (запись {record_id})")
+            return record_id
+
+    # =============================================
+    # ПОИСК
+    # =============================================
+
+    async def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Полнотекстовый поиск по архиву (самые релевантные первыми)"""
+        match = self._build_match_query(query)
+        if not match:
+            return []
+        return await asyncio.to_thread(self._search, match, limit)
+
+    @staticmethod
+    def _build_match_query(query: str) -> str:
+        """Превращает пользовательский запрос в безопасный запрос FTS5.
+
+        Все слова обязательны; слова с # ищутся только по хэштегам.
+        """
+        terms = []
+        for word in query.split():
+            if word.startswith('#') and len(word) > 1:
+                terms.append('hashtags : "{}"'.format(word[1:].replace('"', '""')))
+            else:
+                terms.append('"{}"'.format(word.replace('"', '""')))
+        return " AND ".join(terms)
+
+    def _search(self, match: str, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._ensure_open()
+            rows = self._conn.execute(
+                "SELECT p.id, p.segment, p.offset, p.length FROM posts_fts "
+                "JOIN posts p ON p.id = posts_fts.rowid "
+                "WHERE posts_fts MATCH ? ORDER BY rank LIMIT ?",
+                (match, limit)
+            ).fetchall()
+
+            results = []
+            for record_id, segment, offset, length in rows:
+                entry = self._read_entry(segment, offset, length)
+                entry['record_id'] = record_id
+                results.append(entry)
+            return results
+
+    def _read_entry(self, segment: int, offset: int, length: int) -> Dict[str, Any]:
+        with open(self._segment_path(segment), 'rb') as f:
+            f.seek(offset)
+            return json.loads(zlib.decompress(f.read(length)).decode('utf-8'))
+
+    # =============================================
+    # СЛУЖЕБНОЕ
+    # =============================================
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"segment-{number:06d}.zlib")
+
+    def _ensure_open(self):
+        """Открывает индекс и находит текущий сегмент (при первом обращении)"""
+        if self._conn is not None:
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(self.directory, 'index.sqlite3'), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+        segments = [
+            int(name[len('segment-'):-len('.zlib')])
+            for name in os.listdir(self.directory)
+            if name.startswith('segment-') and name.endswith('.zlib')
+        ]
+        self._segment_number = max(segments, default=0)
+        segment_path = self._segment_path(self._segment_number)
+        self._segment_size = os.path.getsize(segment_path) if os.path.exists(segment_path) else 0
+
+        logger.info(f"Архив постов открыт: {self.directory}, сегмент {self._segment_number}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Количество записей и размер архива на диске"""
+        with self._lock:
+            self._ensure_open()
+            count = self._conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+
+        disk_bytes = sum(
+            os.path.getsize(os.path.join(self.directory, name))
+            for name in os.listdir(self.directory)
+        )
+        return {'records': count, 'disk_bytes': disk_bytes}
+
+    def close(self):
+        """Закрывает индекс"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Глобальный архив опубликованных постов
+post_archive = PostArchive()
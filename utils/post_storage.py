@@ -1,13 +1,25 @@
 # -*- coding: utf-8 -*-
-from typing import Dict, List, Optional, Any
-from datetime import datetime
+from typing import Callable, Dict, List, Optional, Any, Tuple
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, deque
+from datetime import datetime, timedelta
 import logging
+import sys
+import uuid
+from config import SETTINGS
+from utils.clock import clock
 
 logger = logging.getLogger(__name__)
 
 
 class PostStorage:
-    """Хранилище для постов в памяти (без БД)"""
+    """Хранилище для постов в памяти (без БД).
+
+    Поддерживает инкрементальные индексы, обновляемые при каждой мутации:
+    указатель на пост, ожидающий доработки, для каждого пользователя, счетчики
+    постов по статусам и отсортированный по времени публикации список
+    запланированных постов.
+    """
 
     def __init__(self):
         # Ожидающие действий посты (превью)
@@ -16,9 +28,56 @@ class PostStorage:
         # Запланированные посты
         self.scheduled_posts: Dict[int, Dict[str, Any]] = {}
 
+        # Пакеты постов (пакетная пересылка)
+        self.batches: Dict[int, Dict[str, Any]] = {}
+
         # Счетчики ID
         self._pending_counter = 0
         self._scheduled_counter = 0
+        self._batch_counter = 0
+
+        # Подписчики на изменения постов
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+
+        # Индексы
+        self._editing_by_user: Dict[int, int] = {}
+        self._status_counts: Counter = Counter()
+        # Отсортированный список, а не куча: keyset-пагинации и выборке готовых
+        # нужны позиции и срезы. insort сдвигает память за O(n), но это memmove:
+        # ~30 мкс на вставку даже при 100 тыс. постов в очереди
+        self._schedule_order: List[Tuple[datetime, int]] = []
+
+        # Компактный архив завершенных постов (без объектов Message)
+        self.archive: deque = deque(maxlen=SETTINGS['archive_max_entries'])
+        self._compaction_stats: Dict[str, Any] = {
+            'runs': 0,
+            'evicted_pending': 0,
+            'archived_published': 0,
+            'archived_cancelled': 0,
+            'last_run': None,
+            'resident_bytes': 0
+        }
+
+    def subscribe(self, listener: Callable[[str, Dict[str, Any]], None]):
+        """Подписывает обработчик на изменения постов.
+
+        События запланированных постов: scheduled, updated, cancelled, published,
+        removed; ожидающих: pending_added, pending_updated, pending_removed.
+        """
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Callable[[str, Dict[str, Any]], None]):
+        """Отписывает обработчик (повторная отписка ничего не делает)"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, event: str, post: Dict[str, Any]):
+        """Уведомляет подписчиков об изменении поста"""
+        for listener in self._listeners:
+            try:
+                listener(event, post)
+            except Exception as e:
+                logger.error(f"Ошибка подписчика хранилища ({event}): {e}")
 
     # =============================================
     # ОЖИДАЮЩИЕ ПОСТЫ (ПРЕВЬЮ)
@@ -29,9 +88,13 @@ class PostStorage:
             processed_text: str,
             user_id: int,
             original_message=None,
-            original_messages=None
+            original_messages=None,
+            variants: Optional[List[str]] = None
     ) -> int:
-        """Добавляет пост в ожидающие (для превью)"""
+        """Добавляет пост в ожидающие (для превью).
+
+        variants - все варианты текста от AI; processed_text - выбранный из них.
+        """
         self._pending_counter += 1
         post_id = self._pending_counter
 
@@ -42,9 +105,13 @@ class PostStorage:
             'original_message': original_message,
             'original_messages': original_messages,
             'awaiting_edit': False,
-            'created_at': datetime.now()
+            'created_at': clock.now()
         }
+        if variants and len(variants) > 1:
+            variant = variants.index(processed_text) if processed_text in variants else 0
+            self.pending_posts[post_id].update(variants=variants, variant=variant)
 
+        self._notify('pending_added', self.pending_posts[post_id])
         logger.info(f"Добавлен ожидающий пост #{post_id} от пользователя {user_id}")
         return post_id
 
@@ -55,25 +122,83 @@ class PostStorage:
     def update_pending_post(self, post_id: int, **kwargs) -> bool:
         """Обновляет данные ожидающего поста"""
         if post_id in self.pending_posts:
-            self.pending_posts[post_id].update(kwargs)
+            post = self.pending_posts[post_id]
+            post.update(kwargs)
+
+            if 'awaiting_edit' in kwargs:
+                if kwargs['awaiting_edit']:
+                    self._editing_by_user[post['user_id']] = post_id
+                else:
+                    self._clear_editing_pointer(post)
+
+            self._notify('pending_updated', post)
             return True
         return False
 
     def remove_pending_post(self, post_id: int) -> bool:
         """Удаляет ожидающий пост"""
         if post_id in self.pending_posts:
-            del self.pending_posts[post_id]
+            self._drop_pending(post_id)
             logger.info(f"Удален ожидающий пост #{post_id}")
             return True
         return False
 
+    def _drop_pending(self, post_id: int):
+        """Удаляет ожидающий пост вместе с указателем доработки"""
+        post = self.pending_posts.pop(post_id)
+        self._clear_editing_pointer(post)
+        self._notify('pending_removed', post)
+
     def get_user_editing_post(self, user_id: int) -> Optional[int]:
         """Находит пост пользователя, ожидающий редактирования"""
-        for post_id, post_data in self.pending_posts.items():
-            if (post_data['user_id'] == user_id and
-                    post_data.get('awaiting_edit', False)):
-                return post_id
-        return None
+        return self._editing_by_user.get(user_id)
+
+    def _clear_editing_pointer(self, post: Dict[str, Any]):
+        """Сбрасывает указатель доработки, если он указывает на этот пост"""
+        if self._editing_by_user.get(post['user_id']) == post['id']:
+            del self._editing_by_user[post['user_id']]
+
+    # =============================================
+    # ПАКЕТЫ ПОСТОВ
+    # =============================================
+
+    def add_batch(self, post_ids: List[int], user_id: int) -> int:
+        """Объединяет ожидающие посты в пакет для общего превью"""
+        self._batch_counter += 1
+        batch_id = self._batch_counter
+
+        self.batches[batch_id] = {
+            'id': batch_id,
+            'post_ids': list(post_ids),
+            'user_id': user_id,
+            'created_at': clock.now()
+        }
+
+        logger.info(f"Создан пакет #{batch_id} из {len(post_ids)} постов")
+        return batch_id
+
+    def get_batch(self, batch_id: int) -> Optional[Dict[str, Any]]:
+        """Получает пакет по ID"""
+        return self.batches.get(batch_id)
+
+    def get_batch_posts(self, batch_id: int) -> List[Dict[str, Any]]:
+        """Возвращает еще существующие ожидающие посты пакета"""
+        batch = self.batches.get(batch_id)
+        if not batch:
+            return []
+
+        return [
+            self.pending_posts[post_id] for post_id in batch['post_ids']
+            if post_id in self.pending_posts
+        ]
+
+    def remove_batch(self, batch_id: int) -> bool:
+        """Удаляет пакет (сами посты не затрагиваются)"""
+        if batch_id in self.batches:
+            del self.batches[batch_id]
+            logger.info(f"Удален пакет #{batch_id}")
+            return True
+        return False
 
     # =============================================
     # ЗАПЛАНИРОВАННЫЕ ПОСТЫ
@@ -93,15 +218,21 @@ class PostStorage:
 
         self.scheduled_posts[post_id] = {
             'id': post_id,
+            # Глобально уникальный ID: числовой id уникален только в своем процессе
+            'uid': uuid.uuid4().hex,
             'processed_text': processed_text,
             'publish_time': publish_time,
             'user_id': user_id,
             'original_message': original_message,
             'original_messages': original_messages,
-            'created_at': datetime.now(),
-            'status': 'scheduled'  # scheduled, published, cancelled
+            'created_at': clock.now(),
+            'status': 'scheduled'  # scheduled, publishing, published, cancelled
         }
 
+        self._status_counts['scheduled'] += 1
+        insort(self._schedule_order, (publish_time, post_id))
+
+        self._notify('scheduled', self.scheduled_posts[post_id])
         logger.info(f"Запланирован пост #{post_id} на {publish_time}")
         return post_id
 
@@ -110,115 +241,351 @@ class PostStorage:
         return self.scheduled_posts.get(post_id)
 
     def get_scheduled_posts(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Получает список запланированных постов"""
-        posts = [
-            post for post in self.scheduled_posts.values()
-            if post['status'] == 'scheduled'
-        ]
-
-        # Сортируем по времени публикации
-        posts.sort(key=lambda x: x['publish_time'])
-
-        if limit:
-            posts = posts[:limit]
+        """Получает список запланированных постов (по времени публикации)"""
+        order = self._schedule_order[:limit] if limit else self._schedule_order
+        return [self.scheduled_posts[post_id] for _, post_id in order]
 
-        return posts
+    def get_scheduled_page(
+            self,
+            anchor_id: Optional[int] = None,
+            direction: str = 'from',
+            limit: int = 10
+    ) -> Tuple[List[Dict[str, Any]], int, bool]:
+        """Страница очереди относительно поста-якоря (keyset-пагинация).
+
+        direction: 'after' - посты после якоря, 'before' - перед ним,
+        'from' - начиная с самого якоря. Возвращает (посты, позиция первого
+        поста в очереди, есть ли следующая страница).
+        """
+        order = self._schedule_order
+        anchor = self.scheduled_posts.get(anchor_id) if anchor_id else None
+
+        if anchor is None:
+            start = 0
+        else:
+            key = (anchor['publish_time'], anchor['id'])
+            if direction == 'after':
+                start = bisect_right(order, key)
+            elif direction == 'before':
+                start = max(0, bisect_left(order, key) - limit)
+            else:
+                start = bisect_left(order, key)
+
+        # Якорь оказался в конце очереди - показываем последнюю страницу
+        if start >= len(order):
+            start = max(0, len(order) - limit)
+
+        page = order[start:start + limit]
+        posts = [self.scheduled_posts[post_id] for _, post_id in page]
+        return posts, start, start + limit < len(order)
 
     def get_pending_scheduled_posts(self) -> List[Dict[str, Any]]:
         """Получает посты, готовые к публикации (время пришло)"""
-        now = datetime.now()
-        pending = []
-
-        for post in self.scheduled_posts.values():
-            if (post['status'] == 'scheduled' and
-                    post['publish_time'] <= now):
-                pending.append(post)
+        due_count = bisect_right(self._schedule_order, (clock.now(), float('inf')))
+        return [self.scheduled_posts[post_id] for _, post_id in self._schedule_order[:due_count]]
 
-        return pending
+    def count_scheduled(self) -> int:
+        """Количество постов в очереди"""
+        return self._status_counts['scheduled']
 
     def update_scheduled_post(self, post_id: int, **kwargs) -> bool:
         """Обновляет данные запланированного поста"""
         if post_id in self.scheduled_posts:
-            self.scheduled_posts[post_id].update(kwargs)
+            post = self.scheduled_posts[post_id]
+            new_status = kwargs.pop('status', post['status'])
+
+            self._unindex_scheduled(post)
+            post.update(kwargs)
+            self._set_status(post, new_status)
+
+            self._notify('updated', post)
             return True
         return False
 
+    def _set_status(self, post: Dict[str, Any], status: str):
+        """Меняет статус поста с обновлением счетчиков и порядка очереди"""
+        self._unindex_scheduled(post)
+        if status != post['status']:
+            # TTL завершенных постов отсчитывается от реальной смены статуса, а не от правки
+            post['status_changed_at'] = clock.now()
+        self._status_counts[post['status']] -= 1
+        post['status'] = status
+        self._status_counts[status] += 1
+
+        if status == 'scheduled':
+            insort(self._schedule_order, (post['publish_time'], post['id']))
+
+    def _unindex_scheduled(self, post: Dict[str, Any]):
+        """Убирает пост из отсортированной очереди, если он в ней"""
+        key = (post['publish_time'], post['id'])
+        idx = bisect_left(self._schedule_order, key)
+        if idx < len(self._schedule_order) and self._schedule_order[idx] == key:
+            del self._schedule_order[idx]
+
     def cancel_scheduled_post(self, post_id: int) -> bool:
-        """Отменяет запланированный пост"""
-        if post_id in self.scheduled_posts:
-            self.scheduled_posts[post_id]['status'] = 'cancelled'
+        """Отменяет запланированный пост (кроме публикуемого прямо сейчас)"""
+        if post_id in self.scheduled_posts and self.scheduled_posts[post_id]['status'] != 'publishing':
+            self._set_status(self.scheduled_posts[post_id], 'cancelled')
+            self._notify('cancelled', self.scheduled_posts[post_id])
             logger.info(f"Отменен запланированный пост #{post_id}")
             return True
         return False
 
     def mark_post_published(self, post_id: int) -> bool:
-        """Отмечает пост как опубликованный"""
-        if post_id in self.scheduled_posts:
-            self.scheduled_posts[post_id]['status'] = 'published'
+        """Отмечает пост как опубликованный (повторная отметка ничего не меняет)"""
+        post = self.scheduled_posts.get(post_id)
+        if post is None or post['status'] == 'published':
+            return False
+
+        self._set_status(post, 'published')
+        self._notify('published', post)
+        logger.info(f"Пост #{post_id} отмечен как опубликованный")
+        return True
+
+    def begin_publishing(self, post_id: int) -> bool:
+        """Переводит пост scheduled -> publishing.
+
+        Вернет False, если пост уже публикуется, опубликован или отменен, -
+        повторная попытка публикации того же поста ничего не делает.
+        """
+        post = self.scheduled_posts.get(post_id)
+        if post is None or post['status'] != 'scheduled':
+            return False
+
+        self._set_status(post, 'publishing')
+        self._notify('updated', post)
+        return True
+
+    def finish_publishing(self, post_id: int, success: bool) -> bool:
+        """Завершает публикацию: publishing -> published, при ошибке обратно в scheduled"""
+        post = self.scheduled_posts.get(post_id)
+        if post is None or post['status'] != 'publishing':
+            return False
+
+        if success:
+            self._set_status(post, 'published')
+            self._notify('published', post)
             logger.info(f"Пост #{post_id} отмечен как опубликованный")
-            return True
-        return False
+        else:
+            self._set_status(post, 'scheduled')
+            self._notify('updated', post)
+        return True
 
     def remove_scheduled_post(self, post_id: int) -> bool:
         """Удаляет запланированный пост"""
         if post_id in self.scheduled_posts:
-            del self.scheduled_posts[post_id]
+            self._drop_scheduled(post_id)
             logger.info(f"Удален запланированный пост #{post_id}")
             return True
         return False
 
+    # =============================================
+    # ВОССТАНОВЛЕНИЕ
+    # =============================================
+
+    def restore_pending_post(self, post: Dict[str, Any]):
+        """Возвращает в хранилище ожидающий пост, восстановленный после перезапуска"""
+        self.pending_posts[post['id']] = post
+        self._pending_counter = max(self._pending_counter, post['id'])
+        if post.get('awaiting_edit'):
+            self._editing_by_user[post['user_id']] = post['id']
+        self._notify('pending_added', post)
+
+    def restore_scheduled_post(self, post: Dict[str, Any]):
+        """Возвращает в хранилище запланированный пост, восстановленный после перезапуска"""
+        if post['id'] in self.scheduled_posts:
+            self._drop_scheduled(post['id'])
+
+        # Публикация прервана перезапуском - пост возвращается в очередь
+        if post['status'] == 'publishing':
+            logger.warning(f"Пост #{post['id']} не завершил публикацию до перезапуска, возвращен в очередь")
+            post['status'] = 'scheduled'
+
+        if not post.get('uid'):
+            # Пост из журнала до появления uid: ID выводится из содержимого записи,
+            # чтобы экземпляры, загрузившие один журнал, получили одинаковый
+            post['uid'] = uuid.uuid5(uuid.NAMESPACE_OID, f"{post['id']}@{post['created_at'].isoformat()}").hex
+
+        self.scheduled_posts[post['id']] = post
+        self._scheduled_counter = max(self._scheduled_counter, post['id'])
+        self._status_counts[post['status']] += 1
+        if post['status'] == 'scheduled':
+            insort(self._schedule_order, (post['publish_time'], post['id']))
+        self._notify('scheduled', post)
+
+    def adopt_scheduled_post(self, post: Dict[str, Any]) -> int:
+        """Принимает пост другого экземпляра из общей очереди под новым локальным ID (uid сохраняется)"""
+        self._scheduled_counter += 1
+        post_id = self._scheduled_counter
+
+        post = {**post, 'id': post_id, 'status': 'scheduled'}
+        self.scheduled_posts[post_id] = post
+        self._status_counts['scheduled'] += 1
+        insort(self._schedule_order, (post['publish_time'], post_id))
+
+        self._notify('scheduled', post)
+        logger.info(f"Принят пост {post['uid']} другого экземпляра как #{post_id}")
+        return post_id
+
+    def find_scheduled_by_uid(self, uid: str) -> Optional[Dict[str, Any]]:
+        """Ищет запланированный пост по глобальному uid (перебором - нужно только при приеме чужих постов)"""
+        return next((post for post in self.scheduled_posts.values() if post.get('uid') == uid), None)
+
     # =============================================
     # СТАТИСТИКА И УТИЛИТЫ
     # =============================================
 
     def get_stats(self) -> Dict[str, int]:
         """Получает статистику постов"""
-        scheduled_count = len([
-            p for p in self.scheduled_posts.values()
-            if p['status'] == 'scheduled'
-        ])
-
-        published_count = len([
-            p for p in self.scheduled_posts.values()
-            if p['status'] == 'published'
-        ])
-
         return {
             'pending_posts': len(self.pending_posts),
-            'scheduled_posts': scheduled_count,
-            'published_posts': published_count,
+            'scheduled_posts': self._status_counts['scheduled'],
+            'published_posts': self._status_counts['published'],
             'total_processed': len(self.pending_posts) + len(self.scheduled_posts)
         }
 
+    def _drop_scheduled(self, post_id: int):
+        """Удаляет запланированный пост вместе с его записями в индексах"""
+        post = self.scheduled_posts.pop(post_id)
+        self._unindex_scheduled(post)
+        self._status_counts[post['status']] -= 1
+        self._notify('removed', post)
+
     def cleanup_old_posts(self, days: int = 7):
-        """Очищает старые посты (опубликованные и отмененные)"""
-        cutoff_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        cutoff_date = cutoff_date.replace(day=cutoff_date.day - days)
+        """Очищает старые посты: ожидающие, опубликованные и отмененные"""
+        cutoff_date = clock.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days)
+        evicted = self._evict_pending(cutoff_date)
+        archived = self._archive_finished({'published': cutoff_date, 'cancelled': cutoff_date})
+        if evicted or archived:
+            logger.info(
+                f"Очищено {evicted} ожидающих и "
+                f"{sum(archived.values())} запланированных постов старше {days} дней"
+            )
 
-        # Очищаем старые ожидающие посты
-        to_remove_pending = [
+    # =============================================
+    # КОМПАКТИЗАЦИЯ
+    # =============================================
+
+    def compact(
+            self,
+            pending_ttl: Optional[timedelta] = None,
+            published_ttl: Optional[timedelta] = None,
+            cancelled_ttl: Optional[timedelta] = None
+    ) -> Dict[str, int]:
+        """Вытесняет устаревшие посты по TTL их состояния.
+
+        Брошенные превью удаляются, опубликованные и отмененные посты переносятся
+        в компактный архив без исходных сообщений.
+        """
+        now = clock.now()
+        pending_ttl = pending_ttl or timedelta(hours=SETTINGS['pending_post_ttl_hours'])
+        published_ttl = published_ttl or timedelta(hours=SETTINGS['published_post_ttl_hours'])
+        cancelled_ttl = cancelled_ttl or timedelta(hours=SETTINGS['cancelled_post_ttl_hours'])
+
+        evicted = self._evict_pending(now - pending_ttl)
+        archived = self._archive_finished({
+            'published': now - published_ttl,
+            'cancelled': now - cancelled_ttl
+        })
+
+        stats = self._compaction_stats
+        stats['runs'] += 1
+        stats['evicted_pending'] += evicted
+        stats['archived_published'] += archived['published']
+        stats['archived_cancelled'] += archived['cancelled']
+        stats['last_run'] = now
+        stats['resident_bytes'] = self._estimate_resident_size()
+
+        if evicted or archived:
+            logger.info(
+                f"Компактизация: удалено {evicted} превью, "
+                f"в архив {archived['published']} опубликованных и {archived['cancelled']} отмененных, "
+                f"в памяти ~{stats['resident_bytes'] // 1024} КБ"
+            )
+
+        return {
+            'evicted_pending': evicted,
+            'archived_published': archived['published'],
+            'archived_cancelled': archived['cancelled']
+        }
+
+    def _evict_pending(self, cutoff: datetime) -> int:
+        """Удаляет превью, созданные раньше cutoff, и опустевшие пакеты"""
+        expired = [
             post_id for post_id, post_data in self.pending_posts.items()
-            if post_data['created_at'] < cutoff_date
+            if post_data['created_at'] < cutoff
         ]
+        for post_id in expired:
+            self._drop_pending(post_id)
 
-        for post_id in to_remove_pending:
-            del self.pending_posts[post_id]
+        # Пакеты, в которых не осталось постов
+        for batch_id in [
+            batch_id for batch_id, batch in self.batches.items()
+            if not any(post_id in self.pending_posts for post_id in batch['post_ids'])
+        ]:
+            del self.batches[batch_id]
 
-        # Очищаем старые опубликованные/отмененные посты
-        to_remove_scheduled = [
+        return len(expired)
+
+    def _archive_finished(self, cutoffs: Dict[str, datetime]) -> Counter:
+        """Переносит в архив завершенные посты, сменившие статус раньше cutoff своего статуса"""
+        expired = [
             post_id for post_id, post_data in self.scheduled_posts.items()
-            if (post_data['status'] in ['published', 'cancelled'] and
-                post_data['created_at'] < cutoff_date)
+            if post_data['status'] in cutoffs and
+            post_data.get('status_changed_at', post_data['created_at']) < cutoffs[post_data['status']]
         ]
 
-        for post_id in to_remove_scheduled:
-            del self.scheduled_posts[post_id]
+        archived = Counter()
+        for post_id in expired:
+            post = self.scheduled_posts[post_id]
+            self.archive.append(self._to_archive_record(post))
+            archived[post['status']] += 1
+            self._drop_scheduled(post_id)
 
-        if to_remove_pending or to_remove_scheduled:
-            logger.info(
-                f"Очищено {len(to_remove_pending)} ожидающих и "
-                f"{len(to_remove_scheduled)} запланированных постов старше {days} дней"
-            )
+        return archived
+
+    @staticmethod
+    def _to_archive_record(post: Dict[str, Any]) -> Dict[str, Any]:
+        """Компактная запись архива: только данные, без объектов Message"""
+        media_count = len(post.get('original_messages') or []) or (1 if post.get('original_message') else 0)
+        return {
+            'id': post['id'],
+            'status': post['status'],
+            'processed_text': post['processed_text'],
+            'publish_time': post['publish_time'],
+            'finished_at': post.get('status_changed_at'),
+            'media_count': media_count
+        }
+
+    def _estimate_resident_size(self) -> int:
+        """Приблизительный объем памяти, занятый постами хранилища (байт)"""
+        seen = set()
+
+        def size_of(obj, depth=0) -> int:
+            if id(obj) in seen or depth > 6:
+                return 0
+            seen.add(id(obj))
+
+            size = sys.getsizeof(obj)
+            if isinstance(obj, dict):
+                size += sum(size_of(k, depth + 1) + size_of(v, depth + 1) for k, v in obj.items())
+            elif isinstance(obj, (list, tuple, set, deque)):
+                size += sum(size_of(item, depth + 1) for item in obj)
+            elif hasattr(obj, '__dict__'):
+                size += size_of(vars(obj), depth + 1)
+            return size
+
+        return sum(size_of(container) for container in (
+            self.pending_posts, self.scheduled_posts, self.batches, self.archive
+        ))
+
+    def get_compaction_stats(self) -> Dict[str, Any]:
+        """Метрики компактизации и текущий размер хранилища"""
+        return {
+            **self._compaction_stats,
+            'resident_posts': len(self.pending_posts) + len(self.scheduled_posts),
+            'archived_entries': len(self.archive)
+        }
 
 
 # Глобальный экземпляр хранилища
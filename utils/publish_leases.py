@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from config import SETTINGS
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS leases (
+    post_key TEXT PRIMARY KEY,
+    owner TEXT,
+    token INTEGER,
+    expires_at REAL,
+    done INTEGER DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS posts (
+    uid TEXT PRIMARY KEY,
+    publish_time TEXT,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS posts_by_time ON posts (publish_time);
+CREATE TABLE IF NOT EXISTS fencing (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    token INTEGER
+);
+INSERT OR IGNORE INTO fencing (id, token) VALUES (1, 0);
+"""
+
+
+def lease_key(post: dict) -> str:
+    """Ключ поста в базе аренд: глобальный uid и время публикации.
+
+    Числовой id поста выдается счетчиком своего процесса и у разных
+    экземпляров совпадает для разных постов, поэтому в ключ идет uid.
+    Перенесенный на другое время пост - это новая публикация с новым ключом.
+    """
+    return f"{post['uid']}@{post['publish_time'].isoformat()}"
+
+
+class PublishLeaseStore:
+    """Аренда готовых к публикации постов между несколькими экземплярами бота.
+
+    Экземпляры делят один файл SQLite. В нем же лежит общая очередь постов
+    (uid, время публикации, сериализованный пост): готовые посты берутся из
+    нее, а не из памяти своего процесса. Пост публикует только тот, кто взял
+    его в аренду: захват атомарен (BEGIN IMMEDIATE), аренда истекает через
+    ttl, и пост упавшего экземпляра подхватывает другой. Каждый захват получает
+    новый монотонный fencing-токен; завершить или продлить аренду можно только
+    с актуальным токеном, поэтому экземпляр, чья аренда уже перехвачена, не
+    отметит пост как свой. Гарантия - "хотя бы один раз": если экземпляр упал
+    между отправкой и отметкой, пост после истечения аренды отправят повторно.
+    """
+
+    def __init__(self, path: Optional[str] = None, owner: Optional[str] = None):
+        self.path = path or SETTINGS['scheduler_lease_db']
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+
+            # Транзакциями управляем сами: захват идет под BEGIN IMMEDIATE
+            self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    @contextmanager
+    def _transaction(self):
+        """Транзакция с блокировкой записи (BEGIN IMMEDIATE) на время всего блока"""
+        with self._lock:
+            conn = self._connect()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    # =============================================
+    # ОБЩАЯ ОЧЕРЕДЬ ПОСТОВ
+    # =============================================
+
+    def sync_posts(self, upserts: Dict[str, Tuple[datetime, str]], removed: Iterable[str] = ()):
+        """Переносит изменения локальной очереди в общую одной транзакцией.
+
+        upserts: uid -> (время публикации, сериализованный пост); removed - uid
+        постов, которые больше не ждут публикации. Пост, уже опубликованный
+        кем-то (например, из журнала вернувшегося после сбоя экземпляра),
+        обратно в очередь не попадает.
+        """
+        with self._transaction() as conn:
+            conn.executemany("DELETE FROM posts WHERE uid = ?", [(uid,) for uid in removed])
+            for uid, (publish_time, payload) in upserts.items():
+                published_at = publish_time.isoformat()
+                conn.execute(
+                    "INSERT INTO posts (uid, publish_time, payload) "
+                    "SELECT ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM leases WHERE post_key = ? AND done = 1) "
+                    "ON CONFLICT (uid) DO UPDATE SET "
+                    "publish_time = excluded.publish_time, payload = excluded.payload",
+                    (uid, published_at, payload, f"{uid}@{published_at}")
+                )
+
+    def claim_due(
+            self,
+            now: datetime,
+            ttl: Optional[float] = None,
+            limit: Optional[int] = None
+    ) -> Dict[str, Tuple[int, str]]:
+        """Берет в аренду посты общей очереди, время публикации которых пришло.
+
+        Возвращает ключ аренды -> (fencing-токен, сериализованный пост). Очередь
+        общая, поэтому пост упавшего экземпляра публикует любой живой.
+        """
+        ttl = SETTINGS['scheduler_lease_ttl'] if ttl is None else ttl
+        limit = SETTINGS['scheduler_lease_batch'] if limit is None else limit
+        claimed: Dict[str, Tuple[int, str]] = {}
+
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT uid, publish_time, payload FROM posts WHERE publish_time <= ? ORDER BY publish_time",
+                (now.isoformat(),)
+            ).fetchall()
+            current = time.time()
+            for uid, publish_time, payload in rows:
+                if len(claimed) >= limit:
+                    break
+
+                key = f"{uid}@{publish_time}"
+                token, is_done = self._claim_key(conn, key, current, ttl)
+                if is_done:
+                    conn.execute("DELETE FROM posts WHERE uid = ? AND publish_time = ?", (uid, publish_time))
+                elif token is not None:
+                    claimed[key] = (token, payload)
+
+        return claimed
+
+    def done_keys(self, keys: Iterable[str]) -> Set[str]:
+        """Какие из ключей уже опубликованы (любым экземпляром)"""
+        keys = list(keys)
+        if not keys:
+            return set()
+
+        placeholders = ', '.join('?' * len(keys))
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT post_key FROM leases WHERE done = 1 AND post_key IN ({placeholders})", keys
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    # =============================================
+    # ЗАХВАТ И ЗАВЕРШЕНИЕ
+    # =============================================
+
+    def claim_batch(
+            self,
+            keys: Iterable[str],
+            ttl: Optional[float] = None,
+            limit: Optional[int] = None
+    ) -> Tuple[Dict[str, int], Set[str]]:
+        """Берет в аренду свободные посты из списка одной транзакцией.
+
+        Возвращает (захваченные ключи -> fencing-токен, ключи уже
+        опубликованных постов). Занятые другими экземплярами ключи пропускаются.
+        """
+        ttl = SETTINGS['scheduler_lease_ttl'] if ttl is None else ttl
+        limit = SETTINGS['scheduler_lease_batch'] if limit is None else limit
+        claimed: Dict[str, int] = {}
+        done: Set[str] = set()
+
+        with self._transaction() as conn:
+            now = time.time()
+            for key in keys:
+                if len(claimed) >= limit:
+                    break
+
+                token, is_done = self._claim_key(conn, key, now, ttl)
+                if is_done:
+                    done.add(key)
+                elif token is not None:
+                    claimed[key] = token
+
+        return claimed, done
+
+    def _claim_key(self, conn: sqlite3.Connection, key: str, now: float, ttl: float) -> Tuple[Optional[int], bool]:
+        """Захват одного ключа внутри транзакции: (токен или None, опубликован ли пост)"""
+        row = conn.execute(
+            "SELECT owner, expires_at, done FROM leases WHERE post_key = ?", (key,)
+        ).fetchone()
+        if row is not None:
+            owner, expires_at, is_done = row
+            if is_done:
+                return None, True
+            if expires_at > now and owner != self.owner:
+                return None, False
+            if owner != self.owner:
+                logger.warning(f"Аренда {key} экземпляра {owner} истекла, забираем")
+
+        token = conn.execute(
+            "UPDATE fencing SET token = token + 1 WHERE id = 1 RETURNING token"
+        ).fetchone()[0]
+        conn.execute(
+            "INSERT INTO leases (post_key, owner, token, expires_at, done) VALUES (?, ?, ?, ?, 0) "
+            "ON CONFLICT (post_key) DO UPDATE SET "
+            "owner = excluded.owner, token = excluded.token, expires_at = excluded.expires_at",
+            (key, self.owner, token, now + ttl)
+        )
+        return token, False
+
+    def is_current(self, key: str, token: int) -> bool:
+        """Актуален ли токен: аренда не перехвачена и не истекла"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT token, expires_at, done FROM leases WHERE post_key = ?", (key,)
+            ).fetchone()
+        return row is not None and row[0] == token and not row[2] and row[1] > time.time()
+
+    def renew(self, key: str, token: int, ttl: Optional[float] = None) -> bool:
+        """Продлевает аренду, если она все еще наша"""
+        ttl = SETTINGS['scheduler_lease_ttl'] if ttl is None else ttl
+        return self._update(
+            "UPDATE leases SET expires_at = ? WHERE post_key = ? AND token = ? AND done = 0",
+            (time.time() + ttl, key, token)
+        )
+
+    def complete(self, key: str, token: int) -> bool:
+        """Отмечает пост опубликованным и убирает его из общей очереди.
+
+        False - аренду уже перехватили.
+        """
+        uid, _, publish_time = key.partition('@')
+        with self._transaction() as conn:
+            completed = conn.execute(
+                "UPDATE leases SET done = 1 WHERE post_key = ? AND token = ? AND done = 0", (key, token)
+            ).rowcount > 0
+            if completed:
+                conn.execute("DELETE FROM posts WHERE uid = ? AND publish_time = ?", (uid, publish_time))
+        return completed
+
+    def release(self, key: str, token: int) -> bool:
+        """Возвращает пост после неудачной публикации - его сможет взять любой экземпляр"""
+        return self._update("DELETE FROM leases WHERE post_key = ? AND token = ? AND done = 0", (key, token))
+
+    def _update(self, sql: str, params: tuple) -> bool:
+        with self._lock:
+            return self._connect().execute(sql, params).rowcount > 0
+
+    # =============================================
+    # СЛУЖЕБНОЕ
+    # =============================================
+
+    def purge_done(self, older_than: float) -> int:
+        """Удаляет записи опубликованных постов с истекшей более older_than сек назад арендой"""
+        with self._lock:
+            return self._connect().execute(
+                "DELETE FROM leases WHERE done = 1 AND expires_at < ?", (time.time() - older_than,)
+            ).rowcount
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import random
+import logging
+from config import SETTINGS
+from utils.config_store import config_store
+from utils.post_storage import post_storage
+
+logger = logging.getLogger(__name__)
+
+
+def _floor_minute(moment: datetime) -> datetime:
+    """Округляет время вниз до целой минуты"""
+    if moment.second or moment.microsecond:
+        return moment.replace(second=0, microsecond=0)
+    return moment
+
+
+def _ceil_minute(moment: datetime) -> datetime:
+    """Округляет время вверх до целой минуты"""
+    if moment.second or moment.microsecond:
+        return moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    return moment
+
+
+class SlotOccupancyIndex:
+    """Индекс занятости слотов по запланированным постам.
+
+    Хранит отсортированный список времен публикации, поэтому подсчет постов
+    в интервале и поиск соседей выполняются бинарным поиском за O(log n).
+    """
+
+    def __init__(self, min_spacing_minutes: int = None, max_posts_per_slot: int = None):
+        self.min_spacing = timedelta(minutes=(
+            SETTINGS['slot_min_spacing_minutes'] if min_spacing_minutes is None else min_spacing_minutes
+        ))
+        self.max_posts_per_slot = (
+            SETTINGS['slot_max_posts'] if max_posts_per_slot is None else max_posts_per_slot
+        )
+
+        self._times: List[datetime] = []
+        self._post_times: Dict[int, datetime] = {}
+
+    # =============================================
+    # ОБНОВЛЕНИЕ ИНДЕКСА
+    # =============================================
+
+    def attach(self, storage):
+        """Заполняет индекс из хранилища и подписывается на его изменения"""
+        for post in storage.get_scheduled_posts():
+            self.add(post['id'], post['publish_time'])
+        storage.subscribe(self._on_storage_event)
+
+    def add(self, post_id: int, publish_time: datetime):
+        """Добавляет (или перемещает) пост в индексе"""
+        self.remove(post_id)
+        self._post_times[post_id] = publish_time
+        insort(self._times, publish_time)
+
+    def remove(self, post_id: int):
+        """Убирает пост из индекса"""
+        publish_time = self._post_times.pop(post_id, None)
+        if publish_time is None:
+            return
+
+        idx = bisect_left(self._times, publish_time)
+        if idx < len(self._times) and self._times[idx] == publish_time:
+            del self._times[idx]
+
+    def apply_settings(self, changes: dict):
+        """Применяет новые лимиты слотов из конфигурации"""
+        if 'slot_min_spacing_minutes' in changes:
+            self.min_spacing = timedelta(minutes=changes['slot_min_spacing_minutes'])
+        if 'slot_max_posts' in changes:
+            self.max_posts_per_slot = changes['slot_max_posts']
+
+    def _on_storage_event(self, event: str, post: dict):
+        """Синхронизирует индекс с мутациями хранилища запланированных постов"""
+        if event in ('scheduled', 'updated') and post.get('status') == 'scheduled':
+            self.add(post['id'], post['publish_time'])
+        elif event in ('scheduled', 'updated', 'cancelled', 'published', 'removed'):
+            self.remove(post['id'])
+
+    # =============================================
+    # ЗАПРОСЫ
+    # =============================================
+
+    def count_between(self, start: datetime, end: datetime) -> int:
+        """Количество постов в интервале [start, end)"""
+        return bisect_left(self._times, end) - bisect_left(self._times, start)
+
+    def find_free_minute(
+            self,
+            start: datetime,
+            end: datetime,
+            min_spacing: Optional[timedelta] = None,
+            max_posts: Optional[int] = None
+    ) -> Optional[datetime]:
+        """Находит лучшую свободную минуту в интервале [start, end).
+
+        Учитывает минимальный интервал между постами и лимит постов на слот.
+        Если рядом никого нет - берется случайная минута, иначе середина
+        самого широкого свободного промежутка.
+        """
+        spacing = self.min_spacing if min_spacing is None else min_spacing
+        limit = self.max_posts_per_slot if max_posts is None else max_posts
+
+        start = start.replace(second=0, microsecond=0)
+        end = end.replace(second=0, microsecond=0)
+        if end <= start:
+            return None
+
+        if limit and self.count_between(start, end) >= limit:
+            return None
+
+        # Соседи, которые могут помешать: посты в слоте и на расстоянии spacing от него
+        lo = bisect_right(self._times, start - spacing)
+        hi = bisect_left(self._times, end + spacing)
+        neighbours = self._times[lo:hi]
+
+        last_minute = end - timedelta(minutes=1)
+        if not neighbours:
+            total_minutes = int((last_minute - start).total_seconds() // 60)
+            return start + timedelta(minutes=random.randint(0, total_minutes))
+
+        best_time = None
+        best_clearance = timedelta(0)
+
+        # Свободные промежутки между соседями, с учетом spacing
+        bounds = [None] + neighbours + [None]
+        for left, right in zip(bounds, bounds[1:]):
+            gap_start = start if left is None else max(start, left + spacing)
+            gap_end = last_minute if right is None else min(last_minute, right - spacing)
+            if gap_end < gap_start:
+                continue
+
+            # Границы округляются внутрь промежутка до целых минут до выбора
+            # кандидата, чтобы округленный кандидат не оказался ближе spacing к соседу
+            gap_start, gap_end = _ceil_minute(gap_start), _floor_minute(gap_end)
+            if gap_end < gap_start:
+                continue
+
+            if left is None:
+                candidate = gap_start
+            elif right is None:
+                candidate = gap_end
+            else:
+                candidate = gap_start + (gap_end - gap_start) / 2
+
+            candidate = _floor_minute(candidate)
+            clearance = min(
+                candidate - left if left is not None else timedelta.max,
+                right - candidate if right is not None else timedelta.max
+            )
+
+            if best_time is None or clearance > best_clearance:
+                best_time = candidate
+                best_clearance = clearance
+
+        return best_time
+
+
+# Глобальный индекс занятости (синхронизируется с post_storage)
+slot_index = SlotOccupancyIndex()
+slot_index.attach(post_storage)
+config_store.subscribe('settings', slot_index.apply_settings)
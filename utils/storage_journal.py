@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram.types import Message
+
+from config import SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# Запись журнала: номер, длина и CRC32 полезной нагрузки
+_RECORD_HEADER = struct.Struct('<QII')
+# Снимок: сигнатура, номер последней учтенной записи журнала, длина и CRC32
+_SNAPSHOT_MAGIC = b'PSNAP1'
+_SNAPSHOT_HEADER = struct.Struct('<QII')
+
+_DATETIME_FIELDS = ('created_at', 'publish_time', 'status_changed_at')
+
+# Событие хранилища -> (раздел, операция)
+_EVENTS = {
+    'pending_added': ('pending', 'put'),
+    'pending_updated': ('pending', 'put'),
+    'pending_removed': ('pending', 'del'),
+    'scheduled': ('scheduled', 'put'),
+    'updated': ('scheduled', 'put'),
+    'cancelled': ('scheduled', 'put'),
+    'published': ('scheduled', 'put'),
+    'removed': ('scheduled', 'del'),
+}
+
+
+def serialize_post(post: Dict[str, Any]) -> Dict[str, Any]:
+    """Переводит пост в JSON-совместимый вид (сообщения через model_dump)"""
+    data = {}
+    for key, value in post.items():
+        if key in _DATETIME_FIELDS and value is not None:
+            value = value.isoformat()
+        elif key == 'original_message' and value is not None:
+            value = value.model_dump(mode='json', exclude_none=True)
+        elif key == 'original_messages' and value is not None:
+            value = [message.model_dump(mode='json', exclude_none=True) for message in value]
+        data[key] = value
+    return data
+
+
+def deserialize_post(data: Dict[str, Any], bot) -> Dict[str, Any]:
+    """Восстанавливает пост из записи журнала или снимка"""
+    post = dict(data)
+    for key in _DATETIME_FIELDS:
+        if post.get(key):
+            post[key] = datetime.fromisoformat(post[key])
+    if post.get('original_message'):
+        post['original_message'] = Message.model_validate(post['original_message']).as_(bot)
+    if post.get('original_messages'):
+        post['original_messages'] = [
+            Message.model_validate(message).as_(bot) for message in post['original_messages']
+        ]
+    return post
+
+
+class StorageJournal:
+    """Персистентность PostStorage: снимок + журнал изменений только на дозапись.
+
+    Каждая мутация хранилища (через подписку на его события) превращается в
+    бинарную запись журнала. Записи копятся в буфере и сбрасываются на диск
+    группой с одним fsync. Периодически пишется компактный снимок всего
+    состояния, после чего журнал обнуляется, поэтому при запуске читается
+    снимок (через mmap) и только хвост журнала.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or SETTINGS['journal_dir']
+        self.storage = None
+
+        self._seq = 0
+        self._records_since_snapshot = 0
+        self._buffer: List[bytes] = []
+        self._dirty = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._restoring = False
+        self._stats = {'commits': 0, 'records': 0, 'snapshots': 0}
+
+    @property
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.directory, 'snapshot.bin')
+
+    @property
+    def _journal_path(self) -> str:
+        return os.path.join(self.directory, 'journal.bin')
+
+    # =============================================
+    # ЗАПУСК И ОСТАНОВКА
+    # =============================================
+
+    async def start(self, storage, bot):
+        """Восстанавливает хранилище с диска и начинает журналировать изменения"""
+        self.storage = storage
+        os.makedirs(self.directory, exist_ok=True)
+
+        started = time.perf_counter()
+        state, replayed = await asyncio.to_thread(self._load_state)
+
+        self._restoring = True
+        try:
+            for data in state['pending'].values():
+                storage.restore_pending_post(deserialize_post(data, bot))
+            for data in state['scheduled'].values():
+                storage.restore_scheduled_post(deserialize_post(data, bot))
+        finally:
+            self._restoring = False
+
+        storage.subscribe(self._on_storage_event)
+        self._task = asyncio.create_task(self._commit_loop())
+
+        logger.info(
+            f"Хранилище восстановлено за {(time.perf_counter() - started) * 1000:.0f} мс: "
+            f"{len(state['pending'])} превью, {len(state['scheduled'])} запланированных, "
+            f"из журнала применено {replayed} записей"
+        )
+
+    async def stop(self):
+        """Сбрасывает буфер и пишет финальный снимок"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        await self._commit()
+        if self.storage is not None and self._records_since_snapshot:
+            await self.snapshot()
+
+    # =============================================
+    # ЖУРНАЛ
+    # =============================================
+
+    def _on_storage_event(self, event: str, post: Dict[str, Any]):
+        """Добавляет мутацию хранилища в буфер журнала"""
+        if self._restoring or event not in _EVENTS:
+            return
+
+        section, op = _EVENTS[event]
+        record = {'section': section, 'op': op, 'id': post['id']}
+        if op == 'put':
+            record['post'] = serialize_post(post)
+
+        self._seq += 1
+        payload = json.dumps(record, ensure_ascii=False, default=str).encode('utf-8')
+        self._buffer.append(_RECORD_HEADER.pack(self._seq, len(payload), zlib.crc32(payload)) + payload)
+        self._dirty.set()
+
+    async def _commit_loop(self):
+        """Групповой коммит: все записи за окно сбрасываются одним fsync"""
+        while True:
+            await self._dirty.wait()
+            await asyncio.sleep(SETTINGS['journal_commit_window'])
+
+            try:
+                await self._commit()
+                if self._records_since_snapshot >= SETTINGS['journal_snapshot_every']:
+                    await self.snapshot()
+            except Exception as e:
+                logger.error(f"Ошибка записи журнала хранилища: {e}")
+
+    async def _commit(self):
+        """Сбрасывает накопленные записи на диск"""
+        self._dirty.clear()
+        if not self._buffer:
+            return
+
+        records = len(self._buffer)
+        chunk, self._buffer = b''.join(self._buffer), []
+        await asyncio.to_thread(self._append_journal, chunk)
+
+        self._records_since_snapshot += records
+        self._stats['records'] += records
+        self._stats['commits'] += 1
+
+    def _append_journal(self, chunk: bytes):
+        with open(self._journal_path, 'ab') as f:
+            f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+
+    # =============================================
+    # СНИМКИ
+    # =============================================
+
+    async def snapshot(self):
+        """Пишет снимок всего хранилища и обнуляет журнал"""
+        # Состояние собирается в цикле событий, поэтому согласовано с номером записи
+        seq = self._seq
+        state = {
+            'pending': {post_id: serialize_post(post) for post_id, post in self.storage.pending_posts.items()},
+            'scheduled': {post_id: serialize_post(post) for post_id, post in self.storage.scheduled_posts.items()},
+        }
+        payload = json.dumps(state, ensure_ascii=False, default=str).encode('utf-8')
+
+        # Записи до seq уже в буфере или на диске: сначала они, затем снимок
+        await self._commit()
+        await asyncio.to_thread(self._write_snapshot, seq, payload)
+
+        # Более новые записи будут учтены при их коммите
+        self._records_since_snapshot = 0
+        self._stats['snapshots'] += 1
+        logger.info(f"Снимок хранилища записан: {len(payload) // 1024} КБ, запись журнала {seq}")
+
+    def _write_snapshot(self, seq: int, payload: bytes):
+        temp_path = self._snapshot_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(_SNAPSHOT_MAGIC)
+            f.write(_SNAPSHOT_HEADER.pack(seq, len(payload), zlib.crc32(payload)))
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self._snapshot_path)
+
+        # Снимок уже учитывает все записи журнала до seq - оставляем только более новые
+        tail = b''.join(
+            frame for record_seq, frame, _ in self._read_journal() if record_seq > seq
+        )
+        temp_path = self._journal_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(tail)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self._journal_path)
+
+    # =============================================
+    # ВОССТАНОВЛЕНИЕ
+    # =============================================
+
+    def _load_state(self) -> Tuple[Dict[str, Dict[int, Any]], int]:
+        """Читает снимок и применяет хвост журнала (в рабочем потоке)"""
+        state = {'pending': {}, 'scheduled': {}}
+        snapshot_seq = 0
+
+        if os.path.exists(self._snapshot_path) and os.path.getsize(self._snapshot_path):
+            with open(self._snapshot_path, 'rb') as f, \
+                    mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                header_end = len(_SNAPSHOT_MAGIC) + _SNAPSHOT_HEADER.size
+                if view[:len(_SNAPSHOT_MAGIC)] != _SNAPSHOT_MAGIC:
+                    raise ValueError(f"Поврежден снимок хранилища: {self._snapshot_path}")
+
+                snapshot_seq, length, crc = _SNAPSHOT_HEADER.unpack_from(view, len(_SNAPSHOT_MAGIC))
+                payload = view[header_end:header_end + length]
+                if zlib.crc32(payload) != crc:
+                    raise ValueError(f"Поврежден снимок хранилища: {self._snapshot_path}")
+
+            for section, posts in json.loads(payload).items():
+                state[section] = {int(post_id): data for post_id, data in posts.items()}
+
+        replayed = 0
+        self._seq = snapshot_seq
+        for record_seq, _, record in self._read_journal(truncate_torn=True):
+            self._seq = max(self._seq, record_seq)
+            if record_seq <= snapshot_seq:
+                continue
+
+            section = state[record['section']]
+            if record['op'] == 'put':
+                section[record['id']] = record['post']
+            else:
+                section.pop(record['id'], None)
+            replayed += 1
+
+        self._records_since_snapshot = replayed
+        return state, replayed
+
+    def _read_journal(self, truncate_torn: bool = False):
+        """Перебирает записи журнала: (номер, кадр, запись)"""
+        if not os.path.exists(self._journal_path) or not os.path.getsize(self._journal_path):
+            return
+
+        with open(self._journal_path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            offset = 0
+            while offset + _RECORD_HEADER.size <= len(view):
+                record_seq, length, crc = _RECORD_HEADER.unpack_from(view, offset)
+                start = offset + _RECORD_HEADER.size
+                payload = view[start:start + length]
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+
+                yield record_seq, view[offset:start + length], json.loads(payload)
+                offset = start + length
+
+            valid_size, total_size = offset, len(view)
+
+        # Недописанная при сбое запись отрезается
+        if truncate_torn and valid_size < total_size:
+            logger.warning(f"Журнал хранилища обрезан до последней целой записи ({total_size - valid_size} байт)")
+            with open(self._journal_path, 'r+b') as f:
+                f.truncate(valid_size)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Статистика журнала"""
+        return {**self._stats, 'seq': self._seq, 'pending_records': len(self._buffer)}
+
+
+# Глобальный журнал хранилища
+storage_journal = StorageJournal()
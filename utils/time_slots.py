@@ -1,18 +1,29 @@
 # -*- coding: utf-8 -*-
-from datetime import datetime, timedelta, time
+from datetime import date, datetime, timedelta, time
 from typing import List, Dict, Optional, Tuple
 import random
 import logging
-from config import POSTING_SCHEDULE
+from config import POSTING_SCHEDULE, SCHEDULE_PERIODS
+from utils.slot_index import SlotOccupancyIndex, slot_index
+from utils.clock import clock
+from utils.config_store import config_store
 
 logger = logging.getLogger(__name__)
 
 
 class TimeSlotManager:
-    """Менеджер временных слотов для постинга"""
+    """Движок расписания постинга.
 
-    def __init__(self):
-        self.schedule = POSTING_SCHEDULE
+    Слоты и периоды суток разбираются один раз при создании и хранятся в минутах
+    от начала дня (конец слота через полночь - больше 1440), поэтому все запросы
+    выполняют постоянную работу на слот без повторного парсинга строк.
+    Свободные минуты выбираются через индекс занятости очереди.
+    """
+
+    def __init__(self, schedule: Dict = None, periods: Dict = None, occupancy: SlotOccupancyIndex = None):
+        self.schedule = schedule or POSTING_SCHEDULE
+        self.periods = periods or SCHEDULE_PERIODS
+        self.occupancy = occupancy or slot_index
 
         # Маппинг дней недели
         self.weekday_map = {
@@ -24,6 +35,57 @@ class TimeSlotManager:
             5: 'saturday',
             6: 'sunday'
         }
+        self.day_numbers = {name: number for number, name in self.weekday_map.items()}
+
+        self._day_slots: Dict[int, List[Dict[str, time]]] = {}
+        self._day_ranges: Dict[int, List[Tuple[int, int]]] = {}
+        self._period_ranges: Dict[str, Tuple[int, int]] = {}
+        self._build()
+
+    def _build(self):
+        """Разбирает расписание и периоды суток"""
+        day_slots, day_ranges, period_ranges = {}, {}, {}
+
+        for weekday, day_name in self.weekday_map.items():
+            day_slots[weekday] = []
+            day_ranges[weekday] = []
+
+            for slot in self.schedule.get(day_name, []):
+                try:
+                    start_time = self.parse_time_string(slot['start'])
+                    end_time = self.parse_time_string(slot['end'])
+                except ValueError as e:
+                    logger.error(f"Ошибка парсинга слота {slot}: {e}")
+                    continue
+
+                day_slots[weekday].append({'start': start_time, 'end': end_time})
+                day_ranges[weekday].append(self._to_minute_range(start_time, end_time))
+
+        for period, bounds in self.periods.items():
+            try:
+                period_ranges[period] = self._to_minute_range(
+                    self.parse_time_string(bounds['start']),
+                    self.parse_time_string(bounds['end'])
+                )
+            except ValueError as e:
+                logger.error(f"Ошибка парсинга периода {period}: {e}")
+
+        # Таблицы заменяются целиком, чтобы запросы не видели полуразобранное расписание
+        self._day_slots, self._day_ranges, self._period_ranges = day_slots, day_ranges, period_ranges
+
+    def rebuild(self, *_):
+        """Перечитывает расписание после изменения конфигурации"""
+        self._build()
+        logger.info("Расписание постинга перестроено")
+
+    @staticmethod
+    def _to_minute_range(start_time: time, end_time: time) -> Tuple[int, int]:
+        """Переводит слот в минуты от начала дня (с переходом через полночь)"""
+        start = start_time.hour * 60 + start_time.minute
+        end = end_time.hour * 60 + end_time.minute
+        if end <= start:
+            end += 24 * 60
+        return start, end
 
     def parse_time_string(self, time_str: str) -> time:
         """Парсит строку времени в формате HH:MM"""
@@ -35,168 +97,113 @@ class TimeSlotManager:
 
     def get_day_slots(self, weekday: int) -> List[Dict[str, time]]:
         """Получает временные слоты для дня недели (0=понедельник)"""
-        day_name = self.weekday_map.get(weekday)
-        if not day_name:
-            return []
-
-        day_schedule = self.schedule.get(day_name, [])
-        slots = []
-
-        for slot in day_schedule:
-            try:
-                start_time = self.parse_time_string(slot['start'])
-                end_time = self.parse_time_string(slot['end'])
-
-                slots.append({
-                    'start': start_time,
-                    'end': end_time
-                })
-            except ValueError as e:
-                logger.error(f"Ошибка парсинга слота {slot}: {e}")
-                continue
+        return list(self._day_slots.get(weekday, []))
+
+    def _day_windows(self, day: date) -> List[Tuple[datetime, datetime]]:
+        """Слоты конкретной даты в виде интервалов datetime"""
+        day_start = datetime.combine(day, time())
+        return [
+            (day_start + timedelta(minutes=start), day_start + timedelta(minutes=end))
+            for start, end in self._day_ranges.get(day.weekday(), [])
+        ]
 
-        return slots
+    def _windows(self, from_date: date, days: int):
+        """Все слоты за период, начиная с даты, в хронологическом порядке"""
+        for day_offset in range(days):
+            for window in self._day_windows(from_date + timedelta(days=day_offset)):
+                yield window
 
     def is_time_in_slots(self, check_datetime: datetime) -> bool:
         """Проверяет, попадает ли время в разрешенные слоты"""
-        weekday = check_datetime.weekday()
-        check_time = check_datetime.time()
-
-        slots = self.get_day_slots(weekday)
-
-        for slot in slots:
-            # Обрабатываем случай, когда слот переходит через полночь
-            if slot['end'] < slot['start']:
-                # Слот вроде 23:00-02:00
-                if check_time >= slot['start'] or check_time <= slot['end']:
-                    return True
-            else:
-                # Обычный слот в пределах одного дня
-                if slot['start'] <= check_time <= slot['end']:
-                    return True
-
-        # Проверяем предыдущий день для слотов через полночь
-        prev_day = (check_datetime - timedelta(days=1))
-        prev_weekday = prev_day.weekday()
-        prev_slots = self.get_day_slots(prev_weekday)
-
-        for slot in prev_slots:
-            if slot['end'] < slot['start'] and check_time <= slot['end']:
+        minute = check_datetime.hour * 60 + check_datetime.minute + check_datetime.second / 60
+
+        for start, end in self._day_ranges.get(check_datetime.weekday(), []):
+            if start <= minute <= end:
+                return True
+
+        # Хвосты слотов предыдущего дня, переходящих через полночь
+        prev_weekday = (check_datetime.weekday() - 1) % 7
+        for start, end in self._day_ranges.get(prev_weekday, []):
+            if minute + 24 * 60 <= end:
                 return True
 
         return False
 
     def get_next_available_slot(self, from_datetime: datetime) -> Optional[datetime]:
-        """Находит следующий доступный слот для постинга"""
-        current = from_datetime
-
-        # Ищем в течение 7 дней
-        for _ in range(7 * 24 * 60):  # Максимум неделя по минутам
-            if self.is_time_in_slots(current):
-                return current
-            current += timedelta(minutes=1)
+        """Находит ближайшее разрешенное время (без учета занятости очереди)"""
+        for window_start, window_end in self._windows(from_datetime.date() - timedelta(days=1), 9):
+            if window_end >= from_datetime:
+                return max(window_start, from_datetime)
 
         return None
 
-    def distribute_posts_in_slots(
-            self,
-            count: int,
-            start_date: datetime,
-            days_ahead: int = 7
-    ) -> List[datetime]:
-        """Распределяет посты равномерно по доступным слотам"""
-        if count <= 0:
-            return []
+    # =============================================
+    # ПОДБОР СВОБОДНОГО ВРЕМЕНИ
+    # =============================================
 
-        # Собираем все доступные слоты на указанный период
-        available_slots = []
-        current_date = start_date.date()
+    def next_free_time(self, from_datetime: datetime, days_ahead: int = 7) -> Optional[datetime]:
+        """Ближайшая свободная минута в слотах начиная с указанного времени"""
+        for window_start, window_end in self._windows(from_datetime.date() - timedelta(days=1), days_ahead + 1):
+            if window_end <= from_datetime:
+                continue
 
-        for day_offset in range(days_ahead):
-            check_date = current_date + timedelta(days=day_offset)
-            weekday = check_date.weekday()
-            slots = self.get_day_slots(weekday)
+            free_minute = self.occupancy.find_free_minute(max(window_start, from_datetime), window_end)
+            if free_minute:
+                return free_minute
 
-            for slot in slots:
-                # Создаем временные точки в слоте
-                slot_start = datetime.combine(check_date, slot['start'])
-                slot_end = datetime.combine(check_date, slot['end'])
+        return None
 
-                # Обрабатываем переход через полночь
-                if slot['end'] < slot['start']:
-                    slot_end += timedelta(days=1)
+    def random_time_in_period(self, period: str, from_datetime: datetime, days_ahead: int = 7) -> Optional[datetime]:
+        """Свободное время в ближайшем слоте, пересекающемся с периодом суток (утро/вечер/ночь)"""
+        period_range = self._period_ranges.get(period)
+        if not period_range:
+            return None
 
-                # Пропускаем прошедшие слоты
-                if slot_end < start_date:
+        for day_offset in range(days_ahead):
+            day = from_datetime.date() + timedelta(days=day_offset)
+            day_start = datetime.combine(day, time())
+            period_start = day_start + timedelta(minutes=period_range[0])
+            period_end = day_start + timedelta(minutes=period_range[1])
+
+            # Период может пересекаться и со слотами предыдущего дня
+            windows = self._day_windows(day - timedelta(days=1)) + self._day_windows(day)
+            for window_start, window_end in sorted(windows):
+                start = max(window_start, period_start, from_datetime)
+                end = min(window_end, period_end)
+                if start >= end:
                     continue
 
-                # Добавляем слот в доступные
-                available_slots.append({
-                    'start': max(slot_start, start_date),
-                    'end': slot_end,
-                    'duration_minutes': int((slot_end - max(slot_start, start_date)).total_seconds() / 60)
-                })
-
-        if not available_slots:
-            logger.warning("Нет доступных слотов для распределения постов")
-            return []
-
-        # Сортируем слоты по времени
-        available_slots.sort(key=lambda x: x['start'])
-
-        # Вычисляем общее время в минутах
-        total_minutes = sum(slot['duration_minutes'] for slot in available_slots)
+                free_minute = self.occupancy.find_free_minute(start, end)
+                if free_minute:
+                    return free_minute
 
-        if total_minutes < count:
-            logger.warning(f"Недостаточно времени для распределения {count} постов")
-
-        # Распределяем посты
-        distributed_times = []
-        interval = max(1, total_minutes // count) if count > 0 else 1
-
-        minutes_passed = 0
-        posts_placed = 0
-
-        for slot in available_slots:
-            if posts_placed >= count:
-                break
-
-            slot_start_minutes = minutes_passed
-            slot_end_minutes = minutes_passed + slot['duration_minutes']
-
-            # Размещаем посты в этом слоте
-            while posts_placed < count and minutes_passed < slot_end_minutes:
-                # Находим позицию в слоте
-                position_in_slot = minutes_passed - slot_start_minutes
-                post_time = slot['start'] + timedelta(minutes=position_in_slot)
+        return None
 
-                distributed_times.append(post_time)
-                posts_placed += 1
-                minutes_passed += interval
+    def time_on_day(self, day_name: str, from_datetime: datetime, weeks_ahead: int = 4) -> Optional[datetime]:
+        """Свободное время в ближайший указанный день недели (не сегодня)"""
+        target_weekday = self.day_numbers.get(day_name)
+        if target_weekday is None:
+            return None
 
-            minutes_passed = slot_end_minutes
+        days_ahead = (target_weekday - from_datetime.weekday()) % 7 or 7
 
-        # Если не все посты размещены, добавляем оставшиеся в последний слот
-        while posts_placed < count and available_slots:
-            last_slot = available_slots[-1]
-            # Добавляем с небольшим случайным интервалом в конец последнего слота
-            random_offset = random.randint(1, min(30, last_slot['duration_minutes'] // 2))
-            post_time = last_slot['end'] - timedelta(minutes=random_offset)
-            distributed_times.append(post_time)
-            posts_placed += 1
+        for week in range(weeks_ahead):
+            day = from_datetime.date() + timedelta(days=days_ahead + week * 7)
+            windows = self._day_windows(day)
 
-        # Перемешиваем для более естественного распределения
-        random.shuffle(distributed_times)
-        distributed_times.sort()
+            # Слоты перебираются в случайном порядке для естественного распределения
+            for window_start, window_end in random.sample(windows, len(windows)):
+                free_minute = self.occupancy.find_free_minute(window_start, window_end)
+                if free_minute:
+                    return free_minute
 
-        logger.info(f"Распределено {len(distributed_times)} постов по слотам")
-        return distributed_times
+        return None
 
-    def get_quick_schedule_time(self, option: str, from_datetime: datetime) -> Optional[datetime]:
-        """Получает время для быстрых опций планирования"""
-        if option == "30_min":
+    def quick_offset(self, option: str, from_datetime: datetime) -> Optional[datetime]:
+        """Свободное время для быстрых опций (через 30 мин, через час, завтра в 9:00)"""
+        if option in ("30min", "30_min"):
             target_time = from_datetime + timedelta(minutes=30)
-        elif option == "1_hour":
+        elif option in ("1hour", "1_hour"):
             target_time = from_datetime + timedelta(hours=1)
         elif option == "tomorrow_9am":
             tomorrow = from_datetime.date() + timedelta(days=1)
@@ -204,12 +211,43 @@ class TimeSlotManager:
         else:
             return None
 
-        # Проверяем, попадает ли в слоты
-        if self.is_time_in_slots(target_time):
-            return target_time
-        else:
-            # Находим ближайший доступный слот
-            return self.get_next_available_slot(target_time)
+        return self.next_free_time(target_time)
+
+    def distribute_posts_in_slots(
+            self,
+            count: int,
+            start_date: datetime,
+            days_ahead: int = 7
+    ) -> List[datetime]:
+        """Подбирает время для нескольких постов так же, как для одного.
+
+        Каждое время берется через next_free_time и сразу резервируется в
+        индексе занятости, чтобы следующий пост соблюдал интервал и лимит слота
+        относительно него. Резервы снимаются перед возвратом - посты попадут в
+        индекс при планировании. Если места хватило не всем, список короче count.
+        """
+        publish_times: List[datetime] = []
+        try:
+            for number in range(count):
+                publish_time = self.next_free_time(start_date, days_ahead)
+                if publish_time is None:
+                    logger.warning(f"Свободное время нашлось только для {number} из {count} постов")
+                    break
+
+                # Отрицательные ID не пересекаются с ID запланированных постов
+                self.occupancy.add(-(number + 1), publish_time)
+                publish_times.append(publish_time)
+        finally:
+            for number in range(len(publish_times)):
+                self.occupancy.remove(-(number + 1))
+
+        publish_times.sort()
+        logger.info(f"Распределено {len(publish_times)} постов по слотам")
+        return publish_times
+
+    def get_quick_schedule_time(self, option: str, from_datetime: datetime) -> Optional[datetime]:
+        """Получает время для быстрых опций планирования"""
+        return self.quick_offset(option, from_datetime)
 
     def parse_user_datetime(self, datetime_str: str) -> Optional[datetime]:
         """Парсит дату и время от пользователя в формате ДД.ММ.ГГГГ ЧЧ:ММ"""
@@ -229,7 +267,7 @@ class TimeSlotManager:
                 try:
                     parsed_dt = datetime.strptime(datetime_str, fmt)
                     # Проверяем, что дата не в прошлом
-                    if parsed_dt < datetime.now():
+                    if parsed_dt < clock.now():
                         logger.warning(f"Указанная дата в прошлом: {parsed_dt}")
                         return None
                     return parsed_dt
@@ -277,4 +315,5 @@ class TimeSlotManager:
 
 
 # Глобальный экземпляр менеджера слотов
-time_slot_manager = TimeSlotManager()
\ No newline at end of file
+time_slot_manager = TimeSlotManager()
+config_store.subscribe('schedule', time_slot_manager.rebuild)
\ No newline at end of file
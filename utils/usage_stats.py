@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import SETTINGS
+from utils.clock import clock
+from utils.config_store import atomic_write
+
+logger = logging.getLogger(__name__)
+
+# Поля счетчика одного часа
+_FIELDS = ('calls', 'errors', 'prompt_tokens', 'cached_tokens', 'completion_tokens', 'latency')
+
+
+def usage_tokens(usage) -> Tuple[int, int, int]:
+    """(prompt, из них из кэша, completion) из usage ответа.
+
+    DeepSeek отдает prompt_cache_hit_tokens, OpenAI - prompt_tokens_details.cached_tokens.
+    """
+    if usage is None:
+        return 0, 0, 0
+
+    cached = getattr(usage, 'prompt_cache_hit_tokens', None)
+    if cached is None:
+        details = getattr(usage, 'prompt_tokens_details', None)
+        cached = getattr(details, 'cached_tokens', None) if details else None
+
+    return usage.prompt_tokens or 0, cached or 0, usage.completion_tokens or 0
+
+
+class UsageStats:
+    """Учет токенов, попаданий в кэш и задержки AI-запросов.
+
+    Компактный скользящий временной ряд: по одному счетчику на час и тип
+    промпта, старше usage_retention_days дней счетчики удаляются. Ряд
+    сохраняется в JSON при остановке и переживает перезапуск. save() вызывается
+    из потока (asyncio.to_thread), поэтому счетчики меняются под блокировкой.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or SETTINGS['usage_stats_file']
+        # (начало часа, тип промпта) -> счетчики
+        self._buckets: Dict[Tuple[datetime, str], Dict[str, float]] = defaultdict(
+            lambda: dict.fromkeys(_FIELDS, 0)
+        )
+        # Есть ли несохраненные изменения
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def record(self, prompt_type: str, usage=None, latency: float = 0.0, ok: bool = True):
+        """Учитывает один AI-запрос"""
+        hour = clock.now().replace(minute=0, second=0, microsecond=0)
+        prompt_tokens, cached_tokens, completion_tokens = usage_tokens(usage)
+
+        with self._lock:
+            bucket = self._buckets[(hour, prompt_type)]
+            bucket['calls'] += 1
+            bucket['errors'] += 0 if ok else 1
+            bucket['prompt_tokens'] += prompt_tokens
+            bucket['cached_tokens'] += cached_tokens
+            bucket['completion_tokens'] += completion_tokens
+            bucket['latency'] += latency
+            self._dirty = True
+
+    # =============================================
+    # АГРЕГАТЫ
+    # =============================================
+
+    @staticmethod
+    def cost(totals: Dict[str, float]) -> float:
+        """Стоимость по тарифам SETTINGS['ai_token_prices'] (за миллион токенов)"""
+        prices = SETTINGS['ai_token_prices']
+        uncached = totals['prompt_tokens'] - totals['cached_tokens']
+        return (
+            uncached * prices['input']
+            + totals['cached_tokens'] * prices['input_cached']
+            + totals['completion_tokens'] * prices['output']
+        ) / 1_000_000
+
+    def _aggregate(self, days: int, key) -> Dict[Any, Dict[str, float]]:
+        since = clock.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+        result: Dict[Any, Dict[str, float]] = defaultdict(lambda: dict.fromkeys(_FIELDS, 0))
+        with self._lock:
+            buckets = list(self._buckets.items())
+        for (hour, prompt_type), bucket in buckets:
+            if hour < since:
+                continue
+            totals = result[key(hour, prompt_type)]
+            for field in _FIELDS:
+                totals[field] += bucket[field]
+        return dict(result)
+
+    def by_prompt(self, days: int = 7) -> Dict[str, Dict[str, float]]:
+        """Суммы по типам промптов за последние дни"""
+        return self._aggregate(days, lambda hour, prompt_type: prompt_type)
+
+    def by_day(self, days: int = 7) -> List[Tuple[datetime, Dict[str, float]]]:
+        """Суммы по дням (новые первыми)"""
+        totals = self._aggregate(days, lambda hour, prompt_type: hour.replace(hour=0))
+        return sorted(totals.items(), reverse=True)
+
+    # =============================================
+    # ХРАНЕНИЕ
+    # =============================================
+
+    def prune(self):
+        """Удаляет счетчики старше срока хранения"""
+        cutoff = clock.now() - timedelta(days=SETTINGS['usage_retention_days'])
+        for key in [key for key in self._buckets if key[0] < cutoff]:
+            del self._buckets[key]
+
+    def clear(self):
+        """Сбрасывает все счетчики"""
+        with self._lock:
+            self._buckets.clear()
+
+    def load(self):
+        """Загружает ряд с диска"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                rows = json.load(f)
+            for hour, prompt_type, *values in rows:
+                self._buckets[(datetime.fromisoformat(hour), prompt_type)] = dict(zip(_FIELDS, values))
+            self.prune()
+            logger.info(f"Статистика AI загружена: {len(self._buckets)} часовых счетчиков")
+        except Exception as e:
+            logger.error(f"Ошибка загрузки статистики AI из {self.path}: {e}")
+
+    def save(self, force: bool = False):
+        """Сохраняет ряд на диск (строка на счетчик: час, промпт, значения).
+
+        Без force ничего не пишет, если с прошлого сохранения запросов не было.
+        """
+        with self._lock:
+            if not self._dirty and not force:
+                return
+
+            self.prune()
+            rows = [
+                [hour.isoformat(), prompt_type, *(bucket[field] for field in _FIELDS)]
+                for (hour, prompt_type), bucket in sorted(self._buckets.items())
+            ]
+            self._dirty = False
+
+        try:
+            atomic_write(self.path, json.dumps(rows, ensure_ascii=False))
+        except Exception as e:
+            # Запишем при следующем сохранении
+            self._dirty = True
+            logger.error(f"Ошибка сохранения статистики AI в {self.path}: {e}")
+
+
+# Глобальная статистика использования AI
+usage_stats = UsageStats()